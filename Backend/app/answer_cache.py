@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers keyed by query embedding.
+
+    A lookup hits when a stored entry has the same answer mode and index
+    version and its embedding has cosine similarity >= `threshold` with the
+    query. Embeddings live in one preallocated float32 matrix so a lookup is
+    a single matrix-vector product, masked by a per-mode boolean row mask
+    kept up to date in put/evict. Eviction is LRU once `max_entries` is
+    reached.
+    """
+
+    def __init__(self, max_entries: int = 1000, threshold: float = 0.97, index_version: str = "1"):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.index_version = index_version
+
+        self._matrix: Optional[np.ndarray] = None    # (max_entries, dim), rows L2-normalized
+        self._masks: Dict[str, np.ndarray] = {}      # answer mode -> occupied rows of that mode
+        self._modes: List[Optional[str]] = [None] * max_entries
+        self._slots: "OrderedDict[int, dict]" = OrderedDict()  # slot -> cached payload, LRU order
+        self._free = list(range(max_entries - 1, -1, -1))
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def get(self, embedding, answer_mode: str) -> Optional[dict]:
+        if self._matrix is None or not self._slots:
+            self.misses += 1
+            return None
+
+        query = self._normalize(embedding)
+        if query.shape[0] != self._matrix.shape[1]:
+            self.misses += 1
+            return None
+
+        mask = self._masks.get(answer_mode)
+        if mask is None or not mask.any():
+            self.misses += 1
+            return None
+
+        scores = np.where(mask, self._matrix @ query, -np.inf)
+        slot = int(np.argmax(scores))
+
+        if scores[slot] < self.threshold:
+            self.misses += 1
+            return None
+
+        self._slots.move_to_end(slot)
+        self.hits += 1
+        return self._slots[slot]
+
+    def put(self, embedding, answer_mode: str, payload: dict):
+        vec = self._normalize(embedding)
+
+        if self._matrix is None or self._matrix.shape[1] != vec.shape[0]:
+            self._matrix = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+            self.clear()
+
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot, _ = self._slots.popitem(last=False)
+            self._masks[self._modes[slot]][slot] = False
+
+        mask = self._masks.get(answer_mode)
+        if mask is None:
+            mask = self._masks[answer_mode] = np.zeros(self.max_entries, dtype=bool)
+
+        self._matrix[slot] = vec
+        mask[slot] = True
+        self._modes[slot] = answer_mode
+        self._slots[slot] = payload
+
+    def clear(self):
+        self._masks.clear()
+        self._modes = [None] * self.max_entries
+        self._slots.clear()
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+    def invalidate(self, index_version: Optional[str] = None):
+        """Drop every entry; called when the playbook index is re-ingested."""
+        if index_version is not None:
+            self.index_version = index_version
+        self.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "index_version": self.index_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
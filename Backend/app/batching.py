@@ -0,0 +1,124 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item requests into one batched call.
+
+    A batch is flushed when it reaches `max_batch_size` items or when the
+    oldest item has waited `max_wait_ms`, whichever comes first. The batch
+    function runs on a dedicated worker thread so the event loop stays free.
+
+    `on_batch(items, seconds)` is called back on the event loop after every
+    batch with the time batch_fn itself took, so metrics are never touched
+    from the worker thread.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List], List],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        on_batch: Optional[Callable[[List, float], None]] = None,
+    ):
+        self.batch_fn = batch_fn
+        self.on_batch = on_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batcher")
+
+        self.batches = 0
+        self.items = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, item):
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher is not started")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def run_batch(self, items: List) -> List:
+        """Run an already-formed batch on the worker thread; batch_fn must return one result per item."""
+        loop = asyncio.get_running_loop()
+        results, seconds = await loop.run_in_executor(self._executor, self._timed, items)
+        if len(results) != len(items):
+            raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+        if self.on_batch is not None:
+            self.on_batch(items, seconds)
+        return results
+
+    def _timed(self, items: List):
+        started = time.perf_counter()
+        results = self.batch_fn(items)
+        return results, time.perf_counter() - started
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+
+            try:
+                results = await self.run_batch(items)
+            except asyncio.CancelledError:
+                # stop() mid-batch: nobody will resolve these callers
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
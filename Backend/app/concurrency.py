@@ -0,0 +1,139 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+
+class DependencySaturated(Exception):
+    """Raised when a dependency's wait queue is full; mapped to HTTP 429."""
+
+    def __init__(self, dependency: str, retry_after: int):
+        super().__init__(f"{dependency} is saturated, retry after {retry_after}s")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class DependencyLimiter:
+    """
+    Concurrency limit + bounded wait queue for one blocking dependency.
+
+    At most `max_concurrency` calls run at once, each on this limiter's own
+    thread pool so blocking SDK calls never run on the event loop. Up to
+    `max_queue` callers may wait for a slot; anyone beyond that is rejected
+    immediately with DependencySaturated instead of piling up.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, retry_after: int = 1):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=name)
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def saturated(self) -> bool:
+        return self.in_flight >= self.max_concurrency and self.waiting >= self.max_queue
+
+    def check_or_raise(self):
+        """Count and raise DependencySaturated now if a slot() would be rejected."""
+        if self.saturated():
+            self.rejected += 1
+            raise DependencySaturated(self.name, self.retry_after)
+
+    @asynccontextmanager
+    async def slot(self):
+        self.check_or_raise()
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def offload(self, fn, *args, **kwargs):
+        """Run fn on the limiter's thread pool without taking a slot."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def run(self, fn, *args, **kwargs):
+        async with self.slot():
+            return await self.offload(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls onto one execution.
+
+    The first caller for a key starts `fn()` as a task; callers arriving
+    with the same key while it is running await that task and get its
+    result (or exception). Nothing is kept once it finishes, so this is
+    deduplication of in-flight work, not a cache. Waiters are shielded: one
+    caller disconnecting does not cancel the call for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an unawaited failure is not logged
+
+    async def run(self, key, fn):
+        """Return (result, coalesced): coalesced is True when another caller's call was reused."""
+        task = self._calls.get(key)
+
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+            coalesced = False
+        else:
+            self.coalesced += 1
+            coalesced = True
+
+        return await asyncio.shield(task), coalesced
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.coalesced
+        return {
+            "in_flight": self.in_flight,
+            "executions": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+        }
@@ -0,0 +1,148 @@
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+# Sentence ends, and line breaks (playbooks are mostly bullet / step lines)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+
+def truncate_to_tokens(text: str, max_tokens: int, estimate_tokens: Callable[[str], int]) -> str:
+    """Longest whole-word prefix of text estimated at no more than max_tokens."""
+    words = []
+    for word in text.split():
+        max_tokens -= estimate_tokens(word)
+        if max_tokens < 0:
+            break
+        words.append(word)
+    return " ".join(words)
+
+
+def _sentence_key(sentence: str) -> str:
+    return _SPACE_RE.sub(" ", sentence.lower()).strip(" .●•-")
+
+
+class ContextPacker:
+    """
+    Packs retrieved chunks into a prompt context of at most `token_budget`
+    (estimated) tokens.
+
+    Chunks are taken in score order and cut at sentence / line boundaries;
+    only a chunk whose first sentence alone is over the remaining budget is
+    cut mid-sentence, at a word boundary. Sentences already packed from a higher-scoring chunk
+    are skipped, so overlapping chunks only contribute what is new. Packed
+    text is kept in an LRU keyed by the context set, so the same retrieval
+    result never gets re-split; scores are attached per call, as the same
+    chunks can come back with different scores.
+
+    `estimate_tokens(text) -> int` is the caller's estimator; pass the one
+    chunks were sized with (chunker.estimate_tokens) so budgets match.
+    """
+
+    def __init__(self, estimate_tokens: Callable[[str], int], token_budget: int = 600, max_chunks: int = 4,
+                 min_chunk_tokens: int = 24, cache_size: int = 512):
+        self.estimate_tokens = estimate_tokens
+        self.token_budget = token_budget
+        self.max_chunks = max_chunks
+        self.min_chunk_tokens = min_chunk_tokens
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_packed = 0
+
+    def _key(self, contexts: List[str]) -> str:
+        digest = hashlib.sha1(f"{self.token_budget}:{self.max_chunks}".encode("utf-8"))
+        for content in contexts:
+            digest.update(b"\x00")
+            digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    def pack(self, contexts: List[str], scores: Optional[List[float]] = None) -> dict:
+        """
+        contexts must already be in score order. Returns
+        {"text", "contexts", "scores", "tokens"}: the packed context block,
+        the original chunks it drew from and their scores.
+        """
+        scores = scores if scores is not None else [0.0] * len(contexts)
+        key = self._key(contexts)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            cached = self._pack(contexts)
+
+            self.tokens_packed += cached["tokens"]
+
+            self._cache[key] = cached
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return {
+            "text": cached["text"],
+            "contexts": [contexts[i] for i in cached["used"]],
+            "scores": [scores[i] for i in cached["used"]],
+            "tokens": cached["tokens"],
+        }
+
+    def _pack(self, contexts: List[str]) -> dict:
+        """{"text", "used", "tokens"}; used are the indices of the chunks drawn from."""
+        estimate_tokens = self.estimate_tokens
+        seen = set()
+        blocks, used = [], []
+        remaining = self.token_budget
+
+        for i, content in enumerate(contexts):
+            if len(used) >= self.max_chunks or remaining < self.min_chunk_tokens:
+                break
+
+            kept = []
+            for sentence in split_sentences(content):
+                sentence_key = _sentence_key(sentence)
+                if not sentence_key or sentence_key in seen:
+                    continue
+
+                cost = estimate_tokens(sentence) + 1
+                if cost > remaining:
+                    if not kept:
+                        sentence = truncate_to_tokens(sentence, remaining - 1, estimate_tokens)
+                        if sentence:
+                            kept.append(sentence)
+                            remaining -= estimate_tokens(sentence) + 1
+                    break
+
+                kept.append(sentence)
+                seen.add(sentence_key)
+                remaining -= cost
+
+            if kept:
+                blocks.append("\n".join(kept))
+                used.append(i)
+
+        return {
+            "text": "\n\n".join(blocks),
+            "used": used,
+            "tokens": self.token_budget - remaining,
+        }
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "token_budget": self.token_budget,
+            "max_chunks": self.max_chunks,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_packed_tokens": round(self.tokens_packed / self.misses, 1) if self.misses else 0.0,
+        }
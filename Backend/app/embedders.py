@@ -0,0 +1,291 @@
+"""
+Embedding inference backends for the embedding service.
+
+    torch   SentenceTransformer in PyTorch, fp32 (the original setup)
+    onnx    the same model exported to ONNX and run on ONNX Runtime,
+            optionally with dynamic int8 quantization of the weights
+
+The ONNX backend needs `pip install "sentence-transformers[onnx]"`. The
+export (and quantization) happens once and is cached under EMBED_ONNX_DIR.
+
+Run this module to measure what a backend costs in accuracy and buys in
+speed against the fp32 PyTorch reference:
+
+    python -m app.embedders --backend onnx --quantize avx512_vnni
+
+or, at image build time, to download / export the model into the cache
+directories the service loads from:
+
+    python -m app.embedders --preload --backend onnx --cache-dir /models/hf
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+
+DEFAULT_MODEL = "BAAI/bge-large-en-v1.5"
+QUANTIZATION_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_ONNX_DIR = os.path.join(REPO_ROOT, "data", "models")
+
+
+class Embedder(ABC):
+    """Encodes texts into L2-normalized float32 vectors (what bge + sentence-transformers return)."""
+
+    model_name: str
+    backend: str
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        ...
+
+    @property
+    def dimension(self) -> int:
+        return int(self.encode(["dimension probe"]).shape[1])
+
+    def describe(self) -> dict:
+        return {"backend": self.backend, "model": self.model_name}
+
+
+# -------------------------
+# PYTORCH
+# -------------------------
+class TorchEmbedder(Embedder):
+    backend = "torch"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, threads: int = 0, cache_dir: Optional[str] = None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+
+        self.model_name = model_name
+        self.threads = threads
+        self.model = SentenceTransformer(model_name, device="cpu", cache_folder=cache_dir)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+    def describe(self) -> dict:
+        return {**super().describe(), "threads": self.threads or None}
+
+
+# -------------------------
+# ONNX RUNTIME
+# -------------------------
+class OnnxEmbedder(Embedder):
+    """
+    ONNX Runtime inference through sentence-transformers' ONNX backend, so
+    tokenization, pooling and normalization match the PyTorch model exactly.
+
+    `quantize` picks the int8 kernel set for dynamic quantization
+    (avx2 / avx512 / avx512_vnni / arm64); None keeps fp32 weights.
+    `threads` caps ONNX Runtime's intra-op pool, which otherwise takes every
+    core and fights the uvicorn workers on the same node.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, quantize: Optional[str] = "avx2",
+                 threads: int = 0, onnx_dir: str = DEFAULT_ONNX_DIR, cache_dir: Optional[str] = None):
+        if quantize and quantize not in QUANTIZATION_CONFIGS:
+            raise ValueError(f"Unknown quantization config: {quantize} (expected one of {QUANTIZATION_CONFIGS})")
+
+        self.model_name = model_name
+        self.quantize = quantize or None
+        self.threads = threads
+        self.cache_dir = cache_dir
+        self.local_path = os.path.join(onnx_dir, model_name.replace("/", "__"))
+        self.file_name = f"onnx/model_qint8_{quantize}.onnx" if quantize else "onnx/model.onnx"
+
+        self._export_if_missing()
+        self.model = self._load()
+
+    def _export_if_missing(self):
+        from sentence_transformers import SentenceTransformer
+
+        if os.path.exists(os.path.join(self.local_path, self.file_name)):
+            return
+
+        if not os.path.exists(os.path.join(self.local_path, "onnx", "model.onnx")):
+            print(f"Exporting {self.model_name} to ONNX at {self.local_path} ...")
+            SentenceTransformer(
+                self.model_name, backend="onnx", device="cpu", cache_folder=self.cache_dir
+            ).save_pretrained(self.local_path)
+
+        if self.quantize:
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            print(f"Quantizing {self.model_name} to int8 ({self.quantize}) ...")
+            model = SentenceTransformer(self.local_path, backend="onnx", device="cpu")
+            export_dynamic_quantized_onnx_model(model, self.quantize, self.local_path)
+
+    def _load(self):
+        import onnxruntime as ort
+        from sentence_transformers import SentenceTransformer
+
+        options = ort.SessionOptions()
+        if self.threads > 0:
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        return SentenceTransformer(
+            self.local_path,
+            backend="onnx",
+            device="cpu",
+            model_kwargs={
+                "file_name": self.file_name,
+                "provider": "CPUExecutionProvider",
+                "session_options": options,
+            },
+        )
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+    def describe(self) -> dict:
+        return {
+            **super().describe(),
+            "quantize": self.quantize,
+            "threads": self.threads or None,
+            "file": self.file_name,
+        }
+
+
+def create_embedder(backend: str, model_name: str = DEFAULT_MODEL, quantize: Optional[str] = None,
+                    threads: int = 0, onnx_dir: str = DEFAULT_ONNX_DIR, cache_dir: Optional[str] = None) -> Embedder:
+    """cache_dir: Hugging Face download cache; preload it at build time to skip downloads on startup."""
+    if backend == "torch":
+        return TorchEmbedder(model_name, threads=threads, cache_dir=cache_dir)
+    if backend == "onnx":
+        return OnnxEmbedder(model_name, quantize=quantize, threads=threads, onnx_dir=onnx_dir, cache_dir=cache_dir)
+    raise ValueError(f"Unknown EMBED_BACKEND: {backend}")
+
+
+# -------------------------
+# PARITY CHECK
+# -------------------------
+PROBE_QUERIES = [
+    "how do we contain a customer phishing campaign",
+    "what are the escalation criteria for customer phishing",
+    "steps to take down a phishing site impersonating our brand",
+    "event 4625 spike on the vpn gateway",
+    "recovery steps after customers entered passwords on a phishing page",
+    "what is ransomware",
+    "who do we escalate to if customer financial data was exposed",
+    "post incident actions after a phishing takedown",
+]
+
+
+def load_probe_documents(chunks_dir: str) -> List[str]:
+    # src/ only for this CLI; the embedding service itself never reads chunks
+    sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+    from vector_store import iter_chunk_files
+
+    return [ch["content"] for _, chunks in iter_chunk_files(chunks_dir) for ch in chunks]
+
+
+def timed_encode(embedder: Embedder, texts: List[str], batch_size: int, repeats: int):
+    """(embeddings, ms per text for single-text calls, ms per text batched)"""
+    embedder.encode(texts[:2], batch_size=batch_size)  # warm-up
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            embedder.encode([text], batch_size=1)
+    single_ms = (time.perf_counter() - started) * 1000 / (repeats * len(texts))
+
+    started = time.perf_counter()
+    vectors = embedder.encode(texts, batch_size=batch_size)
+    batched_ms = (time.perf_counter() - started) * 1000 / len(texts)
+
+    return vectors, single_ms, batched_ms
+
+
+def parity_report(reference: Embedder, candidate: Embedder, queries: List[str], documents: List[str],
+                  batch_size: int = 32, repeats: int = 3, top_k: int = 3) -> dict:
+    """
+    Cosine drift of `candidate` against `reference` on the same texts, plus
+    how often query -> document top-k rankings still agree.
+    """
+    texts = queries + documents
+    ref, ref_single, ref_batched = timed_encode(reference, texts, batch_size, repeats)
+    cand, cand_single, cand_batched = timed_encode(candidate, texts, batch_size, repeats)
+
+    if ref.shape[1] != cand.shape[1]:
+        raise ValueError(f"Dimension mismatch: reference {ref.shape[1]}, candidate {cand.shape[1]}")
+
+    cosines = np.sum(ref * cand, axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1))
+
+    overlap = []
+    if documents:
+        k = min(top_k, len(documents))
+        q, d = len(queries), slice(len(queries), None)
+        ref_top = np.argsort(-(ref[:q] @ ref[d].T), axis=1)[:, :k]
+        cand_top = np.argsort(-(cand[:q] @ cand[d].T), axis=1)[:, :k]
+        overlap = [len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]
+
+    return {
+        "reference": reference.describe(),
+        "candidate": candidate.describe(),
+        "texts": len(texts),
+        "cosine": {
+            "mean": round(float(cosines.mean()), 5),
+            "min": round(float(cosines.min()), 5),
+            "p5": round(float(np.percentile(cosines, 5)), 5),
+        },
+        f"top{top_k}_agreement": round(float(np.mean(overlap)), 4) if overlap else None,
+        "ms_per_text": {
+            "reference_single": round(ref_single, 2),
+            "candidate_single": round(cand_single, 2),
+            "reference_batched": round(ref_batched, 2),
+            "candidate_batched": round(cand_batched, 2),
+        },
+        "speedup_single": round(ref_single / cand_single, 2) if cand_single else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare an embedding backend against the fp32 PyTorch model")
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--candidate-model", help="Defaults to --model (e.g. a smaller query-side model)")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default="onnx")
+    parser.add_argument("--quantize", choices=QUANTIZATION_CONFIGS + ("none",), default="avx2")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("EMBED_THREADS", "0")))
+    parser.add_argument("--onnx-dir", default=os.getenv("EMBED_ONNX_DIR", DEFAULT_ONNX_DIR))
+    parser.add_argument("--cache-dir", default=os.getenv("EMBED_MODEL_CACHE"))
+    parser.add_argument("--preload", action="store_true", help="Only download / export the candidate model, then exit")
+    parser.add_argument("--chunks-dir", default=os.path.join(REPO_ROOT, "data", "chunks"))
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    candidate = create_embedder(
+        args.backend,
+        args.candidate_model or args.model,
+        quantize=None if args.quantize == "none" else args.quantize,
+        threads=args.threads,
+        onnx_dir=args.onnx_dir,
+        cache_dir=args.cache_dir,
+    )
+
+    if args.preload:
+        print(f"Preloaded: {json.dumps(candidate.describe())}")
+        return
+
+    reference = TorchEmbedder(args.model, threads=args.threads, cache_dir=args.cache_dir)
+
+    report = parity_report(reference, candidate, PROBE_QUERIES, load_probe_documents(args.chunks_dir),
+                           repeats=args.repeats)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+
+def normalize_query(text: str) -> str:
+    """Same normalization rag_service.chat applies to user_query."""
+    return (text or "").lower().strip()
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings with a per-entry TTL.
+
+    Entries are keyed on the normalized query text. When `path` is set,
+    the cache is loaded from / saved to a JSON file so it survives restarts.
+    Expiry uses wall-clock time so persisted entries keep their TTL.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 86400, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = normalize_query(text)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, embedding = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return embedding
+
+    def put(self, text: str, embedding: List[float]):
+        key = normalize_query(text)
+        self._entries[key] = (time.time() + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    # -------------------------
+    # PERSISTENCE
+    # -------------------------
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        for key, expires_at, embedding in data.get("entries", []):
+            if expires_at > now:
+                self._entries[key] = (expires_at, embedding)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+
+        now = time.time()
+        entries = [
+            [key, expires_at, embedding.tolist() if hasattr(embedding, "tolist") else embedding]
+            for key, (expires_at, embedding) in self._entries.items()
+            if expires_at > now
+        ]
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Unique temp file, so concurrent savers never write into the same one
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": bool(self.path),
+        }
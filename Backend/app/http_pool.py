@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from app.metrics import trace_headers
+
+# -------------------------
+# CONFIG
+# -------------------------
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class UpstreamPool:
+    """
+    One long-lived httpx.AsyncClient per upstream service.
+    Connections are kept alive between requests so we only pay
+    the TCP/TLS handshake once per connection, not once per call.
+    """
+
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self.http2 = HTTP2_ENABLED and _http2_available()
+        self.client = None
+
+        # Gate mirrors max_connections so we can measure pool wait time
+        self._slots = asyncio.Semaphore(HTTP_MAX_CONNECTIONS)
+        self.in_use = 0
+        self.max_in_use = 0
+        self.total_requests = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    async def open(self):
+        self.client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(self.timeout, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    @asynccontextmanager
+    async def _slot(self):
+        if self.client is None:
+            raise RuntimeError(f"HTTP pool '{self.name}' is not open")
+
+        started = time.perf_counter()
+        async with self._slots:
+            wait_ms = (time.perf_counter() - started) * 1000
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.total_requests += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            try:
+                yield
+            finally:
+                self.in_use -= 1
+
+    @staticmethod
+    def _traced(kwargs: dict) -> dict:
+        """Forward the current request ID so the upstream logs/metrics line up."""
+        headers = trace_headers()
+        if headers:
+            kwargs["headers"] = {**headers, **(kwargs.get("headers") or {})}
+        return kwargs
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs = self._traced(kwargs)
+        async with self._slot():
+            return await self.client.request(method, url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """Streaming request; the pool slot is held until the body is consumed."""
+        kwargs = self._traced(kwargs)
+        async with self._slot():
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    def metrics(self) -> dict:
+        # Counted in _slot(): httpx has no public connection-pool stats.
+        # Peak in-flight bounds the connections HTTP/1.1 has had to open.
+        return {
+            "http2": self.http2,
+            "timeout": self.timeout,
+            "max_connections": HTTP_MAX_CONNECTIONS,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "total_requests": self.total_requests,
+            "avg_wait_ms": round(self.total_wait_ms / self.total_requests, 3)
+            if self.total_requests else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+        }
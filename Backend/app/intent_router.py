@@ -0,0 +1,151 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from app.embedding_cache import normalize_query
+
+DEFAULT_INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intents.json")
+
+_SHORT, _DETAILED, _DEFINITION, _FAQ = "short", "detailed", "definition", "faq"
+
+
+def canonical_query(text: str) -> str:
+    """normalize_query with whitespace collapsed and trailing punctuation dropped: the key for "same question"."""
+    return re.sub(r"\s+", " ", normalize_query(text)).rstrip("?!. ")
+
+
+def _trie_pattern(phrases: List[str]) -> str:
+    """
+    Build a regex alternation shaped like a prefix trie, so matching at a
+    position walks shared prefixes once instead of retrying every phrase.
+    """
+    trie: dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def render(node: dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch]
+
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not terminal else "(?:" + "|".join(branches) + ")"
+        return body + "?" if terminal else body
+
+    return render(trie)
+
+
+class IntentRouter:
+    """
+    Classifies a query in one regex pass: greeting, answer mode, definition
+    intent and FAQ key. Trigger phrases are matched as substrings (like the
+    original `trigger in query` checks); overlapping matches are found via a
+    zero-width lookahead so no trigger is shadowed by another.
+    """
+
+    def __init__(self, config: dict):
+        self.greeting_reply = config.get("greeting_reply", "")
+        self.greetings = [g.lower() for g in config.get("greetings", [])]
+        self.faq: Dict[str, str] = {k.lower(): v for k, v in config.get("faq", {}).items()}
+        self._faq_priority = {key: i for i, key in enumerate(self.faq)}
+
+        # phrase -> categories it belongs to
+        self._categories: Dict[str, set] = {}
+        for category, key in (
+            (_SHORT, "short_answer_triggers"),
+            (_DETAILED, "detailed_triggers"),
+            (_DEFINITION, "definition_triggers"),
+        ):
+            for phrase in config.get(key, []):
+                self._categories.setdefault(phrase.lower(), set()).add(category)
+        for phrase in self.faq:
+            self._categories.setdefault(phrase, set()).add(_FAQ)
+
+        # Longest match at each start position wins inside the trie, so also
+        # index every phrase that is a strict prefix of another at that position.
+        self._prefixed = {
+            p: [q for q in self._categories if q != p and p.startswith(q)]
+            for p in self._categories
+        }
+
+        self._scanner = re.compile("(?=(" + _trie_pattern(list(self._categories)) + "))") \
+            if self._categories else None
+
+        suffixes = [s.lower() for s in config.get("greeting_suffixes", [])]
+        suffix_part = r"(?:\s+(?:" + _trie_pattern(suffixes) + "))?" if suffixes else ""
+        self._greeting = re.compile(
+            r"^(?:" + _trie_pattern(self.greetings) + ")" + suffix_part + r"[\s!.?,]*$"
+        ) if self.greetings else None
+
+        # Exact SOC tokens (event IDs, CVEs, hashes, tool names) that BM25
+        # ranks well on its own; whole words only, unlike the triggers above.
+        lexical = []
+        terms = [t.lower() for t in config.get("lexical_terms", [])]
+        if terms:
+            lexical.append(r"\b(?:" + _trie_pattern(terms) + r")\b")
+        lexical.extend(config.get("lexical_patterns", []))
+        self._lexical = re.compile("|".join(lexical)) if lexical else None
+        # Share of the query's words those tokens must cover: "4625 4624 sysmon"
+        # is a keyword lookup, "how to triage phishing in splunk" is not
+        self.lexical_min_share = float(config.get("lexical_min_share", 0.4))
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "IntentRouter":
+        with open(path or DEFAULT_INTENTS_PATH, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def route(self, query: str) -> dict:
+        """
+        {"query", "greeting", "answer_mode", "definition", "faq_key", "faq_answer", "lexical"}
+        faq_key is only set when the query is also a definition question,
+        matching the original FAQ behaviour. lexical marks keyword-heavy
+        queries that can be answered from the BM25 index without embedding.
+        """
+        user_query = normalize_query(query)
+        greeting = bool(self._greeting and self._greeting.match(user_query))
+
+        found = set()
+        faq_keys = set()
+
+        if self._scanner and not greeting:
+            for match in self._scanner.finditer(user_query):
+                for phrase in (match.group(1), *self._prefixed[match.group(1)]):
+                    if user_query.startswith(phrase, match.start()):
+                        categories = self._categories[phrase]
+                        found |= categories
+                        if _FAQ in categories:
+                            faq_keys.add(phrase)
+
+        answer_mode = "short" if _SHORT in found else "detailed" if _DETAILED in found else "normal"
+        definition = _DEFINITION in found
+
+        faq_key = None
+        if definition and faq_keys:
+            faq_key = min(faq_keys, key=self._faq_priority.__getitem__)
+
+        lexical = bool(
+            self._lexical and not greeting and not definition
+            and self._lexical_share(user_query) >= self.lexical_min_share
+        )
+
+        return {
+            "query": user_query,
+            "greeting": greeting,
+            "answer_mode": answer_mode,
+            "definition": definition,
+            "faq_key": faq_key,
+            "faq_answer": self.faq[faq_key] if faq_key else None,
+            "lexical": lexical,
+        }
+
+    def _lexical_share(self, user_query: str) -> float:
+        """Fraction of the query's words inside lexical matches."""
+        words = len(user_query.split())
+        if not words:
+            return 0.0
+        matched = sum(len(m.group().split()) for m in self._lexical.finditer(user_query))
+        return matched / words
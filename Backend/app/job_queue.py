@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+ErrorHandler = Callable[[Exception], Awaitable[None]]
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the job queue is at capacity."""
+
+
+class JobQueue:
+    """
+    Bounded queue of background jobs drained by a fixed number of worker
+    tasks. Each job is an async callable that records its own expected
+    errors; anything it lets escape is logged, counted, and handed to the
+    job's `on_error` callback, and never kills a worker.
+    """
+
+    def __init__(self, workers: int = 4, max_queued: int = 100):
+        self.workers = workers
+        self.max_queued = max_queued
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.running = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: Job, on_error: Optional[ErrorHandler] = None):
+        if self._queue is None:
+            raise RuntimeError("JobQueue is not started")
+
+        try:
+            self._queue.put_nowait((job, on_error))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(f"Job queue is full ({self.max_queued} queued)")
+
+        self.submitted += 1
+
+    async def _worker(self):
+        while True:
+            job, on_error = await self._queue.get()
+            self.running += 1
+            try:
+                await job()
+            except Exception as e:
+                self.failed += 1
+                logger.exception("Background job failed")
+                if on_error is not None:
+                    try:
+                        await on_error(e)
+                    except Exception:
+                        logger.exception("Background job error handler failed")
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self.running,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
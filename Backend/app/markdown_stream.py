@@ -0,0 +1,49 @@
+import re
+
+# A run of n "*" loses n // 2 pairs to the "**" removal; an odd star left
+# over becomes "- " when followed by a space ("* " -> "- ").
+_STAR_RUN = re.compile(r"\*+( ?)")
+
+
+def _replace_run(match: re.Match) -> str:
+    if len(match.group(0).rstrip(" ")) % 2 == 0:
+        return match.group(1)
+    return "- " if match.group(1) else "*"
+
+
+def clean_markdown(text: str) -> str:
+    """Same result as text.strip().replace("**", "").replace("* ", "- ")."""
+    return _STAR_RUN.sub(_replace_run, text.strip())
+
+
+class MarkdownStreamCleaner:
+    """
+    Applies clean_markdown() incrementally to a token stream.
+
+    A trailing run of "*" (whose meaning depends on the next character) and
+    trailing whitespace (which strip() would drop at the end) are held back
+    until the next chunk arrives, so markers split across chunks are handled.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        buffer = self._pending + chunk
+
+        if not self._started:
+            buffer = buffer.lstrip()
+            if not buffer:
+                self._pending = ""
+                return ""
+            self._started = True
+
+        safe = buffer.rstrip().rstrip("*")
+        self._pending = buffer[len(safe):]
+        return _STAR_RUN.sub(_replace_run, safe)
+
+    def flush(self) -> str:
+        tail = self._pending.rstrip()
+        self._pending = ""
+        return _STAR_RUN.sub(_replace_run, tail)
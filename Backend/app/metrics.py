@@ -0,0 +1,245 @@
+import bisect
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Sequence
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_REQUEST_ID_HEADER_RAW = REQUEST_ID_HEADER.lower().encode("latin-1")
+
+# Latency buckets in seconds: sub-ms cache hits up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+# -------------------------
+# REQUEST ID
+# -------------------------
+def current_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+def trace_headers() -> dict:
+    """Headers that carry the current request ID to the next service."""
+    request_id = request_id_var.get()
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+
+@contextmanager
+def bind_request_id(request_id: str):
+    """Set the current request ID for code running outside the request (background jobs)."""
+    token = request_id_var.set(request_id)
+    try:
+        yield
+    finally:
+        request_id_var.reset(token)
+
+
+# -------------------------
+# METRIC TYPES
+# -------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name + _format_labels(self.labelnames, key), value
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect plus two additions."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        for key, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield self.name + "_bucket" + _format_labels(self.labelnames, key, f'le="{bound}"'), cumulative
+
+            cumulative += series[len(self.buckets)]
+            yield self.name + "_bucket" + _format_labels(self.labelnames, key, 'le="+Inf"'), cumulative
+            yield self.name + "_sum" + _format_labels(self.labelnames, key), series[-1]
+            yield self.name + "_count" + _format_labels(self.labelnames, key), cumulative
+
+
+class Gauge:
+    """
+    Read at scrape time from `fn`, which returns a number, or a dict of
+    {label value: number} when the gauge has one label.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        value = self.fn()
+        if isinstance(value, dict):
+            for label, v in value.items():
+                yield self.name + _format_labels(self.labelnames, (label,)), v
+        else:
+            yield self.name, value
+
+
+class MetricsRegistry:
+    """
+    Metrics for one service, rendered in the Prometheus text format.
+
+    Updates are plain dict operations on the event loop (no locks), so
+    recording on the hot path costs well under a microsecond. Code running on
+    worker threads hands its measurements back to the loop to record.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(f"{self.namespace}_{name}", help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(f"{self.namespace}_{name}", help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(f"{self.namespace}_{name}", help, fn, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for sample, value in metric.samples():
+                lines.append(f"{sample} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# ASGI MIDDLEWARE
+# -------------------------
+class MetricsMiddleware:
+    """
+    Times every HTTP request (streamed bodies included) and propagates the
+    request ID: taken from the incoming X-Request-ID header or generated,
+    bound to request_id_var for the duration of the request and echoed on
+    the response. It is client-controlled, so it is a trace / correlation ID
+    only, never a storage key.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so streaming responses are
+    passed through untouched.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+        )
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency, including streamed bodies", ("method", "route")
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == _REQUEST_ID_HEADER_RAW:
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or str(uuid.uuid4())
+
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if not any(name.lower() == _REQUEST_ID_HEADER_RAW for name, _ in headers):
+                    headers.append((_REQUEST_ID_HEADER_RAW, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            # Route template ("/status/{request_id}"), not the raw path, to bound cardinality
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            self.requests.inc(method=method, route=route, status=str(status))
+            self.latency.observe(time.perf_counter() - started, method=method, route=route)
+            request_id_var.reset(token)
+
+
+def instrument(app: FastAPI, registry: MetricsRegistry):
+    """Install MetricsMiddleware and a GET /metrics endpoint on `app`."""
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
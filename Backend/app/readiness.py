@@ -0,0 +1,65 @@
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+
+class Readiness:
+    """
+    Tracks whether a service can take traffic, separately from whether the
+    process is alive.
+
+    /health (liveness) should answer as soon as the app is up; /ready
+    (readiness) only once dependencies are loaded, so orchestrators keep
+    cold instances out of rotation instead of restarting them.
+    """
+
+    def __init__(self, name: str, retry_after: int = 5):
+        self.name = name
+        self.retry_after = retry_after
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    @property
+    def failed(self) -> bool:
+        return self.status == "failed"
+
+    def mark_ready(self):
+        self.status = "ready"
+        self.error = None
+        self.ready_at = time.time()
+
+    def mark_failed(self, error):
+        self.status = "failed"
+        self.error = str(error)
+
+    def check(self):
+        """Raise 503 + Retry-After unless ready; call at the top of traffic endpoints."""
+        if not self.ready:
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.name} is not ready ({self.status})" + (f": {self.error}" if self.error else ""),
+                headers={"Retry-After": str(self.retry_after)}
+            )
+
+    def describe(self) -> dict:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "startup_seconds": round(self.ready_at - self.started_at, 2) if self.ready_at else None,
+        }
+
+    def response(self) -> JSONResponse:
+        """Body for GET /ready: 200 when ready, 503 otherwise."""
+        return JSONResponse(
+            status_code=200 if self.ready else 503,
+            content=self.describe(),
+            headers=None if self.ready else {"Retry-After": str(self.retry_after)}
+        )
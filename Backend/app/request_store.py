@@ -0,0 +1,285 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, Counter
+from typing import Optional
+
+
+class RequestStore(ABC):
+    """
+    Request status + result storage for the gateway.
+
+    Records expire `ttl_seconds` after their last update and the oldest are
+    evicted beyond `max_entries`. counts() returns per-status totals from
+    counters maintained on every write, so /health never scans the store.
+
+    Methods are coroutines: a store backed by blocking I/O runs it off the
+    event loop.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    @abstractmethod
+    async def set_status(
+        self,
+        request_id: str,
+        status: str,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+        timings: Optional[dict] = None,
+    ):
+        ...
+
+    @abstractmethod
+    async def get(self, request_id: str) -> Optional[dict]:
+        """{"status", "result", "error", "timings"} or None if unknown/expired."""
+        ...
+
+    @abstractmethod
+    async def counts(self) -> dict:
+        ...
+
+    async def start(self, request_id: str, timings: Optional[dict] = None):
+        await self.set_status(request_id, "processing", timings=timings)
+
+    async def complete(self, request_id: str, result: dict, timings: Optional[dict] = None):
+        await self.set_status(request_id, "completed", result=result, timings=timings)
+
+    async def fail(self, request_id: str, error: str, timings: Optional[dict] = None):
+        await self.set_status(request_id, "failed", error=error, timings=timings)
+
+
+# -------------------------
+# IN-PROCESS
+# -------------------------
+class MemoryRequestStore(RequestStore):
+    """Single-process store. Records are kept in last-update order, so expiry pops from the front."""
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 10000):
+        super().__init__(ttl_seconds, max_entries)
+        self._records: "OrderedDict[str, dict]" = OrderedDict()
+        self._counts = Counter()
+
+    def _evict(self):
+        now = time.time()
+        while self._records:
+            request_id, record = next(iter(self._records.items()))
+            if record["expires_at"] > now and len(self._records) <= self.max_entries:
+                break
+            self._records.popitem(last=False)
+            self._counts[record["status"]] -= 1
+
+    async def set_status(
+        self,
+        request_id: str,
+        status: str,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+        timings: Optional[dict] = None,
+    ):
+        previous = self._records.pop(request_id, None)
+        if previous is not None:
+            self._counts[previous["status"]] -= 1
+
+        self._records[request_id] = {
+            "status": status,
+            "result": result,
+            "error": error,
+            "timings": timings,
+            "expires_at": time.time() + self.ttl_seconds,
+        }
+        self._counts[status] += 1
+        self._evict()
+
+    async def get(self, request_id: str) -> Optional[dict]:
+        record = self._records.get(request_id)
+        if record is None:
+            return None
+
+        if record["expires_at"] <= time.time():
+            self._evict()
+            return None
+
+        return {
+            "status": record["status"],
+            "result": record["result"],
+            "error": record["error"],
+            "timings": record["timings"],
+        }
+
+    async def counts(self) -> dict:
+        self._evict()
+        return {status: n for status, n in self._counts.items() if n}
+
+
+# -------------------------
+# SHARED (SQLITE)
+# -------------------------
+class SQLiteRequestStore(RequestStore):
+    """
+    Store shared by every uvicorn worker on the host via one SQLite file
+    (WAL mode). Per-status counters live in their own table and are updated
+    in the same transaction as the record they describe.
+
+    Every call runs on a worker thread (asyncio.to_thread): waiting up to
+    `timeout` on another worker's write lock must not stall the event loop.
+    Only set_status() writes; reads never take the write lock.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 3600, max_entries: int = 10000):
+        super().__init__(ttl_seconds, max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS requests (
+                request_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                timings TEXT,
+                expires_at REAL NOT NULL,
+                seq INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS requests_expires_at ON requests (expires_at);
+            CREATE INDEX IF NOT EXISTS requests_seq ON requests (seq);
+            CREATE TABLE IF NOT EXISTS counters (
+                status TEXT PRIMARY KEY,
+                n INTEGER NOT NULL
+            );
+        """)
+
+    def _bump(self, status: str, delta: int):
+        self._conn.execute(
+            "INSERT INTO counters (status, n) VALUES (?, ?) "
+            "ON CONFLICT(status) DO UPDATE SET n = n + excluded.n",
+            (status, delta)
+        )
+
+    def _drop(self, where: str, params: tuple):
+        rows = self._conn.execute(
+            f"SELECT status, COUNT(*) FROM requests WHERE {where} GROUP BY status", params
+        ).fetchall()
+        if not rows:
+            return
+        self._conn.execute(f"DELETE FROM requests WHERE {where}", params)
+        for status, n in rows:
+            self._bump(status, -n)
+
+    def _evict(self):
+        self._drop("expires_at <= ?", (time.time(),))
+
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(n), 0) FROM counters").fetchone()
+        excess = total - self.max_entries
+        if excess > 0:
+            self._drop(
+                "request_id IN (SELECT request_id FROM requests ORDER BY seq LIMIT ?)",
+                (excess,)
+            )
+
+    async def set_status(
+        self,
+        request_id: str,
+        status: str,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+        timings: Optional[dict] = None,
+    ):
+        await asyncio.to_thread(self._set_status, request_id, status, result, error, timings)
+
+    async def get(self, request_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, request_id)
+
+    async def counts(self) -> dict:
+        return await asyncio.to_thread(self._counts)
+
+    def _set_status(self, request_id: str, status: str, result: Optional[dict], error: Optional[str],
+                    timings: Optional[dict]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT status FROM requests WHERE request_id = ?", (request_id,)
+                ).fetchone()
+                if row is not None:
+                    self._bump(row[0], -1)
+
+                (seq,) = self._conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM requests").fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO requests (request_id, status, result, error, timings, expires_at, seq) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        request_id,
+                        status,
+                        json.dumps(result) if result is not None else None,
+                        error,
+                        json.dumps(timings) if timings is not None else None,
+                        time.time() + self.ttl_seconds,
+                        seq,
+                    )
+                )
+                self._bump(status, 1)
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _get(self, request_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, result, error, timings FROM requests WHERE request_id = ? AND expires_at > ?",
+                (request_id, time.time())
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        status, result, error, timings = row
+        return {
+            "status": status,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "timings": json.loads(timings) if timings else None,
+        }
+
+    def _counts(self) -> dict:
+        """
+        Counters minus the records that expired since the last write (which
+        evicts them): read-only, and the expired rows come off the
+        expires_at index.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                counts = dict(self._conn.execute("SELECT status, n FROM counters").fetchall())
+                expired = self._conn.execute(
+                    "SELECT status, COUNT(*) FROM requests WHERE expires_at <= ? GROUP BY status",
+                    (time.time(),)
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+
+        for status, n in expired:
+            counts[status] = counts.get(status, 0) - n
+        return {status: n for status, n in counts.items() if n > 0}
+
+
+def create_request_store(backend: str, path: str, ttl_seconds: float, max_entries: int) -> RequestStore:
+    if backend == "memory":
+        return MemoryRequestStore(ttl_seconds, max_entries)
+    if backend == "sqlite":
+        return SQLiteRequestStore(path, ttl_seconds, max_entries)
+    raise ValueError(f"Unknown REQUEST_STORE backend: {backend}")
@@ -0,0 +1,92 @@
+import hashlib
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+Match = Tuple[str, float]  # (chunk ID, score), best first
+
+
+class RetrievalCache:
+    """
+    Cache of vector-index results keyed by a hash of the quantized query
+    embedding.
+
+    Embeddings are L2-normalized, scaled by `scale` and rounded to int16
+    before hashing, so float noise from serialization or a different batch
+    composition still lands on the same key. Entries hold only (chunk ID,
+    score) pairs; content is resolved locally by the caller.
+
+    One entry serves any top_k up to its depth, and any top_k at all once it
+    is complete: the index ran out of vectors, or its last score is already
+    below `threshold`, so deeper matches would all be filtered anyway.
+    Eviction is LRU once `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries: int = 2000, threshold: float = 0.0, scale: float = 256.0,
+                 index_version: str = "1"):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.scale = scale
+        self.index_version = index_version
+
+        self._entries: "OrderedDict[str, Tuple[List[Match], bool]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def key(self, embedding) -> str:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        quantized = np.clip(np.round(vec * self.scale), -32768, 32767).astype(np.int16)
+        return hashlib.sha1(quantized.tobytes()).hexdigest()
+
+    def get(self, embedding, top_k: int) -> Optional[List[Match]]:
+        key = self.key(embedding)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        matches, complete = entry
+        if top_k > len(matches) and not complete:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return matches[:top_k]
+
+    def put(self, embedding, matches: List[Match], top_k: int):
+        """matches: the index's answer to a query for `top_k` results."""
+        complete = len(matches) < top_k or (bool(matches) and matches[-1][1] < self.threshold)
+
+        key = self.key(embedding)
+        self._entries[key] = (list(matches), complete)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, index_version: Optional[str] = None):
+        """Drop every entry; called when the playbook index is re-ingested."""
+        if index_version is not None:
+            self.index_version = index_version
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "index_version": self.index_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
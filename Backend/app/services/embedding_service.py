@@ -1,13 +1,200 @@
-from fastapi import FastAPI
-from sentence_transformers import SentenceTransformer
+from contextlib import asynccontextmanager
+from typing import List, Literal
+import asyncio
+import logging
+import os
 
-app = FastAPI()
-model = SentenceTransformer("BAAI/bge-large-en-v1.5")
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from app.batching import MicroBatcher
+from app.metrics import MetricsRegistry, instrument
+from app.embedders import create_embedder, DEFAULT_MODEL, DEFAULT_ONNX_DIR
+from app.readiness import Readiness
+from app.vector_codec import check_encoding, encode_vector
+
+logger = logging.getLogger(__name__)
+
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+EMBED_BATCH_LIMIT = int(os.getenv("EMBED_BATCH_LIMIT", "256"))
+
+# "torch" (fp32 PyTorch) or "onnx" (ONNX Runtime, int8 unless EMBED_QUANTIZE=none)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()
+EMBED_MODEL = os.getenv("EMBED_MODEL", DEFAULT_MODEL)
+EMBED_QUANTIZE = os.getenv("EMBED_QUANTIZE", "avx2").lower()
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))  # 0 = library default (all cores)
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", DEFAULT_ONNX_DIR)
+# Hugging Face download cache; preload it into the image with
+# `python -m app.embedders --preload` so startup never hits the network.
+EMBED_MODEL_CACHE = os.getenv("EMBED_MODEL_CACHE") or None
+
+# Optional smaller model for /embed (queries). It must embed into the same
+# space as EMBED_MODEL; check with `python -m app.embedders --candidate-model`.
+EMBED_QUERY_MODEL = os.getenv("EMBED_QUERY_MODEL")
+
+
+def load_embedder(model_name: str):
+    return create_embedder(
+        EMBED_BACKEND,
+        model_name,
+        quantize=None if EMBED_QUANTIZE == "none" else EMBED_QUANTIZE,
+        threads=EMBED_THREADS,
+        onnx_dir=EMBED_ONNX_DIR,
+        cache_dir=EMBED_MODEL_CACHE,
+    )
+
+
+# Loaded in the background after startup (see lifespan), so /health answers
+# immediately and /ready flips once the models can serve.
+document_embedder = None
+query_embedder = None
+readiness = Readiness("embedder")
+
+
+def load_models():
+    global document_embedder, query_embedder
+
+    documents = load_embedder(EMBED_MODEL)
+    queries = load_embedder(EMBED_QUERY_MODEL) if EMBED_QUERY_MODEL else documents
+
+    if queries.dimension != documents.dimension:
+        raise ValueError(
+            f"EMBED_QUERY_MODEL {EMBED_QUERY_MODEL} has dimension {queries.dimension}, "
+            f"but {EMBED_MODEL} has {documents.dimension}"
+        )
+
+    # Warm-up: the first encode pays for lazy allocations and kernel selection
+    queries.encode(["warm-up query"] * EMBED_MAX_BATCH_SIZE, batch_size=EMBED_MAX_BATCH_SIZE)
+    if documents is not queries:
+        documents.encode(["warm-up document"] * EMBED_MAX_BATCH_SIZE, batch_size=EMBED_MAX_BATCH_SIZE)
+
+    document_embedder, query_embedder = documents, queries
+
+
+async def load_in_background():
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, load_models)
+        readiness.mark_ready()
+        logger.info("Embedding models ready in %ss", readiness.describe()["startup_seconds"])
+    except Exception as e:
+        readiness.mark_failed(e)
+        logger.exception("Embedding model load failed")
+
+
+metrics = MetricsRegistry("embedder")
+stage_seconds = metrics.histogram("stage_seconds", "Time spent per stage", ("stage",))
+batch_size = metrics.histogram(
+    "batch_size", "Texts per model.encode call", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+metrics.gauge("batch_queue_depth", "Texts waiting for the micro-batcher", lambda: batcher.stats()["queued"])
+
+
+def encoder(get_embedder):
+    def encode_batch(texts: List[str]) -> list:
+        # float32 rows; serialized per request in whatever encoding it asked for
+        return list(get_embedder().encode(texts, batch_size=EMBED_MAX_BATCH_SIZE))
+
+    return encode_batch
+
+
+def observer(stage: str):
+    # Runs on the event loop (MicroBatcher on_batch), never on the encode thread
+    def observe_batch(texts: List[str], seconds: float):
+        stage_seconds.observe(seconds, stage=stage)
+        batch_size.observe(len(texts))
+
+    return observe_batch
+
+
+batcher = MicroBatcher(
+    encoder(lambda: query_embedder),
+    max_batch_size=EMBED_MAX_BATCH_SIZE,
+    max_wait_ms=EMBED_MAX_WAIT_MS,
+    on_batch=observer("encode"),
+)
+
+# /embed/batch uses the document model (ingestion) unless role="query"
+# (the gateway's /chat/batch embedding many questions at once)
+document_batcher = batcher if not EMBED_QUERY_MODEL else MicroBatcher(
+    encoder(lambda: document_embedder),
+    max_batch_size=EMBED_MAX_BATCH_SIZE,
+    max_wait_ms=EMBED_MAX_WAIT_MS,
+    on_batch=observer("encode_documents"),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await batcher.start()
+    if document_batcher is not batcher:
+        await document_batcher.start()
+    loader = asyncio.create_task(load_in_background())
+    yield
+    loader.cancel()
+    await batcher.stop()
+    if document_batcher is not batcher:
+        await document_batcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+instrument(app, metrics)
+
+
+class BatchEmbedRequest(BaseModel):
+    texts: List[str]
+    role: Literal["document", "query"] = "document"
+    encoding: Literal["json", "f32", "f16"] = "json"
+
+
+def requested_encoding(encoding: str) -> str:
+    try:
+        return check_encoding(encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/embed")
-def embed(data: dict):
-    return {"embedding": model.encode(data["text"]).tolist()}
+async def embed(data: dict):
+    """{"text", "encoding"?}: "f32" / "f16" return base64 (app.vector_codec), default a JSON list."""
+    readiness.check()
+    encoding = requested_encoding(data.get("encoding", "json"))
+
+    # Includes time spent waiting for the batch to fill
+    with stage_seconds.time(stage="embed"):
+        embedding = await batcher.submit(data["text"])
+    return {"embedding": encode_vector(embedding, encoding), "encoding": encoding}
+
+@app.post("/embed/batch")
+async def embed_batch(req: BatchEmbedRequest):
+    readiness.check()
+
+    if len(req.texts) > EMBED_BATCH_LIMIT:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {EMBED_BATCH_LIMIT} texts)"
+        )
+
+    if not req.texts:
+        return {"embeddings": [], "encoding": req.encoding}
+
+    target = batcher if req.role == "query" else document_batcher
+    vectors = await target.run_batch(req.texts)
+    return {"embeddings": [encode_vector(v, req.encoding) for v in vectors], "encoding": req.encoding}
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    # Liveness only: answers while models are still loading
+    return {
+        "status": "ok",
+        "readiness": readiness.describe(),
+        "embedder": {
+            "queries": query_embedder.describe(),
+            "documents": document_embedder.describe()
+        } if readiness.ready else None,
+        "batching": batcher.stats()
+    }
+
+@app.get("/ready")
+def ready():
+    return readiness.response()
@@ -0,0 +1,101 @@
+"""
+Compact wire encodings for embeddings passed between the services.
+
+A 1024-dim embedding as a JSON list is ~20 KB of text and 1024 Python
+floats to build on every hop. The compact encodings carry the raw
+little-endian buffer as base64 instead, and decode with one np.frombuffer:
+
+    json    [0.0123, -0.0456, ...]    (the fallback every service accepts)
+    f32     base64 float32, 4 bytes/dim, exact
+    f16     base64 float16, 2 bytes/dim, ~1e-3 relative error per component
+
+Senders ask for / send a compact form through an explicit "encoding"
+field, so a peer that predates it simply keeps using JSON lists.
+
+    python -m app.vector_codec          # serialization cost per encoding
+"""
+import base64
+import json
+import time
+from typing import List, Optional, Union
+
+import numpy as np
+
+ENCODINGS = ("json", "f32", "f16")
+
+_DTYPES = {"f32": np.dtype("<f4"), "f16": np.dtype("<f2")}
+
+
+def check_encoding(encoding: str) -> str:
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown embedding encoding: {encoding} (expected one of {ENCODINGS})")
+    return encoding
+
+
+def encode_vector(vector, encoding: str) -> Union[str, List[float]]:
+    """One vector in `encoding`: a base64 string, or a plain list for "json"."""
+    if encoding == "json":
+        return vector.tolist() if isinstance(vector, np.ndarray) else list(vector)
+    return base64.b64encode(np.asarray(vector, dtype=_DTYPES[encoding]).tobytes()).decode("ascii")
+
+
+def decode_vector(value: Union[str, List[float]], encoding: Optional[str] = None) -> np.ndarray:
+    """float32 vector from either form; lists are accepted whatever `encoding` says."""
+    if isinstance(value, str):
+        if encoding not in _DTYPES:
+            raise ValueError(f"A base64 embedding needs encoding f32 or f16, got {encoding}")
+        raw = np.frombuffer(base64.b64decode(value, validate=True), dtype=_DTYPES[encoding])
+        return raw if raw.dtype == np.float32 else raw.astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+# -------------------------
+# BENCHMARK
+# -------------------------
+def bench(dim: int = 1024, repeats: int = 2000) -> dict:
+    """
+    Per-request cost of one embedding crossing a JSON hop: encode into a
+    request body, json.dumps, json.loads, decode to a float32 array.
+    """
+    from pydantic import BaseModel
+
+    class ListBody(BaseModel):   # what rag_service.ChatRequest did with List[float]
+        embedding: List[float]
+
+    vector = np.random.default_rng(0).standard_normal(dim).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    report = {}
+
+    for encoding in ENCODINGS:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            body = json.dumps({"embedding": encode_vector(vector, encoding), "encoding": encoding})
+            data = json.loads(body)
+            if encoding == "json":
+                decoded = np.asarray(ListBody(embedding=data["embedding"]).embedding, dtype=np.float32)
+            else:
+                decoded = decode_vector(data["embedding"], data["encoding"])
+        elapsed_us = (time.perf_counter() - started) * 1e6 / repeats
+
+        report[encoding] = {
+            "bytes": len(body),
+            "us_per_hop": round(elapsed_us, 1),
+            "max_abs_error": float(np.max(np.abs(decoded - vector))),
+        }
+
+    baseline = report["json"]["us_per_hop"]
+    for encoding, row in report.items():
+        row["speedup"] = round(baseline / row["us_per_hop"], 1)
+
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serialization cost per embedding hop")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(json.dumps(bench(args.dim, args.repeats), indent=2))
@@ -1,11 +1,30 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
 import uuid
+import json
+import logging
+import time
 import httpx
 import os
 
+from app.http_pool import UpstreamPool
+from app.embedding_cache import EmbeddingCache
+from app.request_store import create_request_store
+from app.job_queue import JobQueue, QueueFull
+from app.concurrency import SingleFlight
+from app.intent_router import IntentRouter, canonical_query
+from app.metrics import MetricsRegistry, instrument, current_request_id, bind_request_id
+from app.readiness import Readiness
+from app.vector_codec import check_encoding, decode_vector, encode_vector
+
+logger = logging.getLogger(__name__)
+
 # -------------------------
 # ENV
 # -------------------------
@@ -14,13 +33,124 @@ load_dotenv()
 EMBEDDING_API_URL = os.getenv("EMBEDDING_API_URL")
 RETRIEVAL_API_URL = os.getenv("RETRIEVAL_API_URL")
 
-if not EMBEDDING_API_URL or not RETRIEVAL_API_URL:
-    raise RuntimeError("Required environment variables are missing")
+# Missing upstream URLs fail readiness (see lifespan) instead of the import,
+# so the process still starts and reports what is wrong on /ready
+MISSING_ENV = [
+    name for name, value in (("EMBEDDING_API_URL", EMBEDDING_API_URL), ("RETRIEVAL_API_URL", RETRIEVAL_API_URL))
+    if not value
+]
+
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "60"))
+RETRIEVAL_TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT", "180"))
+
+# rag_service exposes the streaming variant next to /chat
+RETRIEVAL_STREAM_URL = os.getenv("RETRIEVAL_STREAM_URL") or (
+    RETRIEVAL_API_URL.rstrip("/") + "/stream" if RETRIEVAL_API_URL else None
+)
+# ...and the embedding service /embed/batch next to /embed
+EMBEDDING_BATCH_URL = os.getenv("EMBEDDING_BATCH_URL") or (
+    EMBEDDING_API_URL.rstrip("/") + "/batch" if EMBEDDING_API_URL else None
+)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "5000"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "86400"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")  # optional, enables persistence
+
+# "memory" (per-process) or "sqlite" (shared by all workers on the host)
+REQUEST_STORE = os.getenv("REQUEST_STORE", "memory").lower()
+REQUEST_STORE_PATH = os.getenv("REQUEST_STORE_PATH", "data/request_store.db")
+REQUEST_TTL = float(os.getenv("REQUEST_TTL", "3600"))
+REQUEST_MAX_ENTRIES = int(os.getenv("REQUEST_MAX_ENTRIES", "10000"))
+
+# Background workers for /chat/async
+ASYNC_WORKERS = int(os.getenv("ASYNC_WORKERS", "4"))
+ASYNC_MAX_QUEUED = int(os.getenv("ASYNC_MAX_QUEUED", "100"))
+
+INTENTS_PATH = os.getenv("INTENTS_PATH")  # defaults to app/intents.json, shared with rag_service
+
+# Keyword-heavy queries (event IDs, CVEs, tool names) go to rag_service
+# without an embedding and are answered from its BM25 index alone. A
+# rag_service without one (HYBRID_RETRIEVAL=0) turns such a query down with
+# 400; it is then retried with an embedding and the fast path switched off
+# (see lexical_fast_path_unavailable)
+LEXICAL_FAST_PATH = os.getenv("LEXICAL_FAST_PATH", "1") == "1"
+
+# Embedding wire format (app.vector_codec): asked of the embedding service,
+# and sent on to rag_service. "json" keeps plain lists, e.g. for a peer that
+# predates the compact encodings; an embedder that ignores the request
+# still answers with a list, which is always accepted.
+EMBEDDING_ENCODING = check_encoding(os.getenv("EMBEDDING_ENCODING", "f32"))
+RETRIEVAL_EMBEDDING_ENCODING = check_encoding(os.getenv("RETRIEVAL_EMBEDDING_ENCODING", "f32"))
+
+# Concurrent identical questions (same normalized text, top_k and answer
+# mode) attach to one in-flight pipeline run instead of each calling upstream
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "1") == "1"
+
+# /chat/batch: items per call, and retrieval + generation calls in flight per batch
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "200"))
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+
+# -------------------------
+# EMBEDDING CACHE
+# -------------------------
+embedding_cache = EmbeddingCache(
+    max_entries=EMBEDDING_CACHE_SIZE,
+    ttl_seconds=EMBEDDING_CACHE_TTL,
+    path=EMBEDDING_CACHE_PATH
+)
+
+# -------------------------
+# HTTP POOLS
+# -------------------------
+embedding_pool = UpstreamPool("embedding", timeout=EMBEDDING_TIMEOUT)
+retrieval_pool = UpstreamPool("retrieval", timeout=RETRIEVAL_TIMEOUT)
+
+readiness = Readiness("gateway")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    embedding_cache.load()
+    await embedding_pool.open()
+    await retrieval_pool.open()
+    await job_queue.start()
+    if MISSING_ENV:
+        readiness.mark_failed(f"Required environment variables are missing: {', '.join(MISSING_ENV)}")
+        logger.error(readiness.error)
+    else:
+        readiness.mark_ready()
+    yield
+    await job_queue.stop()
+    await embedding_pool.close()
+    await retrieval_pool.close()
+    embedding_cache.save()
 
 # -------------------------
 # APP
 # -------------------------
-app = FastAPI(title="Knowledge Query Backend API")
+app = FastAPI(title="Knowledge Query Backend API", lifespan=lifespan)
+
+# -------------------------
+# METRICS (/metrics, X-Request-ID propagation)
+# -------------------------
+metrics = MetricsRegistry("gateway")
+stage_seconds = metrics.histogram("stage_seconds", "Time spent per pipeline stage", ("stage",))
+answers_total = metrics.counter("answers_total", "Answers by path taken", ("path",))
+metrics.gauge("upstream_in_use", "In-flight requests per upstream", lambda: {
+    "embedding": embedding_pool.in_use,
+    "retrieval": retrieval_pool.in_use
+}, ("upstream",))
+metrics.gauge("embedding_cache_lookups", "Embedding cache lookups by result", lambda: {
+    "hit": embedding_cache.hits,
+    "miss": embedding_cache.misses
+}, ("result",))
+metrics.gauge("coalesced_requests", "/chat pipeline runs by role: executed, or attached to one in flight", lambda: {
+    "executed": in_flight.leaders,
+    "coalesced": in_flight.coalesced
+}, ("role",))
+metrics.gauge("job_queue_depth", "Queued /chat/async jobs", lambda: job_queue.stats()["queued"])
+metrics.gauge("job_queue_running", "Running /chat/async jobs", lambda: job_queue.running)
+
+instrument(app, metrics)
 
 # -------------------------
 # CORS
@@ -35,11 +165,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-#---------------------
-# TEMP STORE
 # -------------------------
-RESULT_STORE = {}
-REQUEST_STATUS = {}
+# REQUEST STORE
+# -------------------------
+request_store = create_request_store(
+    REQUEST_STORE,
+    REQUEST_STORE_PATH,
+    ttl_seconds=REQUEST_TTL,
+    max_entries=REQUEST_MAX_ENTRIES
+)
+
+job_queue = JobQueue(workers=ASYNC_WORKERS, max_queued=ASYNC_MAX_QUEUED)
+
+# -------------------------
+# INTENT ROUTER
+# -------------------------
+router = IntentRouter.from_file(INTENTS_PATH)
+
+def answer_locally(intent: dict):
+    """Greetings and FAQ definitions are answered here, before any embedding call."""
+    if intent["greeting"]:
+        final_answer, model = router.greeting_reply, "fallback-greeting"
+    elif intent["faq_key"]:
+        final_answer, model = intent["faq_answer"], "fallback-faq"
+    else:
+        return None
+
+    return {
+        "final_answer": final_answer,
+        "contexts_used": [],
+        "relevance_scores": [],
+        "model": model,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+rag_answers_lexically = True
+
+def needs_embedding(intent: dict) -> bool:
+    return not (LEXICAL_FAST_PATH and rag_answers_lexically and intent["lexical"])
+
+def lexical_fast_path_unavailable(detail: str):
+    """rag_service cannot answer without an embedding: embed every query from now on."""
+    global rag_answers_lexically
+    if rag_answers_lexically:
+        rag_answers_lexically = False
+        logger.warning("Knowledge base cannot answer without an embedding (%s); lexical fast path disabled", detail)
+
+# -------------------------
+# IN-FLIGHT COALESCING
+# -------------------------
+in_flight = SingleFlight("chat")
+
+def coalesce_key(req, intent: dict):
+    """Requests that would produce the same answer; a unique key when coalescing is off."""
+    if not COALESCE_REQUESTS:
+        return object()
+    return (canonical_query(req.text), req.top_k, intent["answer_mode"], needs_embedding(intent))
 
 # -------------------------
 # MODELS
@@ -56,18 +237,32 @@ class ChatResponse(BaseModel):
     model: str
     timestamp: str
 
+class ChatBatchRequest(BaseModel):
+    items: list[ChatRequest]
+    stream: bool = False
+
 # -------------------------
 # DATABASE / KB QUERY
 # -------------------------
 async def query_knowledge_base(payload: dict) -> dict:
     try:
-        async with httpx.AsyncClient(timeout=180.0) as client:
-            response = await client.post(
-                RETRIEVAL_API_URL,
-                json=payload
+        response = await retrieval_pool.post(
+            RETRIEVAL_API_URL,
+            json=payload
+        )
+        response.raise_for_status()
+        return response.json()
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            raise HTTPException(
+                status_code=429,
+                detail="Knowledge base is busy, retry later",
+                headers={"Retry-After": e.response.headers.get("Retry-After", "1")}
             )
-            response.raise_for_status()
-            return response.json()
+        if e.response.status_code == 400:
+            raise HTTPException(status_code=400, detail=f"Knowledge base rejected the query: {e.response.text}")
+        raise HTTPException(status_code=500, detail=f"Knowledge base error: {str(e)}")
 
     except httpx.ReadTimeout:
         raise HTTPException(status_code=504, detail="Knowledge base query timed out")
@@ -79,51 +274,227 @@ async def query_knowledge_base(payload: dict) -> dict:
         raise HTTPException(status_code=500, detail=f"Knowledge base error: {str(e)}")
 
 # -------------------------
-# MAIN QUERY ENDPOINT
+# EMBEDDING
 # -------------------------
-@app.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
-    if not req.text.strip():
-        raise HTTPException(status_code=400, detail="Input text cannot be empty")
+def embedding_error(e: Exception) -> HTTPException:
+    """Map an embedding service failure; overload (429 / 503) keeps its status and Retry-After."""
+    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code in (429, 503):
+        return HTTPException(
+            status_code=e.response.status_code,
+            detail="Embedding service is busy, retry later" if e.response.status_code == 429
+            else "Embedding service is not ready, retry later",
+            headers={"Retry-After": e.response.headers.get("Retry-After", "1")}
+        )
 
-    request_id = str(uuid.uuid4())
-    REQUEST_STATUS[request_id] = "processing"
+    if isinstance(e, httpx.ReadTimeout):
+        return HTTPException(status_code=504, detail="Embedding service timed out")
+
+    if isinstance(e, httpx.ConnectError):
+        return HTTPException(status_code=503, detail="Embedding service unavailable")
+
+    return HTTPException(status_code=500, detail=f"Embedding service error: {str(e)}")
+
+async def get_embedding(text: str):
+    """float32 array (or a list, for entries loaded from the persisted cache)."""
+    cached = embedding_cache.get(text)
+    if cached is not None:
+        return cached
 
-    # 1️⃣ Call embedding service
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            embed_response = await client.post(
-                EMBEDDING_API_URL,
-                json={"text": req.text}
-            )
-            embed_response.raise_for_status()
-            embedding = embed_response.json().get("embedding")
+        embed_response = await embedding_pool.post(
+            EMBEDDING_API_URL,
+            json={"text": text, "encoding": EMBEDDING_ENCODING}
+        )
+        embed_response.raise_for_status()
+        body = embed_response.json()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Embedding service error: {str(e)}")
+        raise embedding_error(e)
 
-    if not embedding:
+    if not body.get("embedding"):
         raise HTTPException(status_code=500, detail="Failed to generate embedding")
 
-    # 2️⃣ Build retrieval payload
-    payload = {
+    try:
+        embedding = decode_vector(body["embedding"], body.get("encoding"))
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Embedding service error: {str(e)}")
+
+    embedding_cache.put(text, embedding)
+    return embedding
+
+async def get_embeddings(texts: list[str]) -> dict:
+    """{text: embedding} for the distinct texts: cache hits, plus one /embed/batch call for the rest."""
+    embeddings = {}
+    missing = []
+
+    for text in dict.fromkeys(texts):
+        cached = embedding_cache.get(text)
+        if cached is not None:
+            embeddings[text] = cached
+        else:
+            missing.append(text)
+
+    if not missing:
+        return embeddings
+
+    try:
+        embed_response = await embedding_pool.post(
+            EMBEDDING_BATCH_URL,
+            json={"texts": missing, "role": "query", "encoding": EMBEDDING_ENCODING}
+        )
+        embed_response.raise_for_status()
+        body = embed_response.json()
+        vectors = [decode_vector(v, body.get("encoding")) for v in body.get("embeddings") or []]
+    except Exception as e:
+        raise embedding_error(e)
+
+    if len(vectors) != len(missing):
+        raise HTTPException(status_code=500, detail="Failed to generate embeddings")
+
+    for text, embedding in zip(missing, vectors):
+        embedding_cache.put(text, embedding)
+        embeddings[text] = embedding
+
+    return embeddings
+
+# -------------------------
+# QUERY PIPELINE
+# -------------------------
+def new_request_id() -> str:
+    """
+    request_store key for a new request, always generated here: the client's
+    X-Request-ID (current_request_id) is only a trace ID, logged against the
+    key and forwarded upstream, so clients can neither collide on nor guess
+    each other's /status entries.
+    """
+    request_id = str(uuid.uuid4())
+    logger.info("request %s trace %s", request_id, current_request_id())
+    return request_id
+
+def retrieval_payload(request_id: str, req: ChatRequest, embedding) -> dict:
+    return {
         "request_id": request_id,
-        "embedding": embedding,
+        "embedding": encode_vector(embedding, RETRIEVAL_EMBEDDING_ENCODING) if embedding is not None else None,
+        "embedding_encoding": RETRIEVAL_EMBEDDING_ENCODING,
         "top_k": req.top_k,
         "query": req.text   # 🔥 CRITICAL FIX — Send user question to RAG
     }
 
+def elapsed_ms(since: float) -> float:
+    return round((time.time() - since) * 1000, 2)
+
+STAGE_TIMINGS = {
+    "queue_wait_ms": "queue_wait",
+    "route_ms": "route",
+    "embedding_ms": "embed",
+    "retrieval_ms": "retrieve",
+    "coalesced_ms": "coalesced_wait",
+    "total_ms": "total",
+}
+
+def observe_timings(timings: dict):
+    for key, stage in STAGE_TIMINGS.items():
+        if key in timings:
+            stage_seconds.observe(timings[key] / 1000, stage=stage)
+
+async def embed_query(req: ChatRequest, timings: dict):
+    stage = time.time()
+    embedding = await get_embedding(req.text)
+    timings["embedding_ms"] = elapsed_ms(stage)
+    return embedding
+
+async def answer_remotely(request_id: str, req: ChatRequest, intent: dict, embedding, timings: dict) -> dict:
+    """The part of the pipeline that costs upstream calls, shared by coalesced requests."""
+    # 1️⃣ Call embedding service (served from cache for repeated questions;
+    #    skipped for keyword queries, which rag_service answers via BM25)
+    if not needs_embedding(intent):
+        embedding = None
+    elif embedding is None:
+        embedding = await embed_query(req, timings)
+
+    # 2️⃣ Build retrieval payload
+    payload = retrieval_payload(request_id, req, embedding)
+
     # 3️⃣ Call retrieval service
-    result = await query_knowledge_base(payload)
+    stage = time.time()
+    try:
+        result = await query_knowledge_base(payload)
+    except HTTPException as e:
+        if embedding is not None or e.status_code != 400:
+            raise
+        # No lexical index on rag_service's side: retry with an embedding
+        lexical_fast_path_unavailable(e.detail)
+        payload = retrieval_payload(request_id, req, await embed_query(req, timings))
+        stage = time.time()
+        result = await query_knowledge_base(payload)
+    timings["retrieval_ms"] = elapsed_ms(stage)
+
+    return result
+
+async def run_chat_pipeline(request_id: str, req: ChatRequest, timings: dict, embedding: list[float] = None) -> dict:
+    """
+    route → embed → retrieve → store; records status and stage timings as it goes.
+    `embedding` skips the embed step when the caller already has one (/chat/batch).
+    """
+    timings["started_at"] = time.time()
+    if "queued_at" in timings:
+        timings["queue_wait_ms"] = round((timings["started_at"] - timings["queued_at"]) * 1000, 2)
+    await request_store.start(request_id, timings=timings)
+
+    # 0️⃣ Greetings / FAQ hits never pay for an embedding
+    stage = time.time()
+    intent = router.route(req.text)
+    result = answer_locally(intent)
+    timings["route_ms"] = elapsed_ms(stage)
+
+    if result is None:
+        try:
+            # Identical questions already in flight share one embed + retrieval
+            stage = time.time()
+            result, coalesced = await in_flight.run(
+                coalesce_key(req, intent),
+                lambda: answer_remotely(request_id, req, intent, embedding, timings)
+            )
+            if coalesced:
+                timings["coalesced_ms"] = elapsed_ms(stage)
+
+        except HTTPException as e:
+            timings["finished_at"] = time.time()
+            timings["total_ms"] = elapsed_ms(timings["started_at"])
+            observe_timings(timings)
+            answers_total.inc(path="error")
+            await request_store.fail(request_id, str(e.detail), timings=timings)
+            raise
+
+        answers_total.inc(path="coalesced" if coalesced else "dense" if needs_embedding(intent) else "lexical")
+    else:
+        answers_total.inc(path=result["model"])
+
+    timings["finished_at"] = time.time()
+    timings["total_ms"] = elapsed_ms(timings["started_at"])
+    observe_timings(timings)
 
     # 4️⃣ Store result
-    RESULT_STORE[request_id] = {
+    await request_store.complete(request_id, {
         "final_answer": result.get("final_answer", ""),
         "contexts": result.get("contexts_used", []),
         "model": result.get("model", ""),
         "timestamp": result.get("timestamp", "")
-    }
+    }, timings=timings)
+
+    return result
+
+# -------------------------
+# MAIN QUERY ENDPOINT
+# -------------------------
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest):
+    readiness.check()
+
+    if not req.text.strip():
+        raise HTTPException(status_code=400, detail="Input text cannot be empty")
 
-    REQUEST_STATUS[request_id] = "completed"
+    request_id = new_request_id()
+    result = await run_chat_pipeline(request_id, req, {})
 
     return ChatResponse(
         request_id=request_id,
@@ -134,23 +505,296 @@ async def chat(req: ChatRequest):
         timestamp=result.get("timestamp", "")
     )
 
+# -------------------------
+# ASYNC JOB ENDPOINT
+# -------------------------
+@app.post("/chat/async", status_code=202)
+async def chat_async(req: ChatRequest):
+    """Queue the pipeline on a background worker and return immediately; poll /status."""
+    readiness.check()
+
+    if not req.text.strip():
+        raise HTTPException(status_code=400, detail="Input text cannot be empty")
+
+    request_id = new_request_id()
+    timings = {"queued_at": time.time()}
+    trace_id = current_request_id()
+
+    async def job():
+        try:
+            # Worker tasks outlive the request; re-bind its trace ID for upstream calls
+            with bind_request_id(trace_id):
+                await run_chat_pipeline(request_id, req, timings)
+        except HTTPException:
+            pass  # already recorded as failed
+
+    async def job_failed(e: Exception):
+        # An error run_chat_pipeline did not record would leave /status at "processing"
+        await request_store.fail(request_id, f"Background job failed: {e}", timings=timings)
+
+    await request_store.set_status(request_id, "queued", timings=timings)
+
+    try:
+        job_queue.submit(job, on_error=job_failed)
+    except QueueFull as e:
+        await request_store.fail(request_id, str(e), timings=timings)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+    return {"request_id": request_id, "status": "queued"}
+
+# -------------------------
+# STREAMING QUERY ENDPOINT
+# -------------------------
+async def relay_stream(request_id: str, payload: dict):
+    """Forward rag_service NDJSON events and record the final result."""
+    async def error_event(detail: str) -> str:
+        await request_store.fail(request_id, detail)
+        return json.dumps({"type": "error", "request_id": request_id, "detail": detail}) + "\n"
+
+    try:
+        while True:
+            async with retrieval_pool.stream("POST", RETRIEVAL_STREAM_URL, json=payload) as response:
+                if response.status_code == 400 and payload["embedding"] is None:
+                    # No lexical index on rag_service's side: retry with an embedding
+                    await response.aread()
+                    lexical_fast_path_unavailable(response.text)
+                    embedding = await get_embedding(payload["query"])
+                    payload = {**payload, "embedding": encode_vector(embedding, RETRIEVAL_EMBEDDING_ENCODING)}
+                    continue
+
+                if response.status_code != 200:
+                    await response.aread()
+                    yield await error_event(f"Knowledge base error: HTTP {response.status_code}")
+                    return
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+
+                    event = json.loads(line)
+
+                    if event.get("type") == "done":
+                        await request_store.complete(request_id, {
+                            "final_answer": event.get("final_answer", ""),
+                            "contexts": event.get("contexts_used", []),
+                            "model": event.get("model", ""),
+                            "timestamp": event.get("timestamp", "")
+                        })
+                    elif event.get("type") == "error":
+                        await request_store.fail(request_id, event.get("detail", ""))
+
+                    yield line + "\n"
+                return
+
+    except HTTPException as e:
+        yield await error_event(str(e.detail))
+
+    except httpx.ReadTimeout:
+        yield await error_event("Knowledge base query timed out")
+
+    except httpx.ConnectError:
+        yield await error_event("Knowledge base service unavailable")
+
+    except Exception as e:
+        yield await error_event(f"Knowledge base error: {str(e)}")
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    readiness.check()
+
+    if not req.text.strip():
+        raise HTTPException(status_code=400, detail="Input text cannot be empty")
+
+    request_id = new_request_id()
+    await request_store.start(request_id)
+
+    with stage_seconds.time(stage="route"):
+        intent = router.route(req.text)
+        local = answer_locally(intent)
+
+    if local is not None:
+        answers_total.inc(path=local["model"])
+        await request_store.complete(request_id, {
+            "final_answer": local["final_answer"],
+            "contexts": [],
+            "model": local["model"],
+            "timestamp": local["timestamp"]
+        })
+        events = [
+            {"type": "meta", "request_id": request_id, "contexts_used": [], "relevance_scores": [], "model": local["model"]},
+            {"type": "token", "text": local["final_answer"]},
+            {"type": "done", "request_id": request_id, "status": "completed", **local}
+        ]
+        return StreamingResponse(
+            iter([json.dumps(e) + "\n" for e in events]),
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        with stage_seconds.time(stage="embed"):
+            embedding = await get_embedding(req.text) if needs_embedding(intent) else None
+    except HTTPException as e:
+        answers_total.inc(path="error")
+        await request_store.fail(request_id, str(e.detail))
+        raise
+
+    answers_total.inc(path="dense-stream" if embedding is not None else "lexical-stream")
+
+    payload = retrieval_payload(request_id, req, embedding)
+
+    return StreamingResponse(
+        relay_stream(request_id, payload),
+        media_type="application/x-ndjson"
+    )
+
+# -------------------------
+# BATCH QUERY ENDPOINT
+# -------------------------
+async def failed_item(request_id: str, status_code: int, detail: str) -> dict:
+    await request_store.fail(request_id, detail)
+    answers_total.inc(path="error")
+    return {"request_id": request_id, "status": "failed", "status_code": status_code, "error": detail}
+
+async def answer_batch_item(request_id: str, req: ChatRequest, embedding, semaphore: asyncio.Semaphore) -> dict:
+    async with semaphore:
+        try:
+            result = await run_chat_pipeline(request_id, req, {}, embedding=embedding)
+        except HTTPException as e:
+            # run_chat_pipeline already recorded the failure
+            return {"request_id": request_id, "status": "failed", "status_code": e.status_code, "error": str(e.detail)}
+
+    return {
+        "request_id": request_id,
+        "status": "completed",
+        "final_answer": result.get("final_answer", ""),
+        "contexts_used": result.get("contexts_used", []),
+        "model": result.get("model", ""),
+        "timestamp": result.get("timestamp", "")
+    }
+
+@app.post("/chat/batch")
+async def chat_batch(batch: ChatBatchRequest):
+    """
+    Answer many queries in one call (e.g. a SOAR alert queue).
+
+    Identical (text, top_k) items are answered once; the texts that need an
+    embedding go to the embedding service in one /embed/batch call; then
+    retrieval + generation fan out with at most CHAT_BATCH_CONCURRENCY in
+    flight. Items fail individually (status "failed" with status_code and
+    error); only an invalid batch fails as a whole. Each answered item gets
+    a request ID "<batch_id>:<index>" that /status/{request_id} also knows.
+    With stream=true, results are NDJSON "item" events in completion order,
+    then a "done" event.
+    """
+    readiness.check()
+
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+
+    if len(batch.items) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {CHAT_BATCH_MAX_ITEMS} items)")
+
+    batch_id = new_request_id()
+
+    groups: dict[tuple, list[int]] = {}
+    for index, req in enumerate(batch.items):
+        groups.setdefault((req.text, req.top_k), []).append(index)
+
+    # Only texts that will reach retrieval with a vector get embedded
+    intents = {text: router.route(text) for text, _ in groups if text.strip()}
+    embed_texts = {
+        text for text, intent in intents.items()
+        if not intent["greeting"] and not intent["faq_key"] and needs_embedding(intent)
+    }
+
+    embeddings, embed_error = {}, None
+    if embed_texts:
+        try:
+            with stage_seconds.time(stage="embed_batch"):
+                embeddings = await get_embeddings(list(embed_texts))
+        except HTTPException as e:
+            embed_error = e
+
+    semaphore = asyncio.Semaphore(CHAT_BATCH_CONCURRENCY)
+
+    async def answer_group(indices: list[int]):
+        req = batch.items[indices[0]]
+        request_id = f"{batch_id}:{indices[0]}"
+
+        if not req.text.strip():
+            return indices, await failed_item(request_id, 400, "Input text cannot be empty")
+
+        if embed_error is not None and req.text in embed_texts:
+            return indices, await failed_item(request_id, embed_error.status_code, str(embed_error.detail))
+
+        return indices, await answer_batch_item(request_id, req, embeddings.get(req.text), semaphore)
+
+    def batch_items(indices: list[int], item: dict) -> list[dict]:
+        return [
+            {"index": index, **item, **({"duplicate_of": indices[0]} if index != indices[0] else {})}
+            for index in indices
+        ]
+
+    tasks = [asyncio.create_task(answer_group(indices)) for indices in groups.values()]
+
+    if batch.stream:
+        async def events():
+            completed = failed = 0
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    indices, item = await next_done
+                    for entry in batch_items(indices, item):
+                        if entry["status"] == "completed":
+                            completed += 1
+                        else:
+                            failed += 1
+                        yield json.dumps({"type": "item", **entry}) + "\n"
+                yield json.dumps({"type": "done", "batch_id": batch_id, "completed": completed, "failed": failed}) + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    results = [None] * len(batch.items)
+    for indices, item in await asyncio.gather(*tasks):
+        for entry in batch_items(indices, item):
+            results[entry["index"]] = entry
+
+    failed = sum(1 for r in results if r["status"] == "failed")
+
+    return {
+        "batch_id": batch_id,
+        "status": "completed" if not failed else "partial" if failed < len(results) else "failed",
+        "completed": len(results) - failed,
+        "failed": failed,
+        "results": results
+    }
+
 # -------------------------
 # STATUS CHECK
 # -------------------------
 @app.get("/status/{request_id}")
 async def check_status(request_id: str):
-    status = REQUEST_STATUS.get(request_id)
+    record = await request_store.get(request_id)
 
-    if not status:
+    if not record:
         raise HTTPException(status_code=404, detail="Request ID not found")
 
+    status = record["status"]
+
     response = {
         "request_id": request_id,
         "status": status
     }
 
     if status == "completed":
-        response["result"] = RESULT_STORE.get(request_id)
+        response["result"] = record["result"]
+    elif status == "failed":
+        response["error"] = record["error"]
+
+    if record.get("timings"):
+        response["timings"] = record["timings"]
 
     return response
 
@@ -159,14 +803,28 @@ async def check_status(request_id: str):
 # -------------------------
 @app.get("/health")
 async def health():
+    counts = await request_store.counts()
+
     return {
         "status": "healthy",
-        "active_requests": len(
-            [v for v in REQUEST_STATUS.values() if v == "processing"]
-        ),
-        "completed_requests": len(RESULT_STORE)
+        "readiness": readiness.describe(),
+        "queued_requests": counts.get("queued", 0),
+        "active_requests": counts.get("processing", 0),
+        "completed_requests": counts.get("completed", 0),
+        "failed_requests": counts.get("failed", 0),
+        "embedding_cache": embedding_cache.stats(),
+        "job_queue": job_queue.stats(),
+        "coalescing": in_flight.stats(),
+        "http_pools": {
+            "embedding": embedding_pool.metrics(),
+            "retrieval": retrieval_pool.metrics()
+        }
     }
 
+@app.get("/ready")
+async def ready():
+    return readiness.response()
+
 # -------------------------
 # ENTRYPOINT
 # -------------------------
@@ -1,12 +1,35 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
-from pinecone import Pinecone
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, PrivateAttr, model_validator
+from typing import List, Optional, Union
 from dotenv import load_dotenv
 import os
+import sys
 from datetime import datetime
+import asyncio
+import json
+import time
+import numpy as np
 from groq import Groq
 
+from app.answer_cache import SemanticAnswerCache
+from app.markdown_stream import MarkdownStreamCleaner
+from app.concurrency import DependencyLimiter, DependencySaturated, SingleFlight
+from app.intent_router import IntentRouter, canonical_query
+from app.retrieval_cache import RetrievalCache
+from app.metrics import MetricsRegistry, instrument, current_request_id
+from app.vector_codec import decode_vector
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+from chunker import estimate_tokens
+from vector_store import ChunkStore, LocalVectorStore, PineconeStore
+from index_format import MappedVectorStore, MODEL_NAME
+from ann_index import IVFIndex
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from app.context_packer import ContextPacker
+
 # ===============================
 # ENV
 # ===============================
@@ -14,9 +37,62 @@ load_dotenv()
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "playbook")
+PINECONE_HOST = os.getenv("PINECONE_HOST")  # optional data-plane host, skips the index lookup
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-if not PINECONE_API_KEY:
+# "pinecone" (remote), "local" (in-process NumPy index over data/chunks),
+# "mmap" (memory-mapped binary index built by src/index_format.py)
+# or "ann" (IVF sidecar built by src/ann_index.py over that binary index)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone").lower()
+LOCAL_CHUNKS_DIR = os.getenv("LOCAL_CHUNKS_DIR", os.path.join(REPO_ROOT, "data", "chunks"))
+LOCAL_EMBEDDINGS_DIR = os.getenv("LOCAL_EMBEDDINGS_DIR", os.path.join(REPO_ROOT, "data", "embeddings"))
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", os.path.join(REPO_ROOT, "data", "index", "playbooks.idx"))
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH", os.path.splitext(LOCAL_INDEX_PATH)[0] + ".ivf")
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))  # IVF lists scanned per query: recall vs latency
+ANN_REFINE = int(os.getenv("ANN_REFINE", "4"))   # top_k * refine candidates re-scored exactly (pq wants ~16)
+ANN_THREADS = int(os.getenv("ANN_THREADS", "0"))  # batched search threads, 0 = all cores
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.97"))
+INDEX_VERSION = os.getenv("INDEX_VERSION", "1")
+
+# Blocking Pinecone / Groq SDK calls run on bounded per-dependency thread
+# pools; callers beyond max concurrency + queue get 429 with Retry-After.
+VECTOR_MAX_CONCURRENCY = int(os.getenv("VECTOR_MAX_CONCURRENCY", "16"))
+VECTOR_MAX_QUEUE = int(os.getenv("VECTOR_MAX_QUEUE", "64"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "2"))
+
+INTENTS_PATH = os.getenv("INTENTS_PATH")  # defaults to app/intents.json
+
+# Hybrid retrieval: BM25 over data/chunks fused with dense results (RRF).
+# Requests without an embedding are answered from BM25 alone.
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(REPO_ROOT, "data", "index", "lexical.json"))
+LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "20"))
+LEXICAL_MIN_SCORE = float(os.getenv("LEXICAL_MIN_SCORE", "1.0"))  # absolute BM25 floor
+LEXICAL_MIN_RATIO = float(os.getenv("LEXICAL_MIN_RATIO", "0.5"))  # of the best BM25 score
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Concurrent identical /chat requests (same normalized query, top_k, answer
+# mode and embedding/lexical path) share one pipeline run
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "1") == "1"
+
+# Prompt context: chunks packed in score order into an estimated token budget
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+CONTEXT_MAX_CHUNKS = int(os.getenv("CONTEXT_MAX_CHUNKS", "4"))
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "512"))
+
+# Vector query results (chunk IDs + scores) cached per quantized embedding;
+# one entry of RETRIEVAL_CACHE_DEPTH matches serves any smaller top_k
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2000"))
+RETRIEVAL_CACHE_DEPTH = int(os.getenv("RETRIEVAL_CACHE_DEPTH", "10"))
+RETRIEVAL_CACHE_SCALE = float(os.getenv("RETRIEVAL_CACHE_SCALE", "256"))
+
+if VECTOR_STORE not in ("pinecone", "local", "mmap", "ann"):
+    raise ValueError(f"Unknown VECTOR_STORE: {VECTOR_STORE}")
+if VECTOR_STORE == "pinecone" and not PINECONE_API_KEY:
     raise ValueError("Missing PINECONE_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("Missing GROQ_API_KEY")
@@ -26,20 +102,132 @@ if not GROQ_API_KEY:
 # ===============================
 app = FastAPI(title="RAG Service with Groq")
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(INDEX_NAME)
+# The binary index under mmap / ann
+mapped_index = None
+
+if VECTOR_STORE == "local":
+    index = LocalVectorStore.from_chunks_dir(LOCAL_CHUNKS_DIR, LOCAL_EMBEDDINGS_DIR)
+elif VECTOR_STORE == "mmap":
+    index = mapped_index = MappedVectorStore(LOCAL_INDEX_PATH, expected_model=MODEL_NAME)
+elif VECTOR_STORE == "ann":
+    mapped_index = MappedVectorStore(LOCAL_INDEX_PATH, expected_model=MODEL_NAME)
+    index = IVFIndex.load(ANN_INDEX_PATH, mapped_index, nprobe=ANN_NPROBE, refine=ANN_REFINE, workers=ANN_THREADS)
+else:
+    index = PineconeStore(PINECONE_API_KEY, INDEX_NAME, host=PINECONE_HOST)
+
+# Chunk content by ID. Pinecone queries skip include_metadata and resolve
+# here, from data/chunks; the local engines keep each chunk's metadata next
+# to its vector and return it with every match at no extra cost, so their
+# store starts empty and holds what queries have returned.
+INDEX_HAS_METADATA = VECTOR_STORE != "pinecone"
+chunk_store = ChunkStore() if INDEX_HAS_METADATA else ChunkStore.from_chunks_dir(LOCAL_CHUNKS_DIR)
+
+# The binary index's BM25 is built from its own records, once per index
+# file (keyed by its checksum): both retrievers then search the same chunks
+# and startup parses no chunk JSON.
+if not HYBRID_RETRIEVAL:
+    lexical_index = None
+elif mapped_index is not None:
+    lexical_index = BM25Index.load_for_source(
+        LEXICAL_INDEX_PATH, f"idx:{mapped_index.header['checksum']}", mapped_index.records
+    )
+else:
+    lexical_index = BM25Index.load_or_build(LEXICAL_INDEX_PATH, LOCAL_CHUNKS_DIR)
 
 client = Groq(api_key=GROQ_API_KEY)
 
+vector_limiter = DependencyLimiter("vector", VECTOR_MAX_CONCURRENCY, VECTOR_MAX_QUEUE, RETRY_AFTER_SECONDS)
+llm_limiter = DependencyLimiter("llm", LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, RETRY_AFTER_SECONDS)
+
+in_flight = SingleFlight("chat")
+
+# ===============================
+# METRICS (/metrics, X-Request-ID propagation)
+# ===============================
+metrics = MetricsRegistry("rag")
+stage_seconds = metrics.histogram("stage_seconds", "Time spent per pipeline stage", ("stage",))
+answers_total = metrics.counter("answers_total", "Answers by path taken", ("path",))
+metrics.gauge("dependency_in_flight", "Calls running per dependency", lambda: {
+    "vector": vector_limiter.in_flight,
+    "llm": llm_limiter.in_flight
+}, ("dependency",))
+metrics.gauge("dependency_waiting", "Calls queued per dependency", lambda: {
+    "vector": vector_limiter.waiting,
+    "llm": llm_limiter.waiting
+}, ("dependency",))
+metrics.gauge("dependency_rejected", "Calls rejected with 429 per dependency", lambda: {
+    "vector": vector_limiter.rejected,
+    "llm": llm_limiter.rejected
+}, ("dependency",))
+metrics.gauge("retrieval_cache_lookups", "Retrieval cache lookups by result", lambda: {
+    "hit": retrieval_cache.hits,
+    "miss": retrieval_cache.misses
+}, ("result",))
+metrics.gauge("coalesced_requests", "/chat pipeline runs by role: executed, or attached to one in flight", lambda: {
+    "executed": in_flight.leaders,
+    "coalesced": in_flight.coalesced
+}, ("role",))
+chunk_fallbacks_total = metrics.counter(
+    "chunk_fallbacks_total", "Vector queries re-run with metadata because a chunk ID was not in the local store"
+)
+
+instrument(app, metrics)
+
+@app.exception_handler(DependencySaturated)
+async def saturated_handler(request: Request, exc: DependencySaturated):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# ===============================
+# ANSWER CACHE
+# ===============================
+answer_cache = SemanticAnswerCache(
+    max_entries=ANSWER_CACHE_SIZE,
+    threshold=ANSWER_CACHE_THRESHOLD,
+    index_version=INDEX_VERSION
+)
+
+# ===============================
+# CONTEXT PACKER
+# ===============================
+context_packer = ContextPacker(
+    estimate_tokens,
+    token_budget=CONTEXT_TOKEN_BUDGET,
+    max_chunks=CONTEXT_MAX_CHUNKS,
+    cache_size=CONTEXT_CACHE_SIZE
+)
+
 # ===============================
 # REQUEST MODEL
 # ===============================
 class ChatRequest(BaseModel):
     request_id: Optional[str] = None
-    embedding: List[float]
+    # Not needed for greetings / FAQ hits. A JSON list, or base64 with
+    # embedding_encoding "f32" / "f16" (app.vector_codec)
+    embedding: Optional[Union[List[float], str]] = None
+    embedding_encoding: Optional[str] = None
     top_k: Optional[int] = 5
     query: Optional[str] = None
 
+    _vector: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def decode_embedding(self):
+        if self.embedding:
+            self._vector = decode_vector(self.embedding, self.embedding_encoding)
+        return self
+
+    @property
+    def vector(self) -> Optional[np.ndarray]:
+        """The embedding as float32, whichever encoding it arrived in."""
+        return self._vector
+
+class InvalidateRequest(BaseModel):
+    index_version: Optional[str] = None
+
 # ===============================
 # RESPONSE MODEL
 # ===============================
@@ -55,9 +243,11 @@ class ChatResponse(BaseModel):
 # ===============================
 # LLM CALL
 # ===============================
-def call_llm(prompt: str) -> str:
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
+LLM_MODEL = "llama-3.1-8b-instant"
+
+def llm_request(prompt: str) -> dict:
+    return dict(
+        model=LLM_MODEL,
         messages=[
             {
                 "role": "system",
@@ -79,6 +269,10 @@ def call_llm(prompt: str) -> str:
         max_tokens=700
     )
 
+
+def call_llm(prompt: str) -> str:
+    response = client.chat.completions.create(**llm_request(prompt))
+
     answer = response.choices[0].message.content.strip()
 
     # Clean markdown formatting
@@ -88,91 +282,184 @@ def call_llm(prompt: str) -> str:
     return answer
 
 
+def stream_llm(prompt: str):
+    """Yield cleaned answer text as Groq streams tokens back."""
+    stream = client.chat.completions.create(stream=True, **llm_request(prompt))
+    cleaner = MarkdownStreamCleaner()
+
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                text = cleaner.feed(delta)
+                if text:
+                    yield text
+    finally:
+        # Also runs on generator close(), releasing the HTTP response early
+        stream.close()
+
+    tail = cleaner.flush()
+    if tail:
+        yield tail
+
+
 # ===============================
-# BUILT-IN FAQ
+# INTENT ROUTER (greetings, answer mode, FAQ)
 # ===============================
-BASIC_FAQ = {
-    "phishing": "Phishing is a social engineering attack where attackers trick users into revealing sensitive information by pretending to be trusted entities.",
-    "malware": "Malware is malicious software designed to disrupt, damage, or gain unauthorized access to a computer system.",
-    "ransomware": "Ransomware is malware that encrypts a victim's files and demands payment for the decryption key.",
-    "firewall": "A firewall is a security device or software that monitors and filters incoming and outgoing network traffic to protect systems.",
-    "brute force": "A brute-force attack attempts to guess passwords or keys by trying many combinations until it succeeds.",
-    "ddos": "A Distributed Denial of Service (DDoS) attack floods a system or network with traffic to make services unavailable."
-}
-
-GREETINGS = ["hi", "hello", "hey", "hola", "yo", "good morning", "good evening","how are you","how are you doing","how's it going"]
-
-DEFINITION_TRIGGERS = ["what is", "explain", "define", "meaning of"]
-
-SHORT_ANSWER_TRIGGERS = [
-    "one line",
-    "in one line",
-    "short answer",
-    "brief"
-]
-
-DETAILED_TRIGGERS = [
-    "in detail",
-    "detailed",
-    "elaborate",
-    "full explanation"
-]
+router = IntentRouter.from_file(INTENTS_PATH)
 
 # ===============================
-# CHAT ENDPOINT
+# RETRIEVAL
 # ===============================
-@app.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
+RELEVANCE_THRESHOLD = 0.35
 
-    if not req.embedding:
-        raise HTTPException(status_code=400, detail="Embedding missing")
+retrieval_cache = RetrievalCache(
+    max_entries=RETRIEVAL_CACHE_SIZE,
+    threshold=RELEVANCE_THRESHOLD,
+    scale=RETRIEVAL_CACHE_SCALE,
+    index_version=INDEX_VERSION
+)
+
+def lexical_search(user_query: str, top_k: int) -> list:
+    """BM25 hits scoring at least LEXICAL_MIN_SCORE and LEXICAL_MIN_RATIO of the best one."""
+    if lexical_index is None or not user_query:
+        return []
+
+    return lexical_index.search(user_query, top_k, min_score=LEXICAL_MIN_SCORE, min_ratio=LEXICAL_MIN_RATIO)
+
+
+async def vector_search(embedding: np.ndarray, top_k: int) -> list:
+    """
+    [(chunk ID, score), ...] best first, through the retrieval cache, with
+    every match's content in the chunk store. Pinecone is queried without
+    metadata; if it returns an ID the chunk store does not know (index
+    ahead of data/chunks), the query is re-run once with metadata.
+    """
+    cached = retrieval_cache.get(embedding, top_k)
+    if cached is not None:
+        return cached
+
+    depth = max(top_k, RETRIEVAL_CACHE_DEPTH)
+
+    with stage_seconds.time(stage="vector_query"):
+        results = await vector_limiter.run(index.query, vector=embedding, top_k=depth,
+                                           include_metadata=INDEX_HAS_METADATA)
+
+    if not INDEX_HAS_METADATA and any(m.get("id") not in chunk_store for m in results.get("matches", [])):
+        chunk_fallbacks_total.inc()
+
+        with stage_seconds.time(stage="vector_query"):
+            results = await vector_limiter.run(index.query, vector=embedding, top_k=depth, include_metadata=True)
+
+    matches = []
+    for m in results.get("matches", []):
+        metadata = m.get("metadata") or {}
+        content = metadata.get("content") or metadata.get("text")
+        if content:
+            chunk_store.put(m.get("id"), {**metadata, "content": content})
+        matches.append((m.get("id"), m.get("score", 0)))
+
+    retrieval_cache.put(embedding, matches, depth)
+    return matches[:top_k]
+
+
+async def retrieve(req: ChatRequest, user_query: str, top_k: int):
+    """
+    Return (contexts, scores). Dense only when there is no lexical index,
+    BM25 only when the request carries no embedding (scores are then BM25
+    scores), otherwise both candidate lists fused with reciprocal rank
+    fusion. Candidates are keyed by content, so IDs need not agree between
+    the two indexes.
+
+    Fusion only reorders what the dense search returned: nothing is
+    returned unless a dense hit clears RELEVANCE_THRESHOLD, a BM25 hit can
+    lift a dense candidate below it, and scores stay cosine scores.
+    """
+    depth = max(top_k, LEXICAL_CANDIDATES)
+
+    if req.vector is None:
+        with stage_seconds.time(stage="lexical_search"):
+            hits = lexical_search(user_query, top_k)
+        return [h["metadata"]["content"] for h in hits], [round(h["score"], 4) for h in hits]
+
+    with stage_seconds.time(stage="lexical_search"):
+        lexical = lexical_search(user_query, depth)
+
+    matches = await vector_search(req.vector, depth if lexical else top_k)
+
+    # content -> cosine score, best first
+    candidates = {}
+
+    for chunk, score in matches:
+        metadata = chunk_store.get(chunk)
+
+        if metadata:
+            candidates.setdefault(metadata["content"], score)
+
+    contexts = [content for content, score in candidates.items() if score >= RELEVANCE_THRESHOLD]
+
+    if not contexts or not lexical:
+        contexts = contexts[:top_k]
+        return contexts, [candidates[content] for content in contexts]
+
+    fused = reciprocal_rank_fusion(
+        [contexts, [h["metadata"]["content"] for h in lexical if h["metadata"]["content"] in candidates]],
+        k=RRF_K
+    )[:top_k]
+
+    return [content for content, _ in fused], [candidates[content] for content, _ in fused]
+
+
+# ===============================
+# CHAT PIPELINE
+# ===============================
+async def prepare_chat(req: ChatRequest):
+    """
+    Everything up to the LLM call. Returns a finished ChatResponse for
+    greetings, FAQ hits, cache hits and fallbacks; otherwise a dict with
+    the prompt and the contexts it was built from.
+    """
 
-    RELEVANCE_THRESHOLD = 0.35
     top_k = min(req.top_k or 5, 10)
+    req.request_id = req.request_id or current_request_id()
 
-    user_query = (req.query or "").lower().strip()
+    with stage_seconds.time(stage="route"):
+        intent = router.route(req.query)
+    user_query = intent["query"]
 
     # ===============================
     # GREETING
     # ===============================
-    if user_query in GREETINGS:
+    if intent["greeting"]:
+        answers_total.inc(path="greeting")
         return ChatResponse(
             request_id=req.request_id,
             status="completed",
-            final_answer="Hello! I'm your SOC Assistant. How can I help you today?",
+            final_answer=router.greeting_reply,
             contexts_used=[],
             relevance_scores=[],
             model="fallback-greeting",
             timestamp=datetime.utcnow().isoformat()
         )
 
-    # ===============================
-    # ANSWER MODE DETECTION
-    # ===============================
-    answer_mode = "normal"
-
-    if any(trigger in user_query for trigger in SHORT_ANSWER_TRIGGERS):
-        answer_mode = "short"
-
-    elif any(trigger in user_query for trigger in DETAILED_TRIGGERS):
-        answer_mode = "detailed"
+    answer_mode = intent["answer_mode"]
 
     # ===============================
     # FAQ DEFINITIONS
     # ===============================
-    if any(trigger in user_query for trigger in DEFINITION_TRIGGERS):
-
-        for key in BASIC_FAQ:
-            if key in user_query:
-                return ChatResponse(
-                    request_id=req.request_id,
-                    status="completed",
-                    final_answer=BASIC_FAQ[key],
-                    contexts_used=[],
-                    relevance_scores=[],
-                    model="fallback-faq",
-                    timestamp=datetime.utcnow().isoformat()
-                )
+    if intent["definition"]:
+
+        if intent["faq_key"]:
+            answers_total.inc(path="faq")
+            return ChatResponse(
+                request_id=req.request_id,
+                status="completed",
+                final_answer=intent["faq_answer"],
+                contexts_used=[],
+                relevance_scores=[],
+                model="fallback-faq",
+                timestamp=datetime.utcnow().isoformat()
+            )
 
         # Unknown definition → use LLM
         prompt = f"""
@@ -182,52 +469,53 @@ User Question:
 Provide a clear cybersecurity definition.
 Do not include sections like Steps, Escalation, or Post-Incident.
 """
+        answers_total.inc(path="definition-llm")
 
-        final_answer = call_llm(prompt)
+        return {
+            "prompt": prompt,
+            "contexts": [],
+            "scores": [],
+            "model": "definition-llm",
+            "answer_mode": None
+        }
 
+    if req.vector is None and lexical_index is None:
+        raise HTTPException(status_code=400, detail="Embedding missing")
+
+    # ===============================
+    # SEMANTIC ANSWER CACHE
+    # ===============================
+    with stage_seconds.time(stage="answer_cache"):
+        cached = answer_cache.get(req.vector, answer_mode) if req.vector is not None else None
+
+    if cached:
+        answers_total.inc(path="cache")
         return ChatResponse(
             request_id=req.request_id,
             status="completed",
-            final_answer=final_answer,
-            contexts_used=[],
-            relevance_scores=[],
-            model="definition-llm",
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=datetime.utcnow().isoformat(),
+            **cached
         )
 
     # ===============================
-    # PINECONE SEARCH
+    # RETRIEVAL (dense, lexical or hybrid)
     # ===============================
-    results = index.query(
-        vector=req.embedding,
-        top_k=top_k,
-        include_metadata=True
-    )
-
-    matches = results.get("matches", [])
-
-    contexts = []
-    scores = []
-
-    for m in matches:
-
-        score = m.get("score", 0)
-
-        if score < RELEVANCE_THRESHOLD:
-            continue
-
-        metadata = m.get("metadata", {})
-        content = metadata.get("content") or metadata.get("text")
+    contexts, scores = await retrieve(req, user_query, top_k)
 
-        if content:
-            contexts.append(content)
-            scores.append(score)
+    # ===============================
+    # BUILD CONTEXT
+    # ===============================
+    stage = time.perf_counter()
+    packed = context_packer.pack(contexts, scores)
+    context_text = packed["text"]
 
     # ===============================
     # NO CONTEXT FALLBACK
     # ===============================
-    if not contexts:
+    # Nothing retrieved, or nothing that fit the token budget
+    if not packed["contexts"]:
 
+        answers_total.inc(path="fallback-general")
         return ChatResponse(
             request_id=req.request_id,
             status="completed",
@@ -244,11 +532,6 @@ Do not include sections like Steps, Escalation, or Post-Incident.
             timestamp=datetime.utcnow().isoformat()
         )
 
-    # ===============================
-    # BUILD CONTEXT
-    # ===============================
-    context_text = "\n\n".join([c[:700] for c in contexts[:4]])
-
     # ===============================
     # PROMPT BASED ON ANSWER MODE
     # ===============================
@@ -289,19 +572,202 @@ Provide the best possible answer based on the context.
 Use a structured SOC format when applicable.
 """
 
-    final_answer = call_llm(prompt)
+    stage_seconds.observe(time.perf_counter() - stage, stage="context_build")
+    answers_total.inc(path="llm")
+
+    return {
+        "prompt": prompt,
+        "contexts": packed["contexts"],
+        "scores": packed["scores"],
+        "model": LLM_MODEL,
+        "answer_mode": answer_mode
+    }
+
+
+def finish_chat(req: ChatRequest, plan: dict, final_answer: str) -> ChatResponse:
+    # Only context-grounded answers go in the semantic cache
+    if plan["answer_mode"] and req.vector is not None:
+        answer_cache.put(req.vector, plan["answer_mode"], {
+            "final_answer": final_answer,
+            "contexts_used": plan["contexts"],
+            "relevance_scores": plan["scores"],
+            "model": plan["model"]
+        })
 
     return ChatResponse(
         request_id=req.request_id,
         status="completed",
         final_answer=final_answer,
-        contexts_used=contexts[:4],
-        relevance_scores=scores[:4],
-        model="llama-3.1-8b-instant",
+        contexts_used=plan["contexts"],
+        relevance_scores=plan["scores"],
+        model=plan["model"],
         timestamp=datetime.utcnow().isoformat()
     )
 
 
+# ===============================
+# CHAT ENDPOINT
+# ===============================
+async def answer_chat(req: ChatRequest) -> ChatResponse:
+    plan = await prepare_chat(req)
+
+    if isinstance(plan, ChatResponse):
+        return plan
+
+    with stage_seconds.time(stage="llm"):
+        final_answer = await llm_limiter.run(call_llm, plan["prompt"])
+    return finish_chat(req, plan, final_answer)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest):
+    req.request_id = req.request_id or current_request_id()
+
+    if not COALESCE_REQUESTS:
+        return await answer_chat(req)
+
+    # answer_mode is derived from the normalized query, so it is covered by
+    # it; the embedding is part of the request too (clients may send one
+    # with an empty or unrelated query), keyed like the retrieval cache
+    key = (
+        canonical_query(req.query),
+        min(req.top_k or 5, 10),
+        retrieval_cache.key(req.vector) if req.vector is not None else None
+    )
+    response, coalesced = await in_flight.run(key, lambda: answer_chat(req))
+
+    if coalesced:
+        answers_total.inc(path="coalesced")
+        return response.model_copy(update={"request_id": req.request_id})
+    return response
+
+
+# ===============================
+# STREAMING CHAT ENDPOINT
+# ===============================
+def ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+closing_streams = set()
+
+
+async def close_tokens(tokens, read):
+    """Close an abandoned stream_llm generator once its in-flight read returns."""
+    if read is not None:
+        await asyncio.wait([read])
+    await llm_limiter.offload(tokens.close)
+
+
+def close_abandoned(tokens, read):
+    # Its own task: the disconnected request's scope is cancelled, so the
+    # close cannot be awaited from there
+    task = asyncio.ensure_future(close_tokens(tokens, read))
+    closing_streams.add(task)
+    task.add_done_callback(closing_streams.discard)
+
+
+async def stream_events(req: ChatRequest, plan):
+    """
+    NDJSON event stream:
+    {"type": "meta", ...} once, then {"type": "token", "text": ...} per
+    chunk, then {"type": "done", ...} with the full ChatResponse fields.
+    """
+    if isinstance(plan, ChatResponse):
+        yield ndjson({
+            "type": "meta",
+            "request_id": plan.request_id,
+            "contexts_used": plan.contexts_used,
+            "relevance_scores": plan.relevance_scores,
+            "model": plan.model
+        })
+        yield ndjson({"type": "token", "text": plan.final_answer})
+        yield ndjson({"type": "done", **plan.model_dump()})
+        return
+
+    yield ndjson({
+        "type": "meta",
+        "request_id": req.request_id,
+        "contexts_used": plan["contexts"],
+        "relevance_scores": plan["scores"],
+        "model": plan["model"]
+    })
+
+    parts = []
+    started = time.perf_counter()
+    tokens = read = None
+    finished = False
+    try:
+        async with llm_limiter.slot():
+            tokens = stream_llm(plan["prompt"])
+            while True:
+                # Each blocking read from the Groq stream runs off the event loop;
+                # shielded so a disconnect never leaves a read running unseen
+                read = asyncio.ensure_future(llm_limiter.offload(next, tokens, None))
+                text = await asyncio.shield(read)
+                if text is None:
+                    break
+                if not parts:
+                    stage_seconds.observe(time.perf_counter() - started, stage="llm_first_token")
+                parts.append(text)
+                yield ndjson({"type": "token", "text": text})
+        finished = True
+    except Exception as e:
+        finished = True  # the generator already terminated with the error
+        answers_total.inc(path="llm-error")
+        yield ndjson({"type": "error", "detail": f"LLM error: {str(e)}"})
+        return
+    finally:
+        if tokens is not None and not finished:
+            close_abandoned(tokens, read)
+    stage_seconds.observe(time.perf_counter() - started, stage="llm")
+
+    response = finish_chat(req, plan, "".join(parts))
+    yield ndjson({"type": "done", **response.model_dump()})
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    plan = await prepare_chat(req)
+
+    # Reject up front so saturation surfaces as a 429, not a broken stream
+    if not isinstance(plan, ChatResponse):
+        llm_limiter.check_or_raise()
+
+    return StreamingResponse(stream_events(req, plan), media_type="application/x-ndjson")
+
+
+# ===============================
+# CACHE INVALIDATION
+# ===============================
+@app.post("/cache/invalidate")
+async def invalidate_cache(req: InvalidateRequest):
+    """Call after the playbook index is re-ingested."""
+    answer_cache.invalidate(req.index_version)
+    retrieval_cache.invalidate(req.index_version)
+
+    # Pick up re-chunked playbooks; only changed chunks are re-tokenized.
+    # Whatever the local engines' index supplies changes only with a restart.
+    chunks = None
+    if not INDEX_HAS_METADATA:
+        added, deleted = chunk_store.sync_chunks_dir(LOCAL_CHUNKS_DIR)
+        chunks = {"added": added, "deleted": deleted}
+
+    lexical = None
+    if lexical_index is not None and mapped_index is None:
+        added, deleted = lexical_index.sync_chunks_dir(LOCAL_CHUNKS_DIR)
+        if added or deleted:
+            lexical_index.save(LEXICAL_INDEX_PATH)
+        lexical = {"added": added, "deleted": deleted}
+
+    return {
+        "status": "invalidated",
+        "index_version": answer_cache.index_version,
+        "chunk_store": chunks,
+        "lexical_index": lexical
+    }
+
+
 # ===============================
 # HEALTH CHECK
 # ===============================
@@ -309,6 +775,17 @@ Use a structured SOC format when applicable.
 async def health():
     return {
         "status": "healthy",
-        "model": "llama-3.1-8b-instant",
-        "index": INDEX_NAME
+        "model": LLM_MODEL,
+        "index": INDEX_NAME,
+        "vector_store": index.describe(),
+        "lexical_index": lexical_index.describe() if lexical_index is not None else None,
+        "answer_cache": answer_cache.stats(),
+        "coalescing": in_flight.stats(),
+        "retrieval_cache": retrieval_cache.stats(),
+        "chunk_store": chunk_store.describe(),
+        "context_packer": context_packer.stats(),
+        "limits": {
+            "vector": vector_limiter.stats(),
+            "llm": llm_limiter.stats()
+        }
     }
@@ -0,0 +1,173 @@
+"""
+recall@k and latency of the ANN sidecar (src/ann_index.py) against exact
+search over the same binary index.
+
+With --synthetic N, a clustered corpus of N unit vectors is written to a
+temporary .idx first, so the trade-off can be measured at a scale the
+playbooks do not reach yet. Queries are held-out perturbations of corpus
+vectors, or real query embeddings from --queries-npy.
+
+    python bench/ann_recall.py --synthetic 200000 --quantization int8,pq --nprobe 1,4,16,64
+    python bench/ann_recall.py --index data/index/playbooks.idx --queries-npy queries.npy
+
+For every quantization x nprobe it reports recall@k, single-query latency
+and batched throughput with 1 and --workers threads (search_batch).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+from vector_store import select_top_k  # noqa: E402
+from index_format import MappedVectorStore, write_index, INDEX_PATH, SCAN_BLOCK_ROWS  # noqa: E402
+from ann_index import IVFIndex, default_nlist  # noqa: E402
+
+
+# -------------------------
+# DATA
+# -------------------------
+def synthetic_corpus(count: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors around `clusters` random topics, roughly like embedded documents."""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = topics[rng.integers(0, clusters, count)] + 1.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def held_out_queries(base: MappedVectorStore, count: int, noise: float = 0.05, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(base), min(count, len(base)), replace=False))
+    queries = np.asarray(base.vectors[rows], dtype=np.float32)
+    queries = queries + noise * rng.standard_normal(queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(base: MappedVectorStore, queries: np.ndarray, top_k: int) -> np.ndarray:
+    """Ground truth rows, (queries, top_k), scanning the index block by block."""
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+
+    for start in range(0, len(base), SCAN_BLOCK_ROWS):
+        block = np.asarray(base.vectors[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+        scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+        rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(block)),
+                                                          (len(queries), len(block)))], axis=1)
+        keep = np.stack([select_top_k(s, top_k) for s in scores])
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_rows = np.take_along_axis(rows, keep, axis=1)
+
+    return best_rows
+
+
+def recall_at_k(results: list, truth: np.ndarray, top_k: int) -> float:
+    return float(np.mean([len(set(rows.tolist()) & set(t.tolist())) / top_k for (rows, _), t in zip(results, truth)]))
+
+
+# -------------------------
+# MEASUREMENT
+# -------------------------
+def evaluate(ann: IVFIndex, queries: np.ndarray, truth: np.ndarray, top_k: int, nprobe: int, workers: int) -> dict:
+    ann.nprobe = nprobe
+    ann.search(queries[0], top_k)  # warm-up: page in the probed lists
+
+    started = time.perf_counter()
+    results = [ann.search(q, top_k) for q in queries]
+    single_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    throughput = {}
+    for threads in sorted({1, workers}):
+        started = time.perf_counter()
+        ann.search_batch(queries, top_k, workers=threads)
+        throughput[f"batch_qps_{threads}_threads"] = round(len(queries) / (time.perf_counter() - started))
+
+    return {
+        "nprobe": nprobe,
+        f"recall@{top_k}": round(recall_at_k(results, truth, top_k), 4),
+        "ms_per_query": round(single_ms, 3),
+        **throughput,
+    }
+
+
+def exact_ms(base: MappedVectorStore, queries: np.ndarray, top_k: int) -> float:
+    started = time.perf_counter()
+    for q in queries:
+        base.search(q, top_k)
+    return round((time.perf_counter() - started) * 1000 / len(queries), 3)
+
+
+def run(args, index_path: str) -> dict:
+    base = MappedVectorStore(index_path)
+    queries = np.load(args.queries_npy).astype(np.float32) if args.queries_npy else held_out_queries(base, args.queries)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_top_k(base, queries, args.top_k)
+
+    report = {
+        "vectors": len(base),
+        "dimension": base.header["dimension"],
+        "queries": len(queries),
+        "top_k": args.top_k,
+        "exact_ms_per_query": exact_ms(base, queries, args.top_k),
+        "float32_mb": round(len(base) * base.header["dimension"] * 4 / 1e6, 1),
+        "indexes": [],
+    }
+
+    for quantization in args.quantization.split(","):
+        started = time.perf_counter()
+        ann = IVFIndex.train(base, args.nlist, quantization, args.pq_m, args.train_size,
+                             refine=args.refine, workers=args.workers)
+        build_s = time.perf_counter() - started
+
+        report["indexes"].append({
+            "quantization": quantization,
+            "nlist": ann.nlist,
+            "refine": args.refine,
+            "codes_mb": round(ann.codes.nbytes / 1e6, 1),
+            "build_s": round(build_s, 1),
+            "results": [evaluate(ann, queries, truth, args.top_k, int(n), args.workers)
+                        for n in args.nprobe.split(",")],
+        })
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="recall@k / latency of the ANN index against exact search")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark a synthetic corpus of N vectors instead")
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=None, help="Synthetic topics; defaults to ~sqrt(N)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--queries-npy", default=None)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--quantization", default="int8,pq")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", default="1,4,16,64")
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--refine", type=int, default=4)
+    parser.add_argument("--train-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if not args.synthetic:
+        print(json.dumps(run(args, args.index), indent=2))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.idx")
+        clusters = args.clusters or default_nlist(args.synthetic) // 4
+        vectors = synthetic_corpus(args.synthetic, args.dimension, clusters)
+        write_index(path, [f"synthetic:{i}" for i in range(len(vectors))], vectors, [{} for _ in vectors])
+        del vectors
+        print(json.dumps(run(args, path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
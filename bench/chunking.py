@@ -0,0 +1,175 @@
+"""
+Chunking throughput on a large extracted-text dump.
+
+Repeats the playbooks in data/extracted_text into one multi-hundred-page
+file (with "--- Page N ---" markers, like the extractor writes) and times
+the chunking engine's strategies against the original read-everything
+section chunker, reporting MB/s, pages/s, chunk count and peak Python
+memory.
+
+    python bench/chunking.py --pages 400
+    python bench/chunking.py --pages 2000 --repeats 5
+
+Exits 1 if the sections strategy stops matching the original chunker's
+output, since chunk IDs (and the index) are derived from it.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+from chunker import chunk_file, create_strategy, split_into_chunks, STRATEGIES  # noqa: E402
+
+TEXT_DIR = os.path.join(REPO_ROOT, "data", "extracted_text")
+
+
+# -------------------------
+# REFERENCE
+# -------------------------
+def legacy_split_into_chunks(text: str):
+    """The section chunker as it was before the engine: whole text, re-compiled patterns per line."""
+    def clean_line(line):
+        return re.sub(r"\s+", " ", line.strip())
+
+    def is_page_marker(line):
+        return bool(re.match(r"^---\s*Page\s*\d+\s*---$", line.strip(), flags=re.IGNORECASE))
+
+    def is_section_heading(line):
+        line = clean_line(line)
+        patterns = [
+            r"^\d+\.\s*Incident Overview$",
+            r"^\d+\.\s*Phase\s+\d+\s*:\s*.+$",
+            r"^\d+\.\s*Escalation Criteria$",
+            r"^\d+\.\s*Objectives$",
+            r"^\d+\.\s*References$",
+        ]
+        return any(re.match(p, line, flags=re.IGNORECASE) for p in patterns)
+
+    chunks, current_section, current_content = [], "General", []
+    for raw_line in text.splitlines():
+        if not raw_line.strip() or is_page_marker(raw_line):
+            continue
+        line = clean_line(raw_line)
+        if is_section_heading(line):
+            if current_content:
+                chunks.append({"section": current_section, "content": "\n".join(current_content).strip()})
+            current_section, current_content = line, []
+        else:
+            current_content.append(raw_line)
+    if current_content:
+        chunks.append({"section": current_section, "content": "\n".join(current_content).strip()})
+
+    return [ch for ch in chunks if len(ch["content"]) >= 150]
+
+
+# -------------------------
+# CORPUS
+# -------------------------
+def build_dump(path: str, pages: int) -> int:
+    """Write `pages` pages cycled from the extracted playbooks; returns the byte size."""
+    page_texts = []
+    for file in sorted(os.listdir(TEXT_DIR)):
+        if file.lower().endswith(".txt"):
+            with open(os.path.join(TEXT_DIR, file), "r", encoding="utf-8") as f:
+                parts = re.split(r"^---\s*Page\s*\d+\s*---$", f.read(), flags=re.IGNORECASE | re.MULTILINE)
+            page_texts.extend(p.strip("\n") for p in parts if p.strip())
+
+    if not page_texts:
+        raise SystemExit(f"No extracted text in {TEXT_DIR}")
+
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(pages):
+            f.write(f"--- Page {n + 1} ---\n{page_texts[n % len(page_texts)]}\n\n")
+
+    return os.path.getsize(path)
+
+
+# -------------------------
+# MEASUREMENT
+# -------------------------
+def measure(fn, repeats: int):
+    """(result, best seconds over `repeats`, peak traced bytes of one extra run)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, best, peak
+
+
+def read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def run(pages: int, repeats: int, max_tokens: int, overlap_tokens: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dump.txt")
+        size = build_dump(path, pages)
+
+        cases = {
+            "legacy (read all)": lambda: legacy_split_into_chunks(read_text(path)),
+            "sections (read all)": lambda: split_into_chunks(read_text(path)),
+        }
+        for name in sorted(STRATEGIES):
+            strategy = create_strategy(name, max_tokens, overlap_tokens, unit="section")
+            cases[f"{name} (stream)"] = lambda s=strategy: sum(1 for _ in chunk_file(path, s))
+        page_strategy = create_strategy("sentences", max_tokens, overlap_tokens, unit="page")
+        cases["sentences/page (stream)"] = lambda: sum(1 for _ in chunk_file(path, page_strategy))
+
+        report = {"pages": pages, "mb": round(size / 1e6, 2), "cases": {}}
+        results = {}
+
+        for name, fn in cases.items():
+            result, seconds, peak = measure(fn, repeats)
+            results[name] = result
+            report["cases"][name] = {
+                "chunks": result if isinstance(result, int) else len(result),
+                "ms": round(seconds * 1000, 1),
+                "mb_per_s": round(size / 1e6 / seconds, 1),
+                "pages_per_s": round(pages / seconds),
+                "peak_mb": round(peak / 1e6, 2),
+            }
+
+        baseline = report["cases"]["legacy (read all)"]["ms"]
+        for row in report["cases"].values():
+            row["speedup"] = round(baseline / row["ms"], 2)
+
+        report["sections_match_legacy"] = results["sections (read all)"] == results["legacy (read all)"]
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunking throughput on a large synthetic dump")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    report = run(args.pages, args.repeats, args.max_tokens, args.overlap_tokens)
+    print(json.dumps(report, indent=2))
+
+    if not report["sections_match_legacy"]:
+        print("\nsections strategy output differs from the original chunker")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
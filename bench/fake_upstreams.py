@@ -0,0 +1,203 @@
+"""
+Local stand-ins for the paid / heavy upstreams, for benchmarking only.
+
+One FastAPI app serves all three:
+
+    POST /embed, /embed/batch               embedding service (bge-large shaped, 1024 dims)
+    POST /query                             Pinecone data-plane query over data/chunks
+    POST /openai/v1/chat/completions        Groq chat completions, streaming or not
+
+Point the services at it with
+    EMBEDDING_API_URL=http://127.0.0.1:9100/embed
+    PINECONE_HOST=http://127.0.0.1:9100
+    GROQ_BASE_URL=http://127.0.0.1:9100
+
+Embeddings are feature-hashed bags of words, so a query that shares terms
+with a chunk really does score higher against it. Latency per upstream is
+Gaussian around FAKE_<NAME>_LATENCY_MS with FAKE_<NAME>_JITTER_MS standard
+deviation (NAME = EMBED, VECTOR, LLM). The LLM stub then streams
+FAKE_LLM_TOKENS tokens FAKE_LLM_TOKEN_MS apart.
+
+    uvicorn fake_upstreams:app --app-dir bench --port 9100
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+import zlib
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+from vector_store import iter_chunks_dir  # same IDs the ingesters upsert to Pinecone
+
+DIM = int(os.getenv("FAKE_EMBED_DIM", "1024"))
+CHUNKS_DIR = os.getenv("FAKE_CHUNKS_DIR", os.path.join(REPO_ROOT, "data", "chunks"))
+
+LATENCY = {
+    name: (
+        float(os.getenv(f"FAKE_{name}_LATENCY_MS", default)),
+        float(os.getenv(f"FAKE_{name}_JITTER_MS", jitter)),
+    )
+    for name, default, jitter in (
+        ("EMBED", "25", "5"),
+        ("VECTOR", "40", "10"),
+        ("LLM", "300", "80"),     # time to first token
+    )
+}
+EMBED_PER_ITEM_MS = float(os.getenv("FAKE_EMBED_PER_ITEM_MS", "2"))
+LLM_TOKENS = int(os.getenv("FAKE_LLM_TOKENS", "120"))
+LLM_TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "4"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+ANSWER_WORDS = (
+    "Title: Suspected phishing campaign. Pre-checks: confirm the reporting user, pull the original "
+    "message headers and check the sender domain against threat intel. Steps: isolate affected "
+    "mailboxes, block the sender and URLs at the gateway, reset exposed credentials and review sign-in "
+    "logs for anomalies. Escalation: notify the incident manager if credentials were entered or "
+    "malware executed. Post-Incident: document indicators and update detection rules."
+).split()
+
+
+# -------------------------
+# FAKE EMBEDDINGS
+# -------------------------
+def embed_text(text: str) -> np.ndarray:
+    vec = np.zeros(DIM, dtype=np.float32)
+    for token in _TOKEN_RE.findall(text.lower()):
+        h = zlib.crc32(token.encode("utf-8"))
+        vec[h % DIM] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+async def delay(name: str, extra_ms: float = 0.0):
+    latency, jitter = LATENCY[name]
+    await asyncio.sleep(max(0.0, random.gauss(latency, jitter) + extra_ms) / 1000)
+
+
+def load_corpus():
+    ids, metadatas = [], []
+
+    for doc_id, metadata in iter_chunks_dir(CHUNKS_DIR):
+        ids.append(doc_id)
+        metadatas.append(metadata)
+
+    matrix = np.stack([embed_text(m["section"] + "\n" + m["content"]) for m in metadatas]) \
+        if metadatas else np.zeros((0, DIM), dtype=np.float32)
+    return ids, metadatas, matrix
+
+
+CORPUS_IDS, CORPUS_METADATA, CORPUS_MATRIX = load_corpus()
+
+app = FastAPI(title="Fake upstreams (benchmark only)")
+
+
+# -------------------------
+# EMBEDDING SERVICE
+# -------------------------
+@app.post("/embed")
+async def embed(data: dict):
+    await delay("EMBED", EMBED_PER_ITEM_MS)
+    return {"embedding": embed_text(data["text"]).tolist()}
+
+
+@app.post("/embed/batch")
+async def embed_batch(data: dict):
+    texts = data.get("texts", [])
+    await delay("EMBED", EMBED_PER_ITEM_MS * len(texts))
+    return {"embeddings": [embed_text(t).tolist() for t in texts]}
+
+
+# -------------------------
+# PINECONE (data plane)
+# -------------------------
+@app.post("/query")
+async def query(data: dict):
+    await delay("VECTOR")
+
+    top_k = int(data.get("topK", 5))
+    vector = np.asarray(data.get("vector", []), dtype=np.float32)
+    matches = []
+
+    if len(CORPUS_IDS) and vector.shape == (DIM,):
+        scores = CORPUS_MATRIX @ vector
+        for row in np.argsort(-scores)[:top_k]:
+            # Hashed bags of words score far lower than bge; map into the
+            # range real matches land in so rag_service's threshold behaves.
+            match = {"id": CORPUS_IDS[row], "score": float(0.5 + 0.5 * max(scores[row], 0.0)), "values": []}
+            if data.get("includeMetadata"):
+                match["metadata"] = CORPUS_METADATA[row]
+            matches.append(match)
+
+    return {"matches": matches, "namespace": data.get("namespace", ""), "usage": {"readUnits": 1}}
+
+
+# -------------------------
+# GROQ (OpenAI-compatible)
+# -------------------------
+def completion_answer() -> list:
+    return [ANSWER_WORDS[i % len(ANSWER_WORDS)] + " " for i in range(LLM_TOKENS)]
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    data = await request.json()
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = data.get("model", "fake")
+    tokens = completion_answer()
+
+    if not data.get("stream"):
+        await delay("LLM", LLM_TOKEN_MS * len(tokens))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+        }
+
+    async def events():
+        await delay("LLM")
+        for token in tokens:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(LLM_TOKEN_MS / 1000)
+
+        last = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(last)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "chunks": len(CORPUS_IDS), "latency_ms": LATENCY}
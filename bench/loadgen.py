@@ -0,0 +1,424 @@
+"""
+Replays the SOC query mix in bench/queries.json against the gateway and
+reports throughput plus p50/p95/p99 latency overall, per query category and
+per pipeline stage.
+
+Gateway stages come from each request's /status timings (exact per
+request). rag_service stages come from the before/after difference of its
+/metrics histograms, so they are bucket-interpolated estimates.
+
+    python bench/loadgen.py --start-stack --requests 500 --concurrency 16
+    python bench/loadgen.py --start-stack --save-baseline default
+    python bench/loadgen.py --start-stack --compare default   # exit 1 on regression
+
+The load is replayed --runs times (3 by default; on a fresh stack each time
+with --start-stack) and every number reported, saved or compared is the
+median across runs, so one noisy run neither sets nor trips a baseline.
+Baselines live in bench/baselines/<name>.json and are meant to be committed,
+so a change in latency shows up in the diff under review.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+QUERIES_PATH = os.path.join(BENCH_DIR, "queries.json")
+
+PERCENTILES = (50, 95, 99)
+
+# /status timings key -> stage name
+GATEWAY_STAGES = {
+    "route_ms": "route",
+    "embedding_ms": "embed",
+    "retrieval_ms": "retrieve",
+    "queue_wait_ms": "queue_wait",
+    "total_ms": "total",
+}
+
+_SAMPLE_RE = re.compile(r'^(\w+)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+# -------------------------
+# QUERY MIX
+# -------------------------
+def load_mix(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        categories = json.load(f)["categories"]
+
+    names = list(categories)
+    weights = [categories[n]["weight"] for n in names]
+    return names, weights, {n: categories[n]["queries"] for n in names}
+
+
+# -------------------------
+# PROMETHEUS PARSING
+# -------------------------
+def parse_metrics(text: str) -> dict:
+    """{(name, frozenset(labels)): value} for every sample line."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        key = (name, frozenset(_LABEL_RE.findall(labels or "")))
+        samples[key] = float(value)
+    return samples
+
+
+def histogram_quantiles(before: dict, after: dict, name: str, label: str) -> dict:
+    """
+    {label value: {"count", "p50", "p95", "p99"}} from the difference of two
+    scrapes, interpolating linearly inside buckets (as histogram_quantile does).
+    """
+    buckets = defaultdict(dict)
+    for (sample, labels), value in after.items():
+        if sample != f"{name}_bucket":
+            continue
+        labels = dict(labels)
+        bound = float("inf") if labels["le"] == "+Inf" else float(labels["le"])
+        delta = value - before.get((sample, frozenset(labels.items())), 0.0)
+        buckets[labels.get(label, "")][bound] = delta
+
+    result = {}
+    for key, counts in buckets.items():
+        bounds = sorted(counts)
+        total = counts[bounds[-1]]
+        if total <= 0:
+            continue
+
+        stats = {"count": int(total)}
+        for p in PERCENTILES:
+            rank = total * p / 100
+            lower_bound, lower_count = 0.0, 0.0
+            for bound in bounds:
+                if counts[bound] >= rank:
+                    if bound == float("inf"):
+                        value = lower_bound
+                    else:
+                        span = counts[bound] - lower_count
+                        fraction = (rank - lower_count) / span if span else 1.0
+                        value = lower_bound + (bound - lower_bound) * fraction
+                    stats[f"p{p}"] = round(value * 1000, 2)
+                    break
+                lower_bound, lower_count = bound, counts[bound]
+        result[key] = stats
+
+    return result
+
+
+def counter_deltas(before: dict, after: dict, name: str, label: str) -> dict:
+    deltas = {}
+    for (sample, labels), value in after.items():
+        if sample == name:
+            delta = value - before.get((sample, labels), 0.0)
+            if delta:
+                deltas[dict(labels).get(label, "")] = int(delta)
+    return deltas
+
+
+# -------------------------
+# LOAD
+# -------------------------
+def summarize(values) -> dict:
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values, dtype=np.float64)
+    stats = {"count": len(values), "mean": round(float(arr.mean()), 2)}
+    for p in PERCENTILES:
+        stats[f"p{p}"] = round(float(np.percentile(arr, p)), 2)
+    return stats
+
+
+def build_plan(mix, count: int, rng: random.Random) -> list:
+    names, weights, queries = mix
+    plan = []
+    for _ in range(count):
+        category = rng.choices(names, weights)[0]
+        plan.append((category, rng.choice(queries[category])))
+    return plan
+
+
+async def run_load(gateway: str, plan: list, concurrency: int, stream: bool):
+    """Send every (category, text) in `plan` with `concurrency` requests in flight."""
+    results = []
+    cursor = iter(plan)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=gateway, timeout=120, limits=limits) as client:
+
+        async def one(category: str, text: str) -> dict:
+            started = time.perf_counter()
+            record = {"category": category, "status": 0, "request_id": None, "ttft_ms": None}
+            try:
+                if stream:
+                    async with client.stream("POST", "/chat/stream", json={"text": text}) as response:
+                        record["status"] = response.status_code
+                        async for line in response.aiter_lines():
+                            if record["request_id"] is None and '"request_id"' in line:
+                                # The store key comes back in the body; X-Request-ID is only a trace ID
+                                record["request_id"] = json.loads(line).get("request_id")
+                            if record["ttft_ms"] is None and '"token"' in line:
+                                record["ttft_ms"] = (time.perf_counter() - started) * 1000
+                            if '"type": "error"' in line:
+                                record["status"] = 599
+                else:
+                    response = await client.post("/chat", json={"text": text})
+                    record["status"] = response.status_code
+                    if response.status_code == 200:
+                        record["request_id"] = response.json().get("request_id")
+            except httpx.HTTPError:
+                record["status"] = -1
+            record["latency_ms"] = (time.perf_counter() - started) * 1000
+            return record
+
+        async def worker():
+            for category, text in cursor:
+                results.append(await one(category, text))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return results, elapsed
+
+
+async def fetch_stage_timings(gateway: str, results: list) -> dict:
+    """Exact per-request gateway stage timings from /status, fetched after the run."""
+    stage_values = defaultdict(list)
+
+    async with httpx.AsyncClient(base_url=gateway, timeout=30) as client:
+        for record in results:
+            if record["status"] != 200 or not record["request_id"]:
+                continue
+            status = (await client.get(f"/status/{record['request_id']}")).json()
+            timings = status.get("timings") or {}
+            for key, stage in GATEWAY_STAGES.items():
+                if key in timings:
+                    stage_values[stage].append(timings[key])
+
+    return stage_values
+
+
+def build_report(results, elapsed, stage_values, rag_before, rag_after, config) -> dict:
+    ok = [r for r in results if r["status"] == 200]
+    by_category = defaultdict(list)
+    for r in ok:
+        by_category[r["category"]].append(r["latency_ms"])
+
+    errors = defaultdict(int)
+    for r in results:
+        if r["status"] != 200:
+            errors[str(r["status"])] += 1
+
+    report = {
+        "config": config,
+        "requests": len(results),
+        "errors": dict(errors),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize([r["latency_ms"] for r in ok]),
+        "categories": {name: summarize(values) for name, values in sorted(by_category.items())},
+        "gateway_stages_ms": {stage: summarize(values) for stage, values in stage_values.items()},
+    }
+
+    ttft = [r["ttft_ms"] for r in ok if r["ttft_ms"] is not None]
+    if ttft:
+        report["time_to_first_token_ms"] = summarize(ttft)
+
+    if rag_before is not None and rag_after is not None:
+        report["rag_stages_ms"] = histogram_quantiles(rag_before, rag_after, "rag_stage_seconds", "stage")
+        report["rag_answer_paths"] = counter_deltas(rag_before, rag_after, "rag_answers_total", "path")
+
+    return report
+
+
+def median_report(reports: list) -> dict:
+    """Element-wise median of the runs' numbers; errors are totalled over all runs."""
+    def merge(values):
+        first = values[0]
+        if isinstance(first, dict):
+            return {key: merge([v[key] for v in values]) for key in first if all(key in v for v in values)}
+        if isinstance(first, bool) or not all(isinstance(v, (int, float)) for v in values):
+            return first
+        median = float(np.median(values))
+        return int(round(median)) if all(isinstance(v, int) for v in values) else round(median, 2)
+
+    report = merge(reports)
+    errors = defaultdict(int)
+    for r in reports:
+        for status, count in r["errors"].items():
+            errors[status] += count
+    report["errors"] = dict(errors)
+    report["config"]["runs"] = len(reports)
+    return report
+
+
+# -------------------------
+# OUTPUT / BASELINES
+# -------------------------
+def print_table(title: str, rows: dict):
+    if not rows:
+        return
+    print(f"\n{title}")
+    print(f"  {'':22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stats in rows.items():
+        if not stats.get("count"):
+            continue
+        print(f"  {name:22}{stats['count']:>7}" + "".join(f"{stats.get(f'p{p}', 0):>10.1f}" for p in PERCENTILES))
+
+
+def print_report(report: dict):
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s "
+          f"-> {report['throughput_rps']} req/s, errors: {report['errors'] or 'none'} "
+          f"(median of {report['config'].get('runs', 1)} runs)")
+    print_table("End-to-end latency (ms)", {"all": report["latency_ms"], **report["categories"]})
+    if "time_to_first_token_ms" in report:
+        print_table("Time to first token (ms)", {"stream": report["time_to_first_token_ms"]})
+    print_table("Gateway stages (ms)", report["gateway_stages_ms"])
+    print_table("rag_service stages (ms, from histogram buckets)", report.get("rag_stages_ms", {}))
+    if report.get("rag_answer_paths"):
+        print("\nrag_service answer paths: " + ", ".join(f"{k}={v}" for k, v in sorted(report["rag_answer_paths"].items())))
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """
+    Regressions beyond `tolerance` (fraction) in p50/p95/p99 latency and
+    throughput. Latency changes smaller than `min_delta_ms` are noise on
+    sub-millisecond stages and never count. rag_service stages are reported
+    but not gated: interpolated inside buckets as wide as 1s -> 2.5s, their
+    tails move by more than half between identical runs, and any real
+    slowdown there shows up in the end-to-end latency anyway.
+    """
+    regressions = []
+
+    def check(label: str, current: dict, base: dict):
+        for p in PERCENTILES:
+            key = f"p{p}"
+            if key in current and base.get(key):
+                change = current[key] / base[key] - 1
+                if change > tolerance and current[key] - base[key] >= min_delta_ms:
+                    regressions.append(f"{label} {key}: {base[key]:.1f} -> {current[key]:.1f} ms (+{change:.0%})")
+
+    check("latency", report["latency_ms"], baseline.get("latency_ms", {}))
+    for stage, stats in report["gateway_stages_ms"].items():
+        check(f"gateway {stage}", stats, baseline.get("gateway_stages_ms", {}).get(stage, {}))
+
+    base_rps = baseline.get("throughput_rps")
+    if base_rps and report["throughput_rps"] < base_rps * (1 - tolerance):
+        regressions.append(f"throughput: {base_rps} -> {report['throughput_rps']} req/s")
+
+    return regressions
+
+
+# -------------------------
+# MAIN
+# -------------------------
+async def scrape(url: str):
+    if not url:
+        return None
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            return parse_metrics((await client.get(url)).text)
+    except httpx.HTTPError:
+        return None
+
+
+async def bench(args, gateway: str, rag_metrics: str) -> dict:
+    mix = load_mix(args.queries)
+    rng = random.Random(args.seed)
+
+    if args.warmup:
+        await run_load(gateway, build_plan(mix, args.warmup, rng), args.concurrency, args.stream)
+
+    rag_before = await scrape(rag_metrics)
+    results, elapsed = await run_load(gateway, build_plan(mix, args.requests, rng), args.concurrency, args.stream)
+    rag_after = await scrape(rag_metrics)
+    stage_values = await fetch_stage_timings(gateway, results)
+
+    config = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "stream": args.stream,
+        "seed": args.seed,
+        "warmup": args.warmup,
+        "fake_latency": {k: v for k, v in sorted(os.environ.items()) if k.startswith("FAKE_")},
+    }
+    return build_report(results, elapsed, stage_values, rag_before, rag_after, config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the SOC assistant backend")
+    parser.add_argument("--gateway", default="http://127.0.0.1:8000")
+    parser.add_argument("--rag-metrics", default="http://127.0.0.1:8002/metrics")
+    parser.add_argument("--start-stack", action="store_true", help="Launch fake upstreams + services (bench/stack.py)")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--stream", action="store_true", help="Use /chat/stream and report time to first token")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--runs", type=int, default=3, help="Repeat the load and report per-metric medians")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression vs baseline (fraction)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore latency changes smaller than this")
+    parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    reports = []
+    for _ in range(max(1, args.runs)):
+        if args.start_stack:
+            from stack import Stack
+
+            with Stack() as stack:
+                reports.append(asyncio.run(bench(args, stack.urls["gateway"], stack.urls["rag"] + "/metrics")))
+        else:
+            reports.append(asyncio.run(bench(args, args.gateway, args.rag_metrics)))
+
+    report = median_report(reports)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.save_baseline), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved baseline: {baseline_path(args.save_baseline)}")
+
+    if args.compare:
+        with open(baseline_path(args.compare), "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\nRegressions vs '{args.compare}' (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions vs '{args.compare}' (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Starts the full stack against the fake upstreams, for benchmarking:
+
+    fake_upstreams (embedder + Pinecone + Groq stand-ins)
+    rag_service    (VECTOR_STORE=pinecone pointed at the fake, fake Groq)
+    gateway        (Backend/main.py)
+
+Each runs as its own uvicorn process with logs under a temp directory.
+Extra environment (e.g. FAKE_LLM_LATENCY_MS, HYBRID_RETRIEVAL=0) is passed
+through, so configurations can be compared run to run.
+
+    python bench/stack.py            # start and wait for Ctrl+C
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, "Backend")
+BENCH_DIR = os.path.join(REPO_ROOT, "bench")
+
+FAKE_PORT = int(os.getenv("BENCH_FAKE_PORT", "9100"))
+RAG_PORT = int(os.getenv("BENCH_RAG_PORT", "8002"))
+GATEWAY_PORT = int(os.getenv("BENCH_GATEWAY_PORT", "8000"))
+
+STARTUP_TIMEOUT = 60
+
+
+class Stack:
+    """Context manager owning the three uvicorn processes."""
+
+    def __init__(self, workdir: str = None):
+        self.workdir = workdir or tempfile.mkdtemp(prefix="soc-bench-")
+        self.processes = []
+
+        fake = f"http://127.0.0.1:{FAKE_PORT}"
+        self.urls = {
+            "fake": fake,
+            "rag": f"http://127.0.0.1:{RAG_PORT}",
+            "gateway": f"http://127.0.0.1:{GATEWAY_PORT}",
+        }
+
+        self.env = {
+            **os.environ,
+            # rag_service
+            "VECTOR_STORE": "pinecone",
+            "PINECONE_API_KEY": "bench",
+            "PINECONE_HOST": fake,
+            "GROQ_API_KEY": "bench",
+            "GROQ_BASE_URL": fake,
+            "LEXICAL_INDEX_PATH": os.path.join(self.workdir, "lexical.json"),
+            # gateway
+            "EMBEDDING_API_URL": f"{fake}/embed",
+            "RETRIEVAL_API_URL": f"{self.urls['rag']}/chat",
+            "REQUEST_MAX_ENTRIES": os.getenv("REQUEST_MAX_ENTRIES", "100000"),
+        }
+
+    def _start(self, name: str, app: str, app_dir: str, port: int):
+        log = open(os.path.join(self.workdir, f"{name}.log"), "w")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", app, "--app-dir", app_dir,
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=app_dir,
+            env=self.env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        self.processes.append((name, process, log))
+
+    def _wait_healthy(self, name: str, url: str):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.25)
+        raise RuntimeError(f"{name} did not become healthy; see {self.workdir}/{name}.log")
+
+    def __enter__(self) -> "Stack":
+        try:
+            self._start("fake_upstreams", "fake_upstreams:app", BENCH_DIR, FAKE_PORT)
+            self._wait_healthy("fake_upstreams", self.urls["fake"])
+
+            self._start("rag_service", "rag_service:app", BACKEND_DIR, RAG_PORT)
+            self._wait_healthy("rag_service", self.urls["rag"])
+
+            self._start("gateway", "main:app", BACKEND_DIR, GATEWAY_PORT)
+            self._wait_healthy("gateway", self.urls["gateway"])
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        for _, process, log in reversed(self.processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+        self.processes = []
+
+
+if __name__ == "__main__":
+    with Stack() as stack:
+        print(f"Stack up (logs in {stack.workdir}):")
+        for name, url in stack.urls.items():
+            print(f"  {name:8} {url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,504 @@
+"""
+Approximate nearest-neighbour sidecar (.ivf) for the binary playbook index
+
+An inverted-file (IVF) index over an .idx built by index_format.py: the
+vectors are clustered into `nlist` lists around k-means centroids, and a
+query only scans the `nprobe` lists whose centroids score highest. Each
+vector is stored as a compressed code of its residual from the list
+centroid:
+
+    int8    scalar quantization, 1 byte/dim (4x smaller than float32)
+    pq      product quantization, `pq_m` bytes/vector (m sub-vectors, each
+            one of 256 trained sub-centroids; 64x smaller at m=64, 1024 dim)
+
+The `refine` candidates per result (top_k * refine) are re-scored exactly
+against the float vectors of the .idx, so returned scores stay true cosine
+similarities. nprobe is the recall/latency knob; bench/ann_recall.py
+measures recall@k against exact search.
+
+File layout, version 1:
+
+    magic            8 bytes   b"SOCIVF01"
+    header_length    uint32    little-endian
+    header           JSON      nlist, quantization, base index checksum,
+                               array offsets / dtypes / shapes
+    arrays           64-byte aligned, memory-mapped on load:
+                     centroids, list_offsets, rows, codes, scale | codebooks
+
+The sidecar stores .idx row numbers, not IDs; IDs and metadata come from
+the .idx. Opening it against an .idx with a different checksum raises, so
+re-run this module after every index rebuild:
+
+    python src/ann_index.py --nlist 1024 --quantization pq --pq-m 64
+"""
+
+import os
+import json
+import time
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from atomic_file import atomic_write
+from vector_store import VectorStore, select_top_k
+from index_format import MappedVectorStore, INDEX_PATH, SCAN_BLOCK_ROWS
+
+MAGIC = b"SOCIVF01"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+ANN_INDEX_PATH = os.path.splitext(INDEX_PATH)[0] + ".ivf"
+QUANTIZATIONS = ("int8", "pq")
+
+DEFAULT_TRAIN_SIZE = 100_000
+DEFAULT_ITERATIONS = 20
+PQ_CENTROIDS = 256
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def default_nlist(count: int) -> int:
+    """~4 * sqrt(count) lists, the usual IVF starting point."""
+    return max(1, min(count, int(4 * np.sqrt(count))))
+
+
+# ===============================
+# K-MEANS
+# ===============================
+def assign(vectors: np.ndarray, centroids: np.ndarray, spherical: bool = True) -> np.ndarray:
+    """Nearest centroid per row (highest inner product, or lowest L2 distance)."""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    half_norms = None if spherical else 0.5 * np.sum(centroids * centroids, axis=1)
+
+    for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+        scores = block @ centroids.T
+        if half_norms is not None:
+            scores -= half_norms
+        labels[start:start + len(block)] = np.argmax(scores, axis=1)
+
+    return labels
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = DEFAULT_ITERATIONS, seed: int = 0,
+           spherical: bool = True) -> np.ndarray:
+    """
+    Lloyd's k-means on `vectors` (float32). Spherical k-means keeps the
+    centroids unit-length, which is what inner-product search wants for the
+    coarse lists; PQ codebooks use plain L2 k-means on the sub-vectors.
+    Empty clusters are re-seeded from random points.
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = assign(vectors, centroids, spherical)
+        counts = np.bincount(labels, minlength=k)
+
+        order = np.argsort(labels, kind="stable")
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+
+        centroids[filled] = sums / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+
+        if spherical:
+            centroids = _normalize(centroids)
+
+    return centroids.astype(np.float32)
+
+
+# ===============================
+# QUANTIZERS
+# ===============================
+class ScalarQuantizer:
+    """
+    int8 per dimension: code = round(residual / scale). The scale is the
+    99.9th percentile of |residual| per dimension over the training sample
+    divided by 127, so a few outliers do not cost everyone precision.
+    """
+
+    kind = "int8"
+
+    def __init__(self, scale: np.ndarray):
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @classmethod
+    def train(cls, residuals: np.ndarray) -> "ScalarQuantizer":
+        scale = np.percentile(np.abs(residuals), 99.9, axis=0).astype(np.float32) / 127
+        scale[scale == 0] = 1.0
+        return cls(scale)
+
+    def encode(self, residuals: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(residuals / self.scale), -127, 127).astype(np.int8)
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        return query * self.scale
+
+    def score(self, codes: np.ndarray, prepared: np.ndarray) -> np.ndarray:
+        """query . residual for every code row."""
+        return codes.astype(np.float32) @ prepared
+
+    def arrays(self) -> dict:
+        return {"scale": self.scale}
+
+    @property
+    def code_bytes(self) -> int:
+        return len(self.scale)
+
+
+class ProductQuantizer:
+    """
+    Residuals split into `m` sub-vectors, each encoded as the index of its
+    nearest of (up to) 256 sub-centroids. Scoring is asymmetric: the query
+    stays float, and query . residual is the sum of m lookups into a
+    per-query (m, 256) table of sub-vector dot products.
+    """
+
+    kind = "pq"
+
+    def __init__(self, codebooks: np.ndarray):
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)  # (m, ksub, dsub)
+        self.m, self.ksub, self.dsub = self.codebooks.shape
+        self._offsets = (np.arange(self.m) * self.ksub).astype(np.int64)
+
+    @classmethod
+    def train(cls, residuals: np.ndarray, m: int, iterations: int = DEFAULT_ITERATIONS,
+              seed: int = 0) -> "ProductQuantizer":
+        dim = residuals.shape[1]
+        if dim % m:
+            raise ValueError(f"pq_m must divide the dimension ({dim}), got {m}")
+
+        dsub = dim // m
+        ksub = min(PQ_CENTROIDS, len(residuals))
+        codebooks = np.stack([
+            kmeans(np.ascontiguousarray(residuals[:, j * dsub:(j + 1) * dsub]), ksub, iterations,
+                   seed + j, spherical=False)
+            for j in range(m)
+        ])
+        return cls(codebooks)
+
+    def encode(self, residuals: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            sub = np.ascontiguousarray(residuals[:, j * self.dsub:(j + 1) * self.dsub])
+            codes[:, j] = assign(sub, self.codebooks[j], spherical=False)
+        return codes
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        return np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.m, self.dsub)).ravel()
+
+    def score(self, codes: np.ndarray, prepared: np.ndarray) -> np.ndarray:
+        return prepared[codes + self._offsets].sum(axis=1, dtype=np.float32)
+
+    def arrays(self) -> dict:
+        return {"codebooks": self.codebooks}
+
+    @property
+    def code_bytes(self) -> int:
+        return self.m
+
+
+def _quantizer_from_arrays(kind: str, arrays: dict):
+    if kind == "int8":
+        return ScalarQuantizer(arrays["scale"])
+    if kind == "pq":
+        return ProductQuantizer(arrays["codebooks"])
+    raise ValueError(f"Unknown quantization: {kind} (expected one of {QUANTIZATIONS})")
+
+
+# ===============================
+# INDEX
+# ===============================
+class IVFIndex(VectorStore):
+    """
+    Read-only approximate VectorStore: IVF lists of compressed residual
+    codes over a MappedVectorStore.
+
+    Lists are stored contiguously (rows sorted by list, with an offsets
+    table), so probing a list is one slice of the code matrix. `nprobe`
+    trades recall for latency, `refine` re-scores top_k * refine candidates
+    exactly (0 returns approximate scores), and `workers` threads share the
+    per-query scans of search_batch().
+    """
+
+    def __init__(self, base: MappedVectorStore, centroids: np.ndarray, list_offsets: np.ndarray,
+                 rows: np.ndarray, codes: np.ndarray, quantizer, header: Optional[dict] = None,
+                 nprobe: int = 16, refine: int = 4, workers: int = 0, path: Optional[str] = None):
+        self.base = base
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.rows = rows
+        self.codes = codes
+        self.quantizer = quantizer
+        self.header = header or {}
+        self.nprobe = nprobe
+        self.refine = refine
+        self.workers = workers or os.cpu_count() or 1
+        self.path = path
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    # -------------------------
+    # BUILD
+    # -------------------------
+    @classmethod
+    def train(cls, base: MappedVectorStore, nlist: Optional[int] = None, quantization: str = "int8",
+              pq_m: int = 64, train_size: int = DEFAULT_TRAIN_SIZE, iterations: int = DEFAULT_ITERATIONS,
+              seed: int = 0, **options) -> "IVFIndex":
+        """Cluster and encode every vector of `base`; options go to __init__ (nprobe, refine, workers)."""
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization} (expected one of {QUANTIZATIONS})")
+
+        count = len(base)
+        if count == 0:
+            raise ValueError("Cannot train an ANN index on an empty index")
+
+        nlist = min(nlist or default_nlist(count), count)
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, min(train_size, count), replace=False))
+        sample = np.asarray(base.vectors[sample_rows], dtype=np.float32)
+
+        centroids = kmeans(sample, nlist, iterations, seed)
+        residuals = sample - centroids[assign(sample, centroids)]
+        if quantization == "int8":
+            quantizer = ScalarQuantizer.train(residuals)
+        else:
+            quantizer = ProductQuantizer.train(residuals, pq_m, iterations, seed)
+
+        labels = assign(base.vectors, centroids)
+        rows = np.argsort(labels, kind="stable").astype(np.uint32)
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        list_offsets[1:] = np.cumsum(np.bincount(labels, minlength=nlist))
+
+        codes = np.empty((count, quantizer.code_bytes), dtype=np.int8 if quantization == "int8" else np.uint8)
+        for start in range(0, count, SCAN_BLOCK_ROWS):
+            block_rows = rows[start:start + SCAN_BLOCK_ROWS]
+            block = np.asarray(base.vectors[np.sort(block_rows)], dtype=np.float32)
+            block = block[np.argsort(np.argsort(block_rows))]
+            codes[start:start + len(block)] = quantizer.encode(block - centroids[labels[block_rows]])
+
+        header = {
+            "format_version": FORMAT_VERSION,
+            "quantization": quantization,
+            "dimension": int(centroids.shape[1]),
+            "count": count,
+            "nlist": nlist,
+            "train_size": len(sample_rows),
+            "base_checksum": base.header["checksum"],
+            "model": base.header["model"],
+        }
+        return cls(base, centroids, list_offsets, rows, codes, quantizer, header, **options)
+
+    # -------------------------
+    # PERSISTENCE
+    # -------------------------
+    def save(self, path: str):
+        arrays = {
+            "centroids": self.centroids,
+            "list_offsets": self.list_offsets,
+            "rows": self.rows,
+            "codes": self.codes,
+            **self.quantizer.arrays(),
+        }
+
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            offset = _align(offset)
+            layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+            offset += array.nbytes
+
+        header_bytes = json.dumps({**self.header, "arrays": layout}).encode("utf-8")
+        data_offset = _align(len(MAGIC) + 4 + len(header_bytes))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        with atomic_write(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.write(b"\0" * (data_offset + layout[name]["offset"] - f.tell()))
+                f.write(np.ascontiguousarray(array).tobytes())
+
+        self.path = path
+
+    @classmethod
+    def load(cls, path: str, base: MappedVectorStore, **options) -> "IVFIndex":
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an ANN index (bad magic)")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        if header.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported ANN index format version: {header.get('format_version')}")
+        if header["base_checksum"] != base.header["checksum"]:
+            raise ValueError(f"{path} was built for a different {base.path}; rebuild it with src/ann_index.py")
+
+        data_offset = _align(len(MAGIC) + 4 + header_len)
+        arrays = {
+            name: np.memmap(path, dtype=spec["dtype"], mode="r", offset=data_offset + spec["offset"],
+                            shape=tuple(spec["shape"]))
+            for name, spec in header.pop("arrays").items()
+        }
+        quantizer = _quantizer_from_arrays(header["quantization"], {k: np.asarray(v) for k, v in arrays.items()
+                                                                     if k in ("scale", "codebooks")})
+
+        return cls(base, np.asarray(arrays["centroids"]), np.asarray(arrays["list_offsets"]), arrays["rows"],
+                   arrays["codes"], quantizer, header, path=path, **options)
+
+    # -------------------------
+    # SEARCH
+    # -------------------------
+    def _scan(self, query: np.ndarray, coarse: np.ndarray, top_k: int, nprobe: int):
+        """(base rows, scores) best first for one normalized query, given its centroid scores."""
+        lists = select_top_k(coarse, nprobe)
+        prepared = self.quantizer.prepare(query)
+
+        row_parts, score_parts = [], []
+        for lst in lists:
+            start, end = int(self.list_offsets[lst]), int(self.list_offsets[lst + 1])
+            if start == end:
+                continue
+            row_parts.append(self.rows[start:end])
+            score_parts.append(coarse[lst] + self.quantizer.score(self.codes[start:end], prepared))
+
+        if not row_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows = np.concatenate(row_parts).astype(np.int64)
+        scores = np.concatenate(score_parts)
+
+        if self.refine > 0:
+            candidates = rows[select_top_k(scores, top_k * self.refine)]
+            candidates.sort()
+            scores = np.asarray(self.base.vectors[candidates], dtype=np.float32) @ query
+            rows = candidates
+
+        top = select_top_k(scores, top_k)
+        return rows[top], scores[top]
+
+    def search(self, vector, top_k: int = 5, nprobe: Optional[int] = None):
+        """Return (rows, scores) of the approximate top_k, best first; rows index the base .idx."""
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        return self._scan(query, self.centroids @ query, top_k, nprobe or self.nprobe)
+
+    def search_batch(self, vectors, top_k: int = 5, nprobe: Optional[int] = None,
+                     workers: Optional[int] = None) -> list:
+        """
+        search() for many queries: centroid scores for the whole batch in one
+        matrix product, then the list scans spread over `workers` threads
+        (NumPy releases the GIL inside them).
+        """
+        queries = _normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if len(self) == 0:
+            return [self.search(q, top_k) for q in queries]
+
+        coarse = queries @ self.centroids.T
+        nprobe = nprobe or self.nprobe
+        workers = workers or self.workers
+
+        def scan(i):
+            return self._scan(queries[i], coarse[i], top_k, nprobe)
+
+        if workers <= 1 or len(queries) <= 1:
+            return [scan(i) for i in range(len(queries))]
+
+        if workers != self.workers:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ann") as pool:
+                return list(pool.map(scan, range(len(queries))))
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ann")
+        return list(self._pool.map(scan, range(len(queries))))
+
+    def _matches(self, rows, scores, include_metadata: bool) -> dict:
+        matches = []
+        for row, score in zip(rows, scores):
+            rec = self.base.record(int(row))
+            match = {"id": rec["id"], "score": float(score)}
+            if include_metadata:
+                match["metadata"] = rec["metadata"]
+            matches.append(match)
+
+        return {"matches": matches}
+
+    def query(self, vector, top_k: int = 5, include_metadata: bool = True) -> dict:
+        return self._matches(*self.search(vector, top_k), include_metadata)
+
+    def query_batch(self, vectors, top_k: int = 5, include_metadata: bool = True) -> List[dict]:
+        return [self._matches(rows, scores, include_metadata) for rows, scores in self.search_batch(vectors, top_k)]
+
+    def upsert(self, vectors: List[dict]):
+        raise NotImplementedError("IVFIndex is read-only; rebuild the index file and the ANN sidecar")
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError("IVFIndex is read-only; rebuild the index file and the ANN sidecar")
+
+    def describe(self) -> dict:
+        return {
+            "engine": "ivf",
+            "path": self.path,
+            "vectors": len(self),
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "refine": self.refine,
+            "workers": self.workers,
+            "quantization": self.quantizer.kind,
+            "code_bytes": self.quantizer.code_bytes,
+            "base": self.base.describe(),
+        }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the ANN sidecar for the binary playbook index")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--output", default=None, help="Defaults to the index path with an .ivf extension")
+    parser.add_argument("--nlist", type=int, default=None, help="Defaults to ~4 * sqrt(vectors)")
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default="int8")
+    parser.add_argument("--pq-m", type=int, default=64, help="PQ sub-vectors (bytes per vector)")
+    parser.add_argument("--train-size", type=int, default=DEFAULT_TRAIN_SIZE)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    base = MappedVectorStore(args.index)
+    output = args.output or os.path.splitext(args.index)[0] + ".ivf"
+
+    started = time.perf_counter()
+    ann = IVFIndex.train(base, args.nlist, args.quantization, args.pq_m, args.train_size, args.iterations, args.seed)
+    ann.save(output)
+
+    size_mb = os.path.getsize(output) / 1e6
+    print(f"Trained {ann.nlist} lists ({args.quantization}, {ann.quantizer.code_bytes} bytes/vector) "
+          f"over {len(ann)} vectors in {time.perf_counter() - started:.1f}s")
+    print(f"Wrote {output} ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
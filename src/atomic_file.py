@@ -0,0 +1,36 @@
+"""
+Crash-safe file writes shared by the index / chunk / state writers.
+
+atomic_write() writes to a uniquely named temp file in the target's
+directory and os.replace()s it over the target on success, so readers see
+either the old file or the new one, and two writers never share a temp
+file. On failure the temp file is removed and the target is untouched.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+# mkstemp creates files 0600; outputs stay readable like a plain open() would make them
+FILE_MODE = 0o644
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w"):
+    """Open a temp file for writing (text mode is UTF-8) that replaces `path` on exit."""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
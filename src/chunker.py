@@ -1,19 +1,71 @@
+"""
+Chunking engine: extracted playbook text in, {"section", "content"} chunks out.
+
+Input is read line by line (a file, any iterable of lines, or a string), so
+a multi-hundred-page dump is never held in memory whole, and chunks are
+yielded as soon as they are complete. Page markers and section headings are
+matched with precompiled patterns, once per line. A strategy decides the
+chunk boundaries:
+
+    sections    one chunk per numbered playbook section (default; what
+                ingest.py has always produced)
+    sentences   sentences packed up to a token budget, per section or page
+    windows     fixed token windows with overlap, per section
+
+    python src/chunker.py                              # data/extracted_text -> data/chunks
+    python src/chunker.py --strategy sentences --unit page --input dump.txt
+
+ingest.py picks the strategy from CHUNK_STRATEGY (+ CHUNK_MAX_TOKENS,
+CHUNK_OVERLAP_TOKENS, CHUNK_UNIT).
+"""
 import os
 import re
+import io
 import json
+import argparse
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from atomic_file import atomic_write
 
 INPUT_DIR = "data/extracted_text"
 OUTPUT_DIR = "data/chunks"
 
+# Bump when chunk boundaries change; stored in the binary index header
+CHUNKER_VERSION = "1"
+
+MIN_CHUNK_CHARS = 150
+
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "sections")
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "128"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_UNIT = os.getenv("CHUNK_UNIT", "section")
+
+_SPACE_RE = re.compile(r"\s+")
+
+PAGE_MARKER_RE = re.compile(r"^---\s*Page\s*(\d+)\s*---$", re.IGNORECASE)
+
+# 1. Incident Overview / 2. Phase 1: Preparation & Detection / 7. Escalation Criteria / ...
+SECTION_HEADING_RE = re.compile(
+    r"^\d+\.\s*(?:Incident Overview|Phase\s+\d+\s*:\s*.+|Escalation Criteria|Objectives|References)$",
+    re.IGNORECASE,
+)
+
+# Llama-style BPE averages ~4 characters per token on English prose; words
+# longer than that split into several pieces and punctuation is its own token.
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
 
 def clean_line(line: str) -> str:
     """Basic cleanup of lines."""
-    return re.sub(r"\s+", " ", line.strip())
+    return _SPACE_RE.sub(" ", line.strip())
 
 
 def is_page_marker(line: str) -> bool:
     """Detect markers like --- Page 1 ---."""
-    return bool(re.match(r"^---\s*Page\s*\d+\s*---$", line.strip(), flags=re.IGNORECASE))
+    return bool(PAGE_MARKER_RE.match(line.strip()))
 
 
 def is_section_heading(line: str) -> bool:
@@ -24,98 +76,315 @@ def is_section_heading(line: str) -> bool:
     3. Phase 2: Analysis & Investigation
     7. Escalation Criteria
     """
-    line = clean_line(line)
+    return bool(SECTION_HEADING_RE.match(clean_line(line)))
 
-    patterns = [
-        r"^\d+\.\s*Incident Overview$",
-        r"^\d+\.\s*Phase\s+\d+\s*:\s*.+$",
-        r"^\d+\.\s*Escalation Criteria$",
-        r"^\d+\.\s*Objectives$",
-        r"^\d+\.\s*References$",
-    ]
 
-    return any(re.match(p, line, flags=re.IGNORECASE) for p in patterns)
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate; no tokenizer download, within ~10-15% of Llama 3 counts."""
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        if piece[0].isalpha():
+            tokens += 1 + (len(piece) - 1) // 6
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
 
 
-def split_into_chunks(text: str):
-    """
-    Split extracted playbook text into section-based chunks.
-    Each numbered section becomes its own chunk.
-    """
-    lines = text.splitlines()
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+# ===============================
+# LINES
+# ===============================
+class Line(NamedTuple):
+    page: Optional[int]   # from the last page marker seen, None before the first
+    raw: str              # as extracted (section chunks keep the original layout)
+    text: str             # clean_line(raw)
+
+
+def _physical_lines(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    # splitlines() per line so \r, form feeds etc. split exactly as str.splitlines() would
+    for line in io.StringIO(source) if isinstance(source, str) else source:
+        yield from line.splitlines()
 
-    chunks = []
-    current_section = "General"
-    current_content = []
 
-    for raw_line in lines:
-        if not raw_line.strip():
+def iter_lines(source: Union[str, Iterable[str]]) -> Iterator[Line]:
+    """Non-blank lines with their page number; page markers are consumed here."""
+    page = None
+
+    for raw in _physical_lines(source):
+        stripped = raw.strip()
+        if not stripped:
             continue
 
-        if is_page_marker(raw_line):
+        marker = PAGE_MARKER_RE.match(stripped)
+        if marker:
+            page = int(marker.group(1))
             continue
 
-        line = clean_line(raw_line)
+        yield Line(page, raw, _SPACE_RE.sub(" ", stripped))
+
 
-        # If this is a section heading, start a new chunk
-        if is_section_heading(line):
-            if current_content:
-                chunks.append({
-                    "section": current_section,
-                    "content": "\n".join(current_content).strip()
-                })
+def iter_sections(lines: Iterable[Line]) -> Iterator[Tuple[str, List[Line]]]:
+    """(heading, body lines) per numbered section; text before the first heading is "General"."""
+    section = "General"
+    current: List[Line] = []
 
-            current_section = line
-            current_content = []
+    for line in lines:
+        if SECTION_HEADING_RE.match(line.text):
+            if current:
+                yield section, current
+            section = line.text
+            current = []
         else:
-            current_content.append(raw_line)
+            current.append(line)
 
-    # Save final chunk
-    if current_content:
-        chunks.append({
-            "section": current_section,
-            "content": "\n".join(current_content).strip()
-        })
+    if current:
+        yield section, current
 
-    # Remove very small chunks (noise)
-    clean_chunks = []
-    for ch in chunks:
-        if len(ch["content"]) >= 150:
-            clean_chunks.append(ch)
 
-    return clean_chunks
+def iter_pages(lines: Iterable[Line]) -> Iterator[Tuple[str, List[Line]]]:
+    """("Page N", lines) per page."""
+    page, current = None, []
 
+    for line in lines:
+        if current and line.page != page:
+            yield f"Page {page}" if page is not None else "General", current
+            current = []
+        page = line.page
+        current.append(line)
 
-def main():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if current:
+        yield f"Page {page}" if page is not None else "General", current
 
-    if not os.path.exists(INPUT_DIR):
-        print(f"Input folder not found: {INPUT_DIR}")
-        return
 
-    txt_files = [f for f in os.listdir(INPUT_DIR) if f.lower().endswith(".txt")]
+# ===============================
+# STRATEGIES
+# ===============================
+class ChunkStrategy(ABC):
+    name: str
 
-    if not txt_files:
-        print("No extracted text files found.")
-        return
+    @abstractmethod
+    def chunks(self, lines: Iterable[Line]) -> Iterator[dict]:
+        ...
+
+    @property
+    @abstractmethod
+    def version(self) -> str:
+        """Changes whenever this strategy's boundaries would; ingest rebuilds on a change."""
+        ...
+
+
+class SectionStrategy(ChunkStrategy):
+    """
+    One chunk per numbered section, lines kept as extracted. Chunks under
+    `min_chars` are dropped as noise.
+    """
+
+    name = "sections"
+
+    def __init__(self, min_chars: int = MIN_CHUNK_CHARS):
+        self.min_chars = min_chars
+
+    @property
+    def version(self) -> str:
+        if self.min_chars == MIN_CHUNK_CHARS:
+            return CHUNKER_VERSION
+        return f"{CHUNKER_VERSION}+sections:{self.min_chars}"
+
+    def chunks(self, lines: Iterable[Line]) -> Iterator[dict]:
+        for section, body in iter_sections(lines):
+            content = "\n".join(line.raw for line in body).strip()
+            if len(content) >= self.min_chars:
+                yield {"section": section, "content": content}
+
+
+class SentenceStrategy(ChunkStrategy):
+    """
+    Whole sentences packed up to `max_tokens` per chunk, within each
+    section (unit="section") or page (unit="page"). A single sentence over
+    budget becomes its own chunk. Sections are labelled "<group> - Part N".
+    """
+
+    name = "sentences"
+
+    def __init__(self, max_tokens: int = 128, unit: str = "section", min_chars: int = 50):
+        if unit not in ("section", "page"):
+            raise ValueError(f"Unknown chunk unit: {unit} (expected section or page)")
+        self.max_tokens = max_tokens
+        self.unit = unit
+        self.min_chars = min_chars
+
+    @property
+    def version(self) -> str:
+        return f"{CHUNKER_VERSION}+sentences:{self.unit}:{self.max_tokens}:{self.min_chars}"
+
+    def chunks(self, lines: Iterable[Line]) -> Iterator[dict]:
+        groups = iter_sections(lines) if self.unit == "section" else iter_pages(lines)
+
+        for label, body in groups:
+            text = " ".join(line.text for line in body)
+            if len(text) < self.min_chars:
+                continue
+
+            part, current, used = 1, [], 0
 
-    print(f"Found {len(txt_files)} extracted text file(s)\n")
+            for sentence in split_sentences(text):
+                tokens = estimate_tokens(sentence)
 
-    for file in txt_files:
-        playbook_name = file.replace(".txt", "")
-        file_path = os.path.join(INPUT_DIR, file)
+                if current and used + tokens > self.max_tokens:
+                    yield {"section": f"{label} - Part {part}", "content": " ".join(current)}
+                    part, current, used = part + 1, [], 0
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            text = f.read()
+                current.append(sentence)
+                used += tokens
+
+            if current:
+                yield {"section": f"{label} - Part {part}", "content": " ".join(current)}
+
+
+class WindowStrategy(ChunkStrategy):
+    """
+    Sliding windows of up to `max_tokens` over each section's words; each
+    window starts `overlap_tokens` before the previous one ended, so text
+    near a boundary is retrievable from both sides.
+    """
+
+    name = "windows"
+
+    def __init__(self, max_tokens: int = 128, overlap_tokens: int = 32, min_chars: int = 50):
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be >= 0 and < max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_chars = min_chars
+
+    @property
+    def version(self) -> str:
+        return f"{CHUNKER_VERSION}+windows:{self.max_tokens}:{self.overlap_tokens}:{self.min_chars}"
+
+    def chunks(self, lines: Iterable[Line]) -> Iterator[dict]:
+        for section, body in iter_sections(lines):
+            words = " ".join(line.text for line in body).split(" ")
+            if sum(len(w) + 1 for w in words) < self.min_chars:
+                continue
+
+            costs = [estimate_tokens(w) for w in words]
+            start, window = 0, 1
+
+            while start < len(words):
+                end, used = start, 0
+                while end < len(words) and (end == start or used + costs[end] <= self.max_tokens):
+                    used += costs[end]
+                    end += 1
+
+                yield {"section": f"{section} - Window {window}", "content": " ".join(words[start:end])}
+
+                if end >= len(words):
+                    break
+
+                # Step back over up to overlap_tokens, always moving forward
+                next_start, overlap = end, 0
+                while next_start > start + 1 and overlap + costs[next_start - 1] <= self.overlap_tokens:
+                    next_start -= 1
+                    overlap += costs[next_start]
+
+                start, window = next_start, window + 1
+
+
+STRATEGIES = {
+    SectionStrategy.name: SectionStrategy,
+    SentenceStrategy.name: SentenceStrategy,
+    WindowStrategy.name: WindowStrategy,
+}
+
+
+def create_strategy(name: str = "sections", max_tokens: int = CHUNK_MAX_TOKENS,
+                    overlap_tokens: int = CHUNK_OVERLAP_TOKENS, unit: str = CHUNK_UNIT) -> ChunkStrategy:
+    if name == "sections":
+        return SectionStrategy()
+    if name == "sentences":
+        return SentenceStrategy(max_tokens=max_tokens, unit=unit)
+    if name == "windows":
+        return WindowStrategy(max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+    raise ValueError(f"Unknown CHUNK_STRATEGY: {name} (expected one of {sorted(STRATEGIES)})")
+
+
+# ===============================
+# ENTRY POINTS
+# ===============================
+def iter_chunks(source: Union[str, Iterable[str]], strategy: Optional[ChunkStrategy] = None) -> Iterator[dict]:
+    """Chunks of `source` (text, or an iterable of lines such as an open file) as they complete."""
+    return (strategy or SectionStrategy()).chunks(iter_lines(source))
+
+
+def chunk_file(path: str, strategy: Optional[ChunkStrategy] = None) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_chunks(f, strategy)
+
+
+def split_into_chunks(text: str, strategy: Optional[ChunkStrategy] = None) -> List[dict]:
+    """
+    Split extracted playbook text into chunks (section-based by default).
+    Each numbered section becomes its own chunk.
+    """
+    return list(iter_chunks(text, strategy))
+
+
+def write_chunks(chunks: Iterable[dict], path: str) -> int:
+    """
+    Stream chunks into a JSON array file, byte-identical to
+    json.dump(list, indent=2, ensure_ascii=False). Returns the count.
+    """
+    count = 0
+
+    with atomic_write(path) as f:
+        for chunk in chunks:
+            f.write(",\n  " if count else "[\n  ")
+            f.write(json.dumps(chunk, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "[]")
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk extracted playbook text")
+    parser.add_argument("--input", default=INPUT_DIR, help="A .txt file or a directory of them")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default=CHUNK_STRATEGY)
+    parser.add_argument("--max-tokens", type=int, default=CHUNK_MAX_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--unit", choices=["section", "page"], default=CHUNK_UNIT)
+    args = parser.parse_args()
+
+    strategy = create_strategy(args.strategy, args.max_tokens, args.overlap_tokens, args.unit)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if os.path.isdir(args.input):
+        txt_files = [os.path.join(args.input, f) for f in sorted(os.listdir(args.input)) if f.lower().endswith(".txt")]
+    elif os.path.isfile(args.input):
+        txt_files = [args.input]
+    else:
+        print(f"Input not found: {args.input}")
+        return
+
+    if not txt_files:
+        print("No extracted text files found.")
+        return
 
-        chunks = split_into_chunks(text)
+    print(f"Found {len(txt_files)} extracted text file(s), strategy {strategy.version}\n")
 
-        out_path = os.path.join(OUTPUT_DIR, f"{playbook_name}_chunks.json")
+    for file_path in txt_files:
+        playbook_name = os.path.splitext(os.path.basename(file_path))[0]
+        out_path = os.path.join(args.output_dir, f"{playbook_name}_chunks.json")
 
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
+        count = write_chunks(chunk_file(file_path, strategy), out_path)
 
-        print(f"{playbook_name}: created {len(chunks)} chunks")
+        print(f"{playbook_name}: created {count} chunks")
         print(f"Saved: {out_path}\n")
 
     print("Chunking completed successfully.")
@@ -19,6 +19,28 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     return "\n".join(full_text)
 
 
+def count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> str:
+    """
+    Extract pages [start, end) (0-based) in the same format as
+    extract_text_from_pdf, so ranges can run on separate processes and be
+    joined in order.
+    """
+    full_text = []
+
+    with pdfplumber.open(pdf_path) as pdf:
+        for i in range(start, min(end, len(pdf.pages))):
+            text = pdf.pages[i].extract_text()
+            if text:
+                full_text.append(f"\n--- Page {i + 1} ---\n{text}")
+
+    return "\n".join(full_text)
+
+
 def main():
     # Create output folder if missing
     os.makedirs(OUTPUT_DIR, exist_ok=True)
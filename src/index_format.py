@@ -0,0 +1,267 @@
+"""
+Binary playbook index (.idx), version 1
+
+    magic            8 bytes   b"SOCIDX01"
+    header_length    uint32    little-endian
+    header           JSON      format_version, dimension, count, dtype,
+                               model, chunker_version, section offsets, checksum
+    padding          to a 64-byte boundary
+    vectors          count x dimension, float32 or float16, L2-normalized
+    offsets          (count + 1) x uint64, byte offsets into the blob
+    blob             UTF-8 JSON records {"id": ..., "metadata": {...}}
+
+The vector block and offsets table are opened with np.memmap, so loading
+does no parsing; metadata records are decoded only for returned matches.
+The checksum is a CRC32 over everything after the header.
+"""
+
+import os
+import json
+import struct
+import zlib
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from atomic_file import atomic_write
+from chunker import CHUNKER_VERSION
+from vector_store import VectorStore, LocalVectorStore, select_top_k, CHUNKS_DIR, EMBEDDINGS_DIR
+
+MAGIC = b"SOCIDX01"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+MODEL_NAME = "BAAI/bge-large-en-v1.5"
+INDEX_PATH = "data/index/playbooks.idx"
+SCAN_BLOCK_ROWS = 65536
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_index(
+    path: str,
+    ids: List[str],
+    vectors,
+    metadatas: List[dict],
+    model: str = MODEL_NAME,
+    chunker_version: str = CHUNKER_VERSION,
+    dtype: str = "float32",
+):
+    """Serialize vectors + metadata into the binary index format."""
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported dtype: {dtype}")
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = np.ascontiguousarray(vectors / norms, dtype=dtype)
+
+    records = [
+        json.dumps({"id": vec_id, "metadata": meta}, ensure_ascii=False).encode("utf-8")
+        for vec_id, meta in zip(ids, metadatas)
+    ]
+    offsets = np.zeros(len(records) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(r) for r in records])
+
+    vector_bytes = vectors.tobytes()
+    offset_bytes = offsets.tobytes()
+    blob = b"".join(records)
+
+    checksum = zlib.crc32(vector_bytes)
+    checksum = zlib.crc32(offset_bytes, checksum)
+    checksum = zlib.crc32(blob, checksum)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "count": len(records),
+        "dtype": dtype,
+        "model": model,
+        "chunker_version": chunker_version,
+        "checksum": checksum,
+    }
+
+    # Section offsets depend on the header size, so reserve room for three
+    # 20-digit offsets and pad the final header with spaces to that length.
+    header.update(vectors_offset=0, offsets_offset=0, blob_offset=0)
+    header_len = len(json.dumps(header).encode("utf-8")) + 3 * 20
+    vectors_offset = _align(len(MAGIC) + 4 + header_len)
+    offsets_offset = vectors_offset + len(vector_bytes)
+    blob_offset = offsets_offset + len(offset_bytes)
+    header.update(
+        vectors_offset=vectors_offset,
+        offsets_offset=offsets_offset,
+        blob_offset=blob_offset,
+    )
+    header_bytes = json.dumps(header).encode("utf-8").ljust(header_len, b" ")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    with atomic_write(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", header_len))
+        f.write(header_bytes)
+        f.write(b"\0" * (vectors_offset - f.tell()))
+        f.write(vector_bytes)
+        f.write(offset_bytes)
+        f.write(blob)
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a playbook index (bad magic)")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format version: {header.get('format_version')}")
+
+    return header
+
+
+class MappedVectorStore(VectorStore):
+    """
+    Read-only VectorStore over a memory-mapped .idx file.
+
+    Opening only parses the header; vectors, offsets and metadata are paged
+    in by the OS on first access. Rebuild the file to change its contents.
+    """
+
+    def __init__(self, path: str, expected_model: str = None, verify: bool = False):
+        self.path = path
+        self.header = read_header(path)
+
+        if expected_model and self.header["model"] != expected_model:
+            raise ValueError(
+                f"Index built with {self.header['model']}, expected {expected_model}"
+            )
+
+        count = self.header["count"]
+        dim = self.header["dimension"]
+
+        self._vectors = np.memmap(
+            path, dtype=self.header["dtype"], mode="r",
+            offset=self.header["vectors_offset"], shape=(count, dim)
+        ) if count else np.zeros((0, dim), dtype=self.header["dtype"])
+        self._offsets = np.memmap(
+            path, dtype="<u8", mode="r",
+            offset=self.header["offsets_offset"], shape=(count + 1,)
+        )
+        self._blob = np.memmap(path, dtype=np.uint8, mode="r", offset=self.header["blob_offset"]) \
+            if self._offsets[-1] else np.zeros(0, dtype=np.uint8)
+
+        if verify:
+            self.verify()
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The memory-mapped (count, dimension) vector block, L2-normalized."""
+        return self._vectors
+
+    def verify(self):
+        """Recompute the CRC32 over the data sections (reads the whole file)."""
+        with open(self.path, "rb") as f:
+            f.seek(self.header["vectors_offset"])
+            checksum = 0
+            while True:
+                block = f.read(1 << 20)
+                if not block:
+                    break
+                checksum = zlib.crc32(block, checksum)
+
+        if checksum != self.header["checksum"]:
+            raise ValueError(f"Checksum mismatch for {self.path}")
+
+    def record(self, row: int) -> dict:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return json.loads(self._blob[start:end].tobytes().decode("utf-8"))
+
+    def records(self) -> Iterator[Tuple[str, dict]]:
+        """(ID, metadata) for every row, in row order; decodes the whole blob."""
+        for row in range(len(self)):
+            rec = self.record(row)
+            yield rec["id"], rec["metadata"]
+
+    def search(self, vector, top_k: int = 5):
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        if self._vectors.dtype == np.float32:
+            scores = self._vectors @ query
+        else:
+            # NumPy has no BLAS path for float16; upcast block by block
+            scores = np.empty(len(self), dtype=np.float32)
+            for start in range(0, len(self), SCAN_BLOCK_ROWS):
+                block = self._vectors[start:start + SCAN_BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+
+        rows = select_top_k(scores, top_k)
+        return rows, scores[rows]
+
+    def query(self, vector, top_k: int = 5, include_metadata: bool = True) -> dict:
+        rows, scores = self.search(vector, top_k)
+
+        matches = []
+        for row, score in zip(rows, scores):
+            rec = self.record(int(row))
+            match = {"id": rec["id"], "score": float(score)}
+            if include_metadata:
+                match["metadata"] = rec["metadata"]
+            matches.append(match)
+
+        return {"matches": matches}
+
+    def upsert(self, vectors: List[dict]):
+        raise NotImplementedError("MappedVectorStore is read-only; rebuild the index file")
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError("MappedVectorStore is read-only; rebuild the index file")
+
+    def describe(self) -> dict:
+        return {
+            "engine": "mmap",
+            "path": self.path,
+            "vectors": self.header["count"],
+            "dimension": self.header["dimension"],
+            "dtype": self.header["dtype"],
+            "model": self.header["model"],
+            "chunker_version": self.header["chunker_version"],
+        }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the binary playbook index")
+    parser.add_argument("--chunks-dir", default=CHUNKS_DIR)
+    parser.add_argument("--embeddings-dir", default=EMBEDDINGS_DIR)
+    parser.add_argument("--output", default=INDEX_PATH)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+
+    store = LocalVectorStore.from_chunks_dir(args.chunks_dir, args.embeddings_dir)
+    ids, vectors, metadatas = store.export()
+
+    if not ids:
+        print("No chunks with embeddings found, nothing to write.")
+        return
+
+    write_index(args.output, ids, vectors, metadatas, dtype=args.dtype)
+
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"Wrote {len(ids)} vectors ({args.dtype}) to {args.output} ({size_kb:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from atomic_file import atomic_write
+from vector_store import LocalVectorStore, chunk_id, iter_chunk_files, CHUNKS_DIR, EMBEDDINGS_DIR
+
+STATE_PATH = "data/index_state.json"
+
+# rag_service /cache/invalidate, called after every sync so cached answers and
+# retrievals from before it are dropped; set it empty to skip
+RAG_INVALIDATE_URL = os.getenv("RAG_INVALIDATE_URL", "http://localhost:8002/cache/invalidate")
+
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "4"))
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+
+
+# ===============================
+# STATE
+# ===============================
+def state_path(target: str) -> str:
+    """Per-target state file, shared with ingest.py --upsert."""
+    return STATE_PATH.replace(".json", f".{target}.json")
+
+
+def load_state(path: str = STATE_PATH) -> dict:
+    """IDs currently in the target index, as {id: playbook}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state: dict, path: str = STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path) as f:
+        json.dump(state, f)
+
+
+# ===============================
+# CHUNKS
+# ===============================
+def load_chunks(chunks_dir: str = CHUNKS_DIR, embeddings_dir: str = EMBEDDINGS_DIR) -> dict:
+    """
+    Every chunk under chunks_dir keyed by stable ID:
+    {id: {"playbook", "section", "content", "vector" (precomputed or None)}}
+    """
+    records = {}
+
+    for playbook, chunks in iter_chunk_files(chunks_dir):
+        vectors = None
+        emb_path = os.path.join(embeddings_dir, f"{playbook}_embeddings.npy")
+        if os.path.exists(emb_path):
+            vectors = np.load(emb_path)
+            if len(vectors) != len(chunks):
+                vectors = None
+
+        for i, ch in enumerate(chunks):
+            records[chunk_id(playbook, ch["section"], ch["content"])] = {
+                "playbook": playbook,
+                "section": ch["section"],
+                "content": ch["content"],
+                "vector": vectors[i] if vectors is not None else None,
+            }
+
+    return records
+
+
+def plan_delta(records: dict, state: dict):
+    """Return (ids to upsert, ids to delete)."""
+    to_upsert = [vec_id for vec_id in records if vec_id not in state]
+    to_delete = [vec_id for vec_id in state if vec_id not in records]
+    return to_upsert, to_delete
+
+
+# ===============================
+# WRITES
+# ===============================
+def batched(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def upsert_batches(store, vectors: list, batch_size: int = UPSERT_BATCH_SIZE, concurrency: int = UPSERT_CONCURRENCY):
+    """Upsert in fixed-size batches with up to `concurrency` requests in flight."""
+    batches = list(batched(vectors, batch_size))
+    if concurrency <= 1 or len(batches) <= 1:
+        for batch in batches:
+            store.upsert(batch)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # list() re-raises the first failed batch
+        list(pool.map(store.upsert, batches))
+
+
+def delete_batches(store, ids: list, batch_size: int = DELETE_BATCH_SIZE):
+    for batch in batched(ids, batch_size):
+        store.delete(batch)
+
+
+def invalidate_rag_caches(url: str = RAG_INVALIDATE_URL):
+    if not url:
+        return
+
+    import requests
+
+    try:
+        requests.post(url, json={}, timeout=10).raise_for_status()
+    except Exception as e:
+        print(f"rag_service cache invalidation failed ({url}): {e}")
+
+
+# ===============================
+# TARGETS
+# ===============================
+class LocalIndexTarget:
+    """
+    Local stand-in for Pinecone: applies the delta to a LocalVectorStore
+    loaded from the binary .idx file and writes it back on close(), keeping
+    the existing file's dtype, model and chunker_version.
+    """
+
+    def __init__(self, path: str):
+        from index_format import MappedVectorStore, write_index
+
+        self.path = path
+        self._write_index = write_index
+        self.store = LocalVectorStore()
+        self.header_options = {}  # write_index defaults for a new file
+
+        if os.path.exists(path):
+            mapped = MappedVectorStore(path)
+            self.header_options = {key: mapped.header[key] for key in ("dtype", "model", "chunker_version")}
+            vectors = np.asarray(mapped.vectors, dtype=np.float32)
+            records = [mapped.record(row) for row in range(len(mapped))]
+            self.store.add(
+                [r["id"] for r in records],
+                vectors,
+                [r["metadata"] for r in records]
+            )
+
+    def upsert(self, vectors: list):
+        self.store.upsert(vectors)
+
+    def delete(self, ids: list):
+        self.store.delete(ids)
+
+    def close(self):
+        ids, vectors, metadatas = self.store.export()
+        self._write_index(self.path, ids, vectors, metadatas, **self.header_options)
+
+
+def create_target(name: str, index_path: str):
+    if name == "pinecone":
+        from vector_store import PineconeStore
+        return PineconeStore(os.getenv("PINECONE_API_KEY"), os.getenv("PINECONE_INDEX_NAME", "playbook"))
+    return LocalIndexTarget(index_path)
+
+
+# ===============================
+# MAIN
+# ===============================
+def main():
+    from index_format import INDEX_PATH
+
+    parser = argparse.ArgumentParser(description="Sync data/chunks into the vector index")
+    parser.add_argument("--target", choices=["pinecone", "local"], default="pinecone")
+    parser.add_argument("--index-path", default=INDEX_PATH, help="Output file for --target local")
+    parser.add_argument("--chunks-dir", default=CHUNKS_DIR)
+    parser.add_argument("--embeddings-dir", default=EMBEDDINGS_DIR)
+    parser.add_argument("--state", default=None, help="Defaults to data/index_state.<target>.json")
+    parser.add_argument("--full", action="store_true", help="Ignore saved state and upsert everything")
+    args = parser.parse_args()
+
+    target_state_path = args.state or state_path(args.target)
+    state = {} if args.full else load_state(target_state_path)
+
+    started = time.perf_counter()
+    records = load_chunks(args.chunks_dir, args.embeddings_dir)
+    to_upsert, to_delete = plan_delta(records, state)
+    scan_s = time.perf_counter() - started
+
+    print(f"{len(records)} chunks scanned: {len(to_upsert)} to upsert, {len(to_delete)} to delete")
+
+    if not to_upsert and not to_delete:
+        print("Index already in sync.")
+        return
+
+    # Embed only chunks without precomputed vectors, in large batches
+    embed_started = time.perf_counter()
+    missing = [vec_id for vec_id in to_upsert if records[vec_id]["vector"] is None]
+    if missing:
+        from ingest import embed_texts
+
+        embedded = embed_texts([records[vec_id]["content"] for vec_id in missing])
+        for vec_id, vec in zip(missing, embedded):
+            records[vec_id]["vector"] = vec
+    embed_s = time.perf_counter() - embed_started
+
+    target = create_target(args.target, args.index_path)
+
+    upsert_started = time.perf_counter()
+    # LocalVectorStore is not thread-safe; only fan out against Pinecone
+    concurrency = UPSERT_CONCURRENCY if args.target == "pinecone" else 1
+    upsert_batches(target, [
+        {
+            "id": vec_id,
+            "values": np.asarray(records[vec_id]["vector"], dtype=np.float32).tolist(),
+            "metadata": {
+                "playbook": records[vec_id]["playbook"],
+                "section": records[vec_id]["section"],
+                "content": records[vec_id]["content"],
+            },
+        }
+        for vec_id in to_upsert
+    ], concurrency=concurrency)
+    delete_batches(target, to_delete)
+
+    if hasattr(target, "close"):
+        target.close()
+    upsert_s = time.perf_counter() - upsert_started
+
+    for vec_id in to_delete:
+        state.pop(vec_id, None)
+    for vec_id in to_upsert:
+        state[vec_id] = records[vec_id]["playbook"]
+    save_state(state, target_state_path)
+    invalidate_rag_caches()
+
+    total_s = time.perf_counter() - started
+    print(f"Scanned:  {len(records) / max(scan_s, 1e-9):.0f} chunks/s")
+    if missing:
+        print(f"Embedded: {len(missing)} chunks at {len(missing) / max(embed_s, 1e-9):.1f} chunks/s")
+    print(f"Upserted: {len(to_upsert)} vectors at {len(to_upsert) / max(upsert_s, 1e-9):.1f} vectors/s")
+    print(f"Deleted:  {len(to_delete)} orphaned vectors")
+    print(f"Total:    {total_s:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
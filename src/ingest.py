@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import requests
+
+from atomic_file import atomic_write
+from extract import count_pages, extract_page_range, PLAYBOOKS_DIR, OUTPUT_DIR as TEXT_DIR
+from chunker import create_strategy, split_into_chunks, CHUNK_STRATEGY, OUTPUT_DIR as CHUNKS_DIR
+from vector_store import EMBEDDINGS_DIR, chunk_id
+from indexer import upsert_batches, delete_batches, invalidate_rag_caches, load_state, save_state, state_path
+
+MANIFEST_PATH = "data/ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+EMBEDDING_BATCH_URL = os.getenv("EMBEDDING_BATCH_URL", "http://localhost:8001/embed/batch")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "8"))
+
+# CHUNK_STRATEGY (+ CHUNK_MAX_TOKENS, ...) from chunker.py; changing it re-chunks every playbook
+CHUNKING = create_strategy(CHUNK_STRATEGY)
+
+
+# ===============================
+# MANIFEST
+# ===============================
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "chunker_version": CHUNKING.version, "playbooks": {}}
+
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    # Chunk boundaries changed: every playbook has to be rebuilt
+    if manifest.get("chunker_version") != CHUNKING.version:
+        manifest["playbooks"] = {}
+        manifest["chunker_version"] = CHUNKING.version
+
+    return manifest
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path) as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def plan_changes(manifest: dict, playbooks_dir: str = PLAYBOOKS_DIR):
+    """Return (changed {pdf: sha256}, removed [pdf]) relative to the manifest."""
+    known = manifest["playbooks"]
+    current = {}
+
+    if os.path.exists(playbooks_dir):
+        for pdf in sorted(os.listdir(playbooks_dir)):
+            if pdf.lower().endswith(".pdf"):
+                current[pdf] = file_sha256(os.path.join(playbooks_dir, pdf))
+
+    changed = {
+        pdf: sha for pdf, sha in current.items()
+        if known.get(pdf, {}).get("sha256") != sha
+    }
+    removed = [pdf for pdf in known if pdf not in current]
+
+    return changed, removed
+
+
+# ===============================
+# PIPELINE STAGES
+# ===============================
+def submit_extraction(pool: ProcessPoolExecutor, pdf_path: str):
+    """Split a PDF into page ranges and extract them on the process pool."""
+    pages = count_pages(pdf_path)
+    return [
+        pool.submit(extract_page_range, pdf_path, start, start + PAGES_PER_TASK)
+        for start in range(0, max(pages, 1), PAGES_PER_TASK)
+    ]
+
+
+def embed_texts(texts):
+    """Embed texts through the embedding service's batch endpoint."""
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        response = requests.post(
+            EMBEDDING_BATCH_URL,
+            json={"texts": texts[start:start + EMBED_BATCH_SIZE]},
+            timeout=300
+        )
+        response.raise_for_status()
+        vectors.extend(response.json()["embeddings"])
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def playbook_name(pdf: str) -> str:
+    return pdf[:-len(".pdf")] if pdf.lower().endswith(".pdf") else pdf
+
+
+def write_outputs(name: str, text: str, chunks: list, vectors: np.ndarray):
+    os.makedirs(TEXT_DIR, exist_ok=True)
+    os.makedirs(CHUNKS_DIR, exist_ok=True)
+    os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+
+    with open(os.path.join(TEXT_DIR, f"{name}.txt"), "w", encoding="utf-8") as f:
+        f.write(text)
+
+    with open(os.path.join(CHUNKS_DIR, f"{name}_chunks.json"), "w", encoding="utf-8") as f:
+        json.dump(chunks, f, indent=2, ensure_ascii=False)
+
+    np.save(os.path.join(EMBEDDINGS_DIR, f"{name}_embeddings.npy"), vectors)
+
+
+def remove_outputs(name: str):
+    for path in (
+        os.path.join(TEXT_DIR, f"{name}.txt"),
+        os.path.join(CHUNKS_DIR, f"{name}_chunks.json"),
+        os.path.join(EMBEDDINGS_DIR, f"{name}_embeddings.npy"),
+    ):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def create_upsert_store(target: str):
+    if target == "pinecone":
+        from vector_store import PineconeStore
+        return PineconeStore(os.getenv("PINECONE_API_KEY"), os.getenv("PINECONE_INDEX_NAME", "playbook"))
+    return None
+
+
+# ===============================
+# MAIN
+# ===============================
+def main():
+    parser = argparse.ArgumentParser(description="Incremental playbook ingestion")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--upsert", choices=["none", "pinecone"], default="none",
+                        help="Also push vectors to a remote index")
+    parser.add_argument("--force", action="store_true", help="Rebuild every playbook")
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    if args.force:
+        manifest["playbooks"] = {}
+
+    changed, removed = plan_changes(manifest)
+
+    if not changed and not removed:
+        print("All playbooks up to date.")
+        return
+
+    print(f"{len(changed)} new/changed, {len(removed)} removed playbook(s)\n")
+    store = create_upsert_store(args.upsert)
+    # What the target index holds, shared with indexer.py so neither re-upserts the other's work
+    state = load_state(state_path(args.upsert)) if store else {}
+    started = time.perf_counter()
+
+    def indexed_ids(name: str) -> set:
+        return {vec_id for vec_id, playbook in state.items() if playbook == name}
+
+    for pdf in removed:
+        manifest["playbooks"].pop(pdf)
+        name = playbook_name(pdf)
+        remove_outputs(name)
+        if store:
+            stale = indexed_ids(name)
+            delete_batches(store, list(stale))
+            for vec_id in stale:
+                state.pop(vec_id)
+            save_state(state, state_path(args.upsert))
+        print(f"Removed: {pdf}")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Queue every page range up front; each playbook then moves on to
+        # chunk -> embed -> upsert as soon as its own pages are done.
+        pending = {}
+        for pdf in changed:
+            try:
+                pending[pdf] = submit_extraction(pool, os.path.join(PLAYBOOKS_DIR, pdf))
+            except Exception as e:
+                print(f"Failed to open {pdf}: {e}")
+
+        for pdf, futures in pending.items():
+            name = playbook_name(pdf)
+            try:
+                text = "\n".join(part for part in (f.result() for f in futures) if part)
+                chunks = split_into_chunks(text, CHUNKING)
+                vectors = embed_texts([ch["content"] for ch in chunks]) if chunks else np.zeros((0, 0), dtype=np.float32)
+                write_outputs(name, text, chunks, vectors)
+
+                if store:
+                    # Stable IDs: unchanged chunks keep their ID and are skipped
+                    ids = [chunk_id(name, ch["section"], ch["content"]) for ch in chunks]
+                    old_ids, new_ids = indexed_ids(name), set(ids)
+                    stale = [i for i in old_ids if i not in new_ids]
+                    delete_batches(store, stale)
+                    upsert_batches(store, [
+                        {"id": vec_id, "values": vec.tolist(),
+                         "metadata": {"playbook": name, "section": ch["section"], "content": ch["content"]}}
+                        for vec_id, vec, ch in zip(ids, vectors, chunks)
+                        if vec_id not in old_ids
+                    ])
+                    for vec_id in stale:
+                        state.pop(vec_id)
+                    state.update((vec_id, name) for vec_id in ids)
+                    save_state(state, state_path(args.upsert))
+
+            except Exception as e:
+                print(f"Failed for {pdf}: {e}\n")
+                continue
+
+            manifest["playbooks"][pdf] = {"sha256": changed[pdf], "chunks": len(chunks)}
+            save_manifest(manifest)
+            print(f"{name}: {len(text)} chars, {len(chunks)} chunks")
+
+    save_manifest(manifest)
+    invalidate_rag_caches()
+
+    print(f"\nIngestion completed in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import os
+import re
+import json
+import math
+import argparse
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from atomic_file import atomic_write
+from vector_store import iter_chunks_dir, CHUNKS_DIR
+
+LEXICAL_INDEX_PATH = "data/index/lexical.json"
+LEXICAL_FORMAT_VERSION = 1
+
+# Keeps SOC tokens whole: "t1566.001", "4625", "10.0.0.5", "cve-2023-23397", "mimikatz.exe"
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-/:][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it of on or should
+the this to was we what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms with stopwords dropped. Compound tokens are also split
+    into their parts, so "proofpoint-tap" matches both the whole token and
+    "proofpoint" / "tap".
+    """
+    terms = []
+    for token in TOKEN_RE.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+
+        parts = re.split(r"[._\-/:]", token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p and p not in STOPWORDS)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> List[tuple]:
+    """
+    Fuse ranked ID lists: score(id) = sum(weight / (k + rank)), rank from 1.
+    Returns [(id, score), ...] best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring over chunk section +
+    content.
+
+    Documents are added and deleted one at a time (no rebuild): postings
+    map term -> {row: term frequency}, and the corpus statistics BM25 needs
+    (document count, total length) are updated in place. Deleted rows are
+    reused by later inserts. to_dict()/save() serialize the whole index.
+
+    `source` optionally names what the index was last synced from (see
+    load_for_source), so a saved index can be trusted without a re-sync.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[dict]] = []
+        self._lengths: List[int] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._total_length = 0
+        self.source: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    # -------------------------
+    # WRITES
+    # -------------------------
+    def add(self, doc_id: str, metadata: dict):
+        """Index (or re-index) one chunk; metadata needs "content" and optionally "section"."""
+        if doc_id in self._rows:
+            self.delete([doc_id])
+
+        terms = tokenize(metadata.get("section", "")) + tokenize(metadata.get("content", ""))
+
+        if self._free:
+            row = self._free.pop()
+            self._ids[row] = doc_id
+            self._metadata[row] = metadata
+            self._lengths[row] = len(terms)
+        else:
+            row = len(self._ids)
+            self._ids.append(doc_id)
+            self._metadata.append(metadata)
+            self._lengths.append(len(terms))
+
+        self._rows[doc_id] = row
+        self._total_length += len(terms)
+
+        for term, tf in Counter(terms).items():
+            self._postings.setdefault(term, {})[row] = tf
+
+    def upsert(self, vectors: List[dict]):
+        """Same record shape as VectorStore.upsert; "values" is ignored."""
+        for item in vectors:
+            self.add(item["id"], item.get("metadata", {}))
+
+    def delete(self, ids: List[str]):
+        for doc_id in ids:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                continue
+
+            metadata = self._metadata[row]
+            terms = set(tokenize(metadata.get("section", "")) + tokenize(metadata.get("content", "")))
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(row, None)
+                if not postings:
+                    del self._postings[term]
+
+            self._total_length -= self._lengths[row]
+            self._ids[row] = None
+            self._metadata[row] = None
+            self._lengths[row] = 0
+            self._free.append(row)
+
+    def sync_chunks_dir(self, chunks_dir: str = CHUNKS_DIR) -> tuple:
+        """Bring the index in line with <playbook>_chunks.json files; returns (added, deleted)."""
+        return self.sync(iter_chunks_dir(chunks_dir))
+
+    def sync(self, records: Iterable[Tuple[str, dict]]) -> tuple:
+        """
+        Bring the index in line with (chunk ID, metadata) records. Chunk IDs
+        are content hashes, so only new chunks are tokenized and only
+        vanished ones removed. Returns (added, deleted).
+        """
+        current = dict(records)
+        self.source = None
+
+        stale = [doc_id for doc_id in self._rows if doc_id not in current]
+        fresh = [doc_id for doc_id in current if doc_id not in self._rows]
+
+        self.delete(stale)
+        for doc_id in fresh:
+            self.add(doc_id, current[doc_id])
+
+        return len(fresh), len(stale)
+
+    # -------------------------
+    # SEARCH
+    # -------------------------
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.0, min_ratio: float = 0.0) -> List[dict]:
+        """
+        [{"id", "score", "metadata"}, ...] best first; documents sharing no
+        term are never returned, nor are hits scoring below `min_score` or
+        below `min_ratio` of the best hit's score.
+        """
+        n_docs = len(self._rows)
+        if not n_docs:
+            return []
+
+        avg_length = self._total_length / n_docs
+        scores: Dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[row] / avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        floor = max(min_score, best[0][1] * min_ratio) if best else 0.0
+        return [
+            {"id": self._ids[row], "score": score, "metadata": self._metadata[row]}
+            for row, score in best
+            if score >= floor
+        ]
+
+    def query(self, text: str, top_k: int = 5) -> dict:
+        """Pinecone-shaped response, like VectorStore.query()."""
+        return {"matches": self.search(text, top_k)}
+
+    def describe(self) -> dict:
+        return {"engine": "bm25", "documents": len(self), "terms": len(self._postings)}
+
+    # -------------------------
+    # SERIALIZATION
+    # -------------------------
+    def to_dict(self) -> dict:
+        rows = sorted(self._rows.values())
+        remap = {row: i for i, row in enumerate(rows)}
+
+        return {
+            "version": LEXICAL_FORMAT_VERSION,
+            "source": self.source,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": [self._ids[row] for row in rows],
+            "metadata": [self._metadata[row] for row in rows],
+            "lengths": [self._lengths[row] for row in rows],
+            "postings": {
+                term: [[remap[row], tf] for row, tf in postings.items()]
+                for term, postings in self._postings.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        if data.get("version") != LEXICAL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported lexical index version: {data.get('version')}")
+
+        index = cls(k1=data["k1"], b=data["b"])
+        index._ids = list(data["ids"])
+        index._metadata = list(data["metadata"])
+        index._lengths = list(data["lengths"])
+        index._rows = {doc_id: row for row, doc_id in enumerate(index._ids)}
+        index._total_length = sum(index._lengths)
+        index._postings = {
+            term: {row: tf for row, tf in postings}
+            for term, postings in data["postings"].items()
+        }
+        index.source = data.get("source")
+        return index
+
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with atomic_write(path) as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def load_or_build(cls, path: str = LEXICAL_INDEX_PATH, chunks_dir: str = CHUNKS_DIR) -> "BM25Index":
+        """Load the saved index if there is one, sync it with chunks_dir and save back any changes."""
+        index = cls.load(path) if os.path.exists(path) else cls()
+        stamped = index.source is not None
+        added, deleted = index.sync_chunks_dir(chunks_dir)
+
+        if added or deleted or stamped or not os.path.exists(path):
+            index._save_quietly(path)
+
+        return index
+
+    @classmethod
+    def load_for_source(cls, path: str, source: str,
+                        records: Callable[[], Iterable[Tuple[str, dict]]]) -> "BM25Index":
+        """
+        Load the saved index as is when it was last synced from `source`
+        (e.g. a binary index checksum); otherwise sync it with records()
+        and save it stamped with `source`.
+        """
+        index = cls.load(path) if os.path.exists(path) else cls()
+        if index.source == source:
+            return index
+
+        index.sync(records())
+        index.source = source
+        index._save_quietly(path)
+        return index
+
+    def _save_quietly(self, path: str):
+        try:
+            self.save(path)
+        except OSError as e:
+            print(f"Could not save lexical index to {path}: {e}")
+
+
+# ===============================
+# MAIN
+# ===============================
+def main():
+    parser = argparse.ArgumentParser(description="Build / update the BM25 index over data/chunks")
+    parser.add_argument("--chunks-dir", default=CHUNKS_DIR)
+    parser.add_argument("--index-path", default=LEXICAL_INDEX_PATH)
+    parser.add_argument("--query", help="Run a test query after syncing")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    index = BM25Index.load(args.index_path) if os.path.exists(args.index_path) else BM25Index()
+    added, deleted = index.sync_chunks_dir(args.chunks_dir)
+    index.save(args.index_path)
+
+    print(f"{len(index)} chunks indexed ({added} added, {deleted} removed), {index.describe()['terms']} terms")
+    print(f"Saved: {args.index_path}")
+
+    if args.query:
+        for hit in index.search(args.query, args.top_k):
+            print(f"{hit['score']:.3f}  {hit['id']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+import os
+import re
+import json
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+CHUNKS_DIR = "data/chunks"
+EMBEDDINGS_DIR = "data/embeddings"
+
+CHUNKS_SUFFIX = "_chunks.json"
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def chunk_id(playbook: str, section: str, content: str) -> str:
+    """
+    Stable vector ID: playbook + section slugs and a hash of the content.
+    Re-chunking an unchanged playbook yields the same IDs, so only chunks
+    whose text actually changed need re-embedding / re-upserting.
+    """
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+    return f"{_slug(playbook)}:{_slug(section)[:48]}:{digest}"
+
+
+def iter_chunk_files(chunks_dir: str = CHUNKS_DIR) -> Iterator[Tuple[str, List[dict]]]:
+    """(playbook, chunks) for every <playbook>_chunks.json under chunks_dir, by file name."""
+    if not os.path.exists(chunks_dir):
+        return
+
+    for file in sorted(os.listdir(chunks_dir)):
+        if file.endswith(CHUNKS_SUFFIX):
+            with open(os.path.join(chunks_dir, file), "r", encoding="utf-8") as f:
+                yield file[:-len(CHUNKS_SUFFIX)], json.load(f)
+
+
+def iter_chunks_dir(chunks_dir: str = CHUNKS_DIR) -> Iterator[Tuple[str, dict]]:
+    """(chunk ID, {"playbook", "section", "content"}) for every chunk under chunks_dir."""
+    for playbook, chunks in iter_chunk_files(chunks_dir):
+        for ch in chunks:
+            yield chunk_id(playbook, ch["section"], ch["content"]), {
+                "playbook": playbook,
+                "section": ch["section"],
+                "content": ch["content"],
+            }
+
+
+def select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (argpartition, no full sort)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+
+    return top[np.argsort(-scores[top])]
+
+
+class VectorStore(ABC):
+    """
+    Minimal vector index interface used by rag_service.
+
+    query() returns the same shape as a Pinecone query response:
+    {"matches": [{"id": ..., "score": ..., "metadata": {...}}, ...]}
+    """
+
+    @abstractmethod
+    def query(self, vector, top_k: int = 5, include_metadata: bool = True) -> dict:
+        ...
+
+    @abstractmethod
+    def upsert(self, vectors: List[dict]):
+        """vectors: [{"id": str, "values": [...], "metadata": {...}}, ...]"""
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        ...
+
+    @abstractmethod
+    def describe(self) -> dict:
+        ...
+
+
+# ===============================
+# CHUNK CONTENT
+# ===============================
+class ChunkStore:
+    """
+    Local chunk ID -> metadata map ({"playbook", "section", "content"}),
+    so vector queries can skip include_metadata and still resolve content.
+
+    Filled from the chunker output; IDs are chunk_id() hashes, the same the
+    ingesters upsert, so a match from any engine resolves here.
+    """
+
+    def __init__(self):
+        self._chunks: Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __contains__(self, chunk: str) -> bool:
+        return chunk in self._chunks
+
+    def get(self, chunk: str) -> Optional[dict]:
+        return self._chunks.get(chunk)
+
+    def put(self, chunk: str, metadata: dict):
+        self._chunks[chunk] = metadata
+
+    def sync_chunks_dir(self, chunks_dir: str = CHUNKS_DIR) -> tuple:
+        """Replace the contents with <playbook>_chunks.json files; returns (added, deleted)."""
+        current = dict(iter_chunks_dir(chunks_dir))
+
+        added = sum(1 for chunk in current if chunk not in self._chunks)
+        deleted = sum(1 for chunk in self._chunks if chunk not in current)
+        self._chunks = current
+        return added, deleted
+
+    @classmethod
+    def from_chunks_dir(cls, chunks_dir: str = CHUNKS_DIR) -> "ChunkStore":
+        store = cls()
+        store.sync_chunks_dir(chunks_dir)
+        return store
+
+    def describe(self) -> dict:
+        return {"chunks": len(self._chunks)}
+
+
+# ===============================
+# PINECONE
+# ===============================
+class PineconeStore(VectorStore):
+    """Thin adapter over a remote Pinecone index."""
+
+    def __init__(self, api_key: str, index_name: str, host: Optional[str] = None):
+        from pinecone import Pinecone
+
+        self.index_name = index_name
+        # An explicit data-plane host skips the control-plane lookup
+        # (also how bench/fake_upstreams.py stands in for Pinecone)
+        if host:
+            self.index = Pinecone(api_key=api_key).Index(index_name, host=host)
+        else:
+            self.index = Pinecone(api_key=api_key).Index(index_name)
+
+    def query(self, vector, top_k: int = 5, include_metadata: bool = True) -> dict:
+        return self.index.query(
+            vector=np.asarray(vector, dtype=np.float32).tolist(),
+            top_k=top_k,
+            include_metadata=include_metadata
+        )
+
+    def upsert(self, vectors: List[dict]):
+        self.index.upsert(vectors=vectors)
+
+    def delete(self, ids: List[str]):
+        self.index.delete(ids=ids)
+
+    def describe(self) -> dict:
+        return {"engine": "pinecone", "index": self.index_name}
+
+
+# ===============================
+# LOCAL (NUMPY)
+# ===============================
+class LocalVectorStore(VectorStore):
+    """
+    In-process exact cosine search.
+
+    Vectors are L2-normalized on insert and kept in one contiguous float32
+    matrix, so a query is a single matrix-vector product followed by an
+    argpartition top-k. Deletes swap the last row into the freed slot to
+    keep the matrix dense.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024):
+        self.dim = dim
+        self._capacity = initial_capacity
+        self._matrix = np.zeros((initial_capacity, dim), dtype=np.float32) if dim else None
+        self._size = 0
+        self._ids: List[str] = []
+        self._metadata: List[dict] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _ensure_capacity(self, needed: int):
+        if self._matrix is None:
+            self._matrix = np.zeros((max(needed, self._capacity), self.dim), dtype=np.float32)
+            return
+
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+
+        new_capacity = max(needed, capacity * 2)
+        grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def add(self, ids: List[str], vectors, metadatas: Optional[List[dict]] = None):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected dimension {self.dim}, got {vectors.shape[1]}")
+
+        metadatas = metadatas or [{} for _ in ids]
+        vectors = self._normalize(vectors)
+
+        for vec_id, vec, meta in zip(ids, vectors, metadatas):
+            row = self._rows.get(vec_id)
+
+            if row is None:
+                self._ensure_capacity(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._ids.append(vec_id)
+                self._metadata.append(meta)
+                self._rows[vec_id] = row
+            else:
+                self._metadata[row] = meta
+
+            self._matrix[row] = vec
+
+    def upsert(self, vectors: List[dict]):
+        if not vectors:
+            return
+        self.add(
+            [v["id"] for v in vectors],
+            [v["values"] for v in vectors],
+            [v.get("metadata", {}) for v in vectors]
+        )
+
+    def delete(self, ids: List[str]):
+        for vec_id in ids:
+            row = self._rows.pop(vec_id, None)
+            if row is None:
+                continue
+
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._metadata[row] = self._metadata[last]
+                self._rows[self._ids[row]] = row
+
+            self._ids.pop()
+            self._metadata.pop()
+            self._size -= 1
+
+    def search(self, vector, top_k: int = 5):
+        """Return (rows, scores) of the top_k most similar vectors, best first."""
+        if self._size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        scores = self._matrix[:self._size] @ query
+
+        rows = select_top_k(scores, top_k)
+        return rows, scores[rows]
+
+    def query(self, vector, top_k: int = 5, include_metadata: bool = True) -> dict:
+        rows, scores = self.search(vector, top_k)
+
+        matches = []
+        for row, score in zip(rows, scores):
+            match = {"id": self._ids[row], "score": float(score)}
+            if include_metadata:
+                match["metadata"] = self._metadata[row]
+            matches.append(match)
+
+        return {"matches": matches}
+
+    def describe(self) -> dict:
+        return {"engine": "local", "vectors": self._size, "dimension": self.dim}
+
+    def export(self):
+        """Return (ids, normalized vectors, metadatas) for serialization."""
+        if self._matrix is None:
+            return [], np.zeros((0, self.dim or 0), dtype=np.float32), []
+        return list(self._ids), self._matrix[:self._size], list(self._metadata)
+
+    @classmethod
+    def from_chunks_dir(
+        cls,
+        chunks_dir: str = CHUNKS_DIR,
+        embeddings_dir: str = EMBEDDINGS_DIR,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    ) -> "LocalVectorStore":
+        """
+        Build a store from the chunker output (<playbook>_chunks.json) and the
+        matching embeddings (<playbook>_embeddings.npy, one row per chunk).
+        If an embeddings file is missing and embed_fn is given, the chunk
+        contents are embedded with it instead.
+        """
+        store = cls()
+
+        for playbook_name, chunks in iter_chunk_files(chunks_dir):
+            if not chunks:
+                continue
+
+            emb_path = os.path.join(embeddings_dir, f"{playbook_name}_embeddings.npy")
+            if os.path.exists(emb_path):
+                vectors = np.load(emb_path)
+            elif embed_fn is not None:
+                vectors = np.asarray(embed_fn([ch["content"] for ch in chunks]), dtype=np.float32)
+            else:
+                print(f"Skipping {playbook_name}: no embeddings found at {emb_path}")
+                continue
+
+            if len(vectors) != len(chunks):
+                raise ValueError(
+                    f"{playbook_name}: {len(chunks)} chunks but {len(vectors)} embeddings"
+                )
+
+            ids = [chunk_id(playbook_name, ch["section"], ch["content"]) for ch in chunks]
+            metadatas = [
+                {"playbook": playbook_name, "section": ch["section"], "content": ch["content"]}
+                for ch in chunks
+            ]
+            store.add(ids, vectors, metadatas)
+
+        return store
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from ann_index import IVFIndex
+from index_format import MappedVectorStore, write_index
+from vector_store import select_top_k
+
+COUNT, DIM, CLUSTERS, TOP_K = 2000, 32, 20, 10
+
+
+def clustered(rng, count: int) -> np.ndarray:
+    topics = rng.standard_normal((CLUSTERS, DIM)).astype(np.float32)
+    vectors = topics[rng.integers(0, CLUSTERS, count)] + 1.5 * rng.standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(scope="module")
+def base(tmp_path_factory):
+    vectors = clustered(np.random.default_rng(0), COUNT)
+    path = str(tmp_path_factory.mktemp("ann") / "synthetic.idx")
+    write_index(path, [f"v{i}" for i in range(COUNT)], vectors, [{"content": str(i)} for i in range(COUNT)])
+    return MappedVectorStore(path)
+
+
+@pytest.fixture(scope="module")
+def queries(base):
+    rng = np.random.default_rng(1)
+    rows = rng.choice(COUNT, 50, replace=False)
+    queries = np.asarray(base.vectors[rows]) + 0.05 * rng.standard_normal((50, DIM)).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def recall_at_k(ann: IVFIndex, base: MappedVectorStore, queries: np.ndarray) -> float:
+    exact = np.asarray(base.vectors) @ queries.T
+    hits = 0
+    for i, query in enumerate(queries):
+        truth = set(select_top_k(exact[:, i], TOP_K).tolist())
+        rows, _ = ann.search(query, TOP_K)
+        hits += len(truth & set(rows.tolist()))
+    return hits / (len(queries) * TOP_K)
+
+
+@pytest.mark.parametrize("quantization, refine, threshold", [
+    ("int8", 4, 0.95),
+    ("pq", 16, 0.9),
+])
+def test_recall_with_every_list_probed(base, queries, quantization, refine, threshold):
+    ann = IVFIndex.train(base, nlist=16, quantization=quantization, pq_m=8, refine=refine)
+    ann.nprobe = ann.nlist
+
+    assert recall_at_k(ann, base, queries) >= threshold
+
+
+def test_refined_scores_are_exact_cosines(base, queries):
+    ann = IVFIndex.train(base, nlist=16, quantization="pq", pq_m=8, refine=16, nprobe=16)
+    rows, scores = ann.search(queries[0], TOP_K)
+
+    assert np.allclose(scores, np.asarray(base.vectors[rows]) @ queries[0], atol=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "pq"])
+def test_save_load_round_trip(base, queries, tmp_path, quantization):
+    ann = IVFIndex.train(base, nlist=16, quantization=quantization, pq_m=8, nprobe=4)
+    path = str(tmp_path / "synthetic.ivf")
+    ann.save(path)
+
+    loaded = IVFIndex.load(path, base, nprobe=4)
+    for query in queries[:5]:
+        expected_rows, expected_scores = ann.search(query, TOP_K)
+        rows, scores = loaded.search(query, TOP_K)
+        assert rows.tolist() == expected_rows.tolist()
+        assert np.allclose(scores, expected_scores)
+
+
+def test_sidecar_for_a_changed_index_is_rejected(base, tmp_path):
+    path = str(tmp_path / "synthetic.ivf")
+    IVFIndex.train(base, nlist=16).save(path)
+
+    rebuilt_path = str(tmp_path / "rebuilt.idx")
+    vectors = clustered(np.random.default_rng(2), 100)
+    write_index(rebuilt_path, [f"v{i}" for i in range(100)], vectors, [{"content": str(i)} for i in range(100)])
+    rebuilt = MappedVectorStore(rebuilt_path)
+    assert rebuilt.header["checksum"] != base.header["checksum"]
+
+    with pytest.raises(ValueError, match="different"):
+        IVFIndex.load(path, rebuilt)
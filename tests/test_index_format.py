@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from chunker import CHUNKER_VERSION
+from index_format import MappedVectorStore, MODEL_NAME, read_header, write_index
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    ids = [f"chunk-{i}" for i in range(20)]
+    vectors = rng.standard_normal((20, 16)).astype(np.float32)
+    metadatas = [{"content": f"Step {i}: contain host-{i}", "section": "Ransomware"} for i in range(20)]
+    return ids, vectors, metadatas
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_round_trip(corpus, tmp_path, dtype):
+    ids, vectors, metadatas = corpus
+    path = str(tmp_path / "playbooks.idx")
+    write_index(path, ids, vectors, metadatas, model="test-model", chunker_version="v-test", dtype=dtype)
+
+    store = MappedVectorStore(path, expected_model="test-model", verify=True)
+    assert len(store) == len(ids)
+    assert store.header["dtype"] == dtype
+    assert store.header["model"] == "test-model" and store.header["chunker_version"] == "v-test"
+    assert list(store.records()) == list(zip(ids, metadatas))
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    assert np.allclose(np.asarray(store.vectors, dtype=np.float32), normalized, atol=1e-3)
+
+    match = store.query(vectors[7], top_k=1)["matches"][0]
+    assert match["id"] == "chunk-7"
+    assert match["metadata"] == metadatas[7]
+    assert match["score"] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_defaults_and_empty_index(tmp_path):
+    path = str(tmp_path / "empty.idx")
+    write_index(path, [], np.zeros((0, 8), dtype=np.float32), [])
+
+    header = read_header(path)
+    assert header["count"] == 0 and header["dtype"] == "float32"
+    assert header["model"] == MODEL_NAME and header["chunker_version"] == CHUNKER_VERSION
+
+    store = MappedVectorStore(path, verify=True)
+    assert store.query(np.ones(8), top_k=3) == {"matches": []}
+
+
+def test_checksum_mismatch_is_rejected(corpus, tmp_path):
+    ids, vectors, metadatas = corpus
+    path = str(tmp_path / "playbooks.idx")
+    write_index(path, ids, vectors, metadatas)
+    blob_offset = read_header(path)["blob_offset"]
+
+    with open(path, "r+b") as f:
+        f.seek(blob_offset + 5)
+        byte = f.read(1)
+        f.seek(blob_offset + 5)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    MappedVectorStore(path)  # opening alone only parses the header
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        MappedVectorStore(path, verify=True)
+
+
+def test_wrong_model_and_bad_magic_are_rejected(corpus, tmp_path):
+    ids, vectors, metadatas = corpus
+    path = str(tmp_path / "playbooks.idx")
+    write_index(path, ids, vectors, metadatas, model="other-model")
+
+    with pytest.raises(ValueError, match="other-model"):
+        MappedVectorStore(path, expected_model=MODEL_NAME)
+
+    bogus = tmp_path / "bogus.idx"
+    bogus.write_bytes(b"NOTANIDX" + b"\0" * 64)
+    with pytest.raises(ValueError, match="bad magic"):
+        MappedVectorStore(str(bogus))
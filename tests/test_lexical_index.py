@@ -0,0 +1,117 @@
+import pytest
+
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+CHUNKS = {
+    "c1": {"section": "Phishing", "content": "Block the sender domain in Proofpoint-TAP and purge the email."},
+    "c2": {"section": "Credential theft", "content": "Look for mimikatz.exe and event 4625 on the host 10.0.0.5."},
+    "c3": {"section": "Vulnerabilities", "content": "Patch CVE-2023-23397 in Outlook; phishing may exploit it."},
+}
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.sync(CHUNKS.items())
+    return index
+
+
+def test_tokenize_keeps_soc_tokens_whole_and_adds_parts():
+    terms = tokenize("Run mimikatz.exe against 10.0.0.5 for T1566.001")
+
+    assert "mimikatz.exe" in terms and "mimikatz" in terms and "exe" in terms
+    assert "10.0.0.5" in terms
+    assert "t1566.001" in terms and "t1566" in terms
+
+
+def test_tokenize_drops_stopwords_and_lowercases():
+    assert tokenize("How do I block THE Sender?") == ["block", "sender"]
+    assert tokenize("") == [] and tokenize(None) == []
+
+
+def test_search_matches_identifiers(index):
+    hits = index.search("cve-2023-23397", top_k=3)
+
+    assert hits[0]["id"] == "c3"
+    assert all(h["score"] > 0 for h in hits)
+    assert index.search("nothing in common", top_k=3) == []
+
+
+def test_search_min_score_drops_weak_hits(index):
+    hits = index.search("phishing", top_k=3)
+    assert {h["id"] for h in hits} == {"c1", "c3"}
+
+    assert index.search("phishing", top_k=3, min_score=hits[0]["score"] + 1) == []
+
+
+def test_search_min_ratio_is_relative_to_the_best_hit(index):
+    hits = index.search("mimikatz phishing", top_k=3)
+    best = hits[0]["score"]
+
+    floored = index.search("mimikatz phishing", top_k=3, min_ratio=0.99)
+    assert [h["id"] for h in floored] == [hits[0]["id"]]
+    assert all(h["score"] >= 0.99 * best for h in floored)
+
+    assert index.search("mimikatz phishing", top_k=3, min_ratio=0.0) == hits
+
+
+def test_reciprocal_rank_fusion_scores_and_order():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    scores = dict(fused)
+
+    assert [doc_id for doc_id, _ in fused][0] == "b"
+    assert scores["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores["a"] == pytest.approx(1 / 61)
+    assert scores["d"] == pytest.approx(1 / 62)
+    assert set(scores) == {"a", "b", "c", "d"}
+
+
+def test_reciprocal_rank_fusion_weights():
+    fused = reciprocal_rank_fusion([["a"], ["b"]], k=60, weights=[1.0, 2.0])
+    assert [doc_id for doc_id, _ in fused] == ["b", "a"]
+
+
+def test_sync_adds_and_removes_only_changes(index):
+    changed = dict(CHUNKS)
+    del changed["c2"]
+    changed["c4"] = {"section": "Malware", "content": "Isolate the ransomware host."}
+
+    assert index.sync(changed.items()) == (1, 1)
+    assert "c2" not in index and "c4" in index
+    assert index.search("mimikatz") == []
+    assert index.search("ransomware")[0]["id"] == "c4"
+
+
+def test_save_load_round_trip(index, tmp_path):
+    path = str(tmp_path / "lexical.json")
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.search("phishing", top_k=3) == index.search("phishing", top_k=3)
+
+
+def test_load_for_source_trusts_a_matching_stamp(tmp_path):
+    path = str(tmp_path / "lexical.json")
+    BM25Index.load_for_source(path, "idx:1", lambda: CHUNKS.items())
+
+    def unexpected():
+        raise AssertionError("records() read although the stamp matched")
+
+    index = BM25Index.load_for_source(path, "idx:1", unexpected)
+    assert index.source == "idx:1" and len(index) == len(CHUNKS)
+
+
+def test_load_for_source_rebuilds_a_stale_stamp(tmp_path):
+    path = str(tmp_path / "lexical.json")
+    BM25Index.load_for_source(path, "idx:1", lambda: CHUNKS.items())
+
+    fresh = {"c9": {"section": "Ransomware", "content": "Isolate the encrypted host."}}
+    index = BM25Index.load_for_source(path, "idx:2", lambda: fresh.items())
+
+    assert index.source == "idx:2"
+    assert index.search("isolate")[0]["id"] == "c9" and "c1" not in index
+
+    saved = BM25Index.load(path)
+    assert saved.source == "idx:2" and "c9" in saved and len(saved) == 1